@@ -1,15 +1,35 @@
 # app.py
 import os
 from flask import Flask, jsonify
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from routes import api_bp
+# config loads the .env file, so it must be imported before modules that read the environment
 from config import Config
+from routes import api_bp
 from models import db
-from dotenv import load_dotenv
+from auth import validate_auth_settings
+from ratelimit import init_rate_limiting
+from coalesce import init_coalescing
+from events import init_events
+from jobs import init_jobs
+from audit import init_audit_log
+from profiling import init_profiling
+from cache import init_user_cache
+from fragments import init_fragment_cache
+from groupcommit import init_group_commit
+from sharding import init_sharding
+from suggest import init_suggest
+from deadlines import init_deadlines
+from archive import init_archive
+from idempotency import init_idempotency
+from usage import init_usage
+
 
 def create_app(config_class=Config):
-    load_dotenv()  # This will load the .env file
+    # Validate settings here rather than at import time so that importing the
+    # app module (e.g. in a gunicorn --preload master) never has side effects.
+    # Isolated test configs such as SQLiteTestConfig do not define validate().
+    if hasattr(config_class, 'validate'):
+        config_class.validate()
+        validate_auth_settings()
 
     app = Flask(__name__)
     app.config.from_object(config_class)
@@ -18,7 +38,27 @@ def create_app(config_class=Config):
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
     db.init_app(app)
-    migrate = Migrate(app, db)
+
+    # Flask-Migrate imports Alembic, which is only needed for the `flask db` commands
+    if app.config.get('ENABLE_MIGRATE', True):
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    init_rate_limiting(app)
+    init_coalescing(app)
+    init_events(app)
+    init_jobs(app)
+    init_audit_log(app)
+    init_profiling(app)
+    init_user_cache(app)
+    init_fragment_cache(app)
+    init_group_commit(app)
+    init_sharding(app)
+    init_suggest(app)
+    init_deadlines(app)
+    init_archive(app)
+    init_idempotency(app)
+    init_usage(app)
 
     app.register_blueprint(api_bp, url_prefix='/api')
 
@@ -59,6 +99,17 @@ def create_app(config_class=Config):
             "message": "Resource Not Found"
         }), 404
 
+    @app.errorhandler(409)
+    def conflict(error):
+        response = jsonify({
+            "success": False,
+            "error": 409,
+            "message": "Conflict"
+        })
+        # Only raised for a retry of a request that is still running
+        response.headers['Retry-After'] = '1'
+        return response, 409
+
     @app.errorhandler(422)
     def unprocessable(error):
         return jsonify({
@@ -67,6 +118,17 @@ def create_app(config_class=Config):
             "message": "Unprocessable Entity"
         }), 422
 
+    @app.errorhandler(429)
+    def too_many_requests(error):
+        response = jsonify({
+            "success": False,
+            "error": 429,
+            "message": "Too Many Requests"
+        })
+        if getattr(error, 'retry_after', None):
+            response.headers['Retry-After'] = str(error.retry_after)
+        return response, 429
+
     @app.errorhandler(500)
     def server_error(error):
         return jsonify({
@@ -75,12 +137,55 @@ def create_app(config_class=Config):
             "message": "Internal Server Error"
         }), 500
 
-    print("\nRegistered Routes:")
-    for rule in app.url_map.iter_rules():
-        print(f"{rule.endpoint}: {rule}")
+    @app.errorhandler(501)
+    def not_implemented(error):
+        return jsonify({
+            "success": False,
+            "error": 501,
+            "message": "Not Implemented"
+        }), 501
+
+    @app.errorhandler(503)
+    def service_unavailable(error):
+        response = jsonify({
+            "success": False,
+            "error": 503,
+            "message": "Service Unavailable"
+        })
+        if getattr(error, 'retry_after', None):
+            response.headers['Retry-After'] = str(error.retry_after)
+        return response, 503
+
+    @app.errorhandler(504)
+    def gateway_timeout(error):
+        return jsonify({
+            "success": False,
+            "error": 504,
+            "message": "Gateway Timeout"
+        }), 504
+
+    if app.debug:
+        for rule in app.url_map.iter_rules():
+            app.logger.debug("%s: %s", rule.endpoint, rule)
 
     return app
 
+
+def dispose_engine(app):
+    """
+    Drop the connection pool inherited from a parent process.
+
+    Must be called in each gunicorn worker after fork when the app is preloaded:
+    pooled connections opened by the master must never be shared between
+    processes. The parent's connections are left open for the parent to use.
+    """
+    with app.app_context():
+        db.engine.dispose(close=False)
+    router = app.extensions.get('shard_router')
+    if router is not None:
+        router.dispose(close=False)
+
+
 app = create_app()
 
 if __name__ == '__main__':
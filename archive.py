@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from jobs import int_param, job_type
+from models import db, ArchivedTool, Job, Tool, archived_tool_tags, next_change_seq, send_tool_changed, tool_tags
+
+
+def archive_candidates(cutoff, after=0, limit=500):
+    """
+    Build the query selecting the next batch of tools due for the archive.
+
+    A tool is due once it has been retired, or when it was created before the
+    cutoff. Candidates are walked along the primary key from after, and the
+    due condition is checked on each row read, so a batch reads from where the
+    previous one stopped up to its last due tool, and a whole run reads the
+    table once.
+
+    Args:
+        cutoff (datetime): Tools created before this are due; None archives only retired tools
+        after (int): Only consider tools with a higher ID
+        limit (int): Batch size
+
+    Returns:
+        Select: The IDs of the batch, locked against concurrent updates where the database supports it
+    """
+    tool = Tool.__table__
+    due = tool.c.retired_at.isnot(None)
+    if cutoff is not None:
+        due = db.or_(due, tool.c.created_at < cutoff)
+    return db.select(tool.c.id) \
+        .where(tool.c.id > after, tool.c.deleted_at.is_(None), due) \
+        .order_by(tool.c.id) \
+        .limit(limit) \
+        .with_for_update()
+
+
+def move_to_archive(tool_ids):
+    """
+    Copy tools and their tags to the archive and remove them from the hot tables.
+
+    Runs as INSERT ... SELECT and DELETE statements in the session's current
+    transaction; the caller commits. Tools move whole or not at all. Each moved
+    tool gets a new change sequence number, so the change feed reports the move.
+
+    Args:
+        tool_ids (list): IDs of tools in the tool table
+    """
+    tool, archive = Tool.__table__, ArchivedTool.__table__
+    columns = ['id', 'name', 'description', 'created_at', 'user_id', 'retired_at']
+    db.session.execute(
+        db.insert(archive).from_select(
+            columns + ['archived_at'],
+            db.select(*[tool.c[name] for name in columns], db.literal(datetime.utcnow(), db.DateTime))
+            .where(tool.c.id.in_(tool_ids))
+        )
+    )
+    last_seq = next_change_seq(db.session.connection(), 'tool', len(tool_ids))
+    db.session.execute(
+        db.update(archive).where(archive.c.id == db.bindparam('tool_id')).values(change_seq=db.bindparam('seq')),
+        [{'tool_id': tool_id, 'seq': last_seq - len(tool_ids) + 1 + i} for i, tool_id in enumerate(sorted(tool_ids))]
+    )
+    db.session.execute(
+        db.insert(archived_tool_tags).from_select(
+            ['tool_id', 'tag_id'],
+            db.select(tool_tags.c.tool_id, tool_tags.c.tag_id).where(tool_tags.c.tool_id.in_(tool_ids))
+        )
+    )
+    db.session.execute(db.delete(tool_tags).where(tool_tags.c.tool_id.in_(tool_ids)))
+    db.session.execute(db.delete(tool).where(tool.c.id.in_(tool_ids)))
+
+
+# Bounds of the tool_archive params; 100 years covers any retention policy
+MAX_ARCHIVE_AFTER_DAYS = 36500
+MAX_ARCHIVE_BATCH_SIZE = 10000
+
+
+def archive_params(params):
+    """
+    Read and check the params of an archive job, filling in the configured defaults.
+
+    Returns:
+        tuple: (older_than_days, batch_size)
+
+    Raises:
+        InvalidJobParams: If older_than_days is not a non-negative integer, or
+            batch_size not a positive one
+    """
+    config = current_app.config
+    older_than_days = int_param(params, 'older_than_days', config.get('ARCHIVE_AFTER_DAYS', 0),
+                                0, MAX_ARCHIVE_AFTER_DAYS)
+    batch_size = int_param(params, 'batch_size', config.get('ARCHIVE_BATCH_SIZE', 500), 1, MAX_ARCHIVE_BATCH_SIZE)
+    return older_than_days, batch_size
+
+
+@job_type('tool_archive', permission='update:tools', check_params=archive_params)
+def archive_tools(context, params):
+    """
+    Move retired tools, and tools older than the archive policy, to the archive in batches.
+
+    params: {'older_than_days': N, 'batch_size': M}, both optional. N defaults to
+    ARCHIVE_AFTER_DAYS; 0 archives only retired tools.
+
+    Each batch is committed together with the job's progress, so an interrupted
+    job resumes after the last batch it moved.
+    """
+    older_than_days, batch_size = archive_params(params)
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days) if older_than_days else None
+    summary = dict({'archived': 0, 'last_id': 0}, **context.result)
+    cache = current_app.extensions.get('fragment_cache')
+
+    while True:
+        tool_ids = db.session.execute(archive_candidates(cutoff, summary['last_id'], batch_size)).scalars().all()
+        if not tool_ids:
+            break
+        move_to_archive(tool_ids)
+        summary['archived'] += len(tool_ids)
+        summary['last_id'] = tool_ids[-1]
+        context.report(summary['archived'], result=summary)
+
+        if cache is not None:
+            for tool_id in tool_ids:
+                cache.invalidate(tool_id)
+        archived = ArchivedTool.get_tools_by_ids(tool_ids)
+        for tool_id in tool_ids:
+            send_tool_changed(archived[tool_id], 'archived')
+
+    return summary
+
+
+def init_archive(app):
+    """
+    Add the `flask archive-tools` command, which queues an archive job for the
+    job workers; run it from cron to apply the archive policy regularly.
+    """
+    @app.cli.command('archive-tools')
+    def queue_archive_job():
+        """Queue a job moving retired and old tools to the archive."""
+        job = Job.create_job('tool_archive', {}, created_by='cli')
+        print(f'Queued archive job {job.id}')
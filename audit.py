@@ -0,0 +1,191 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+from flask import current_app, g, has_app_context
+from models import db, AuditEntry, tool_changed
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLog:
+    """
+    Write-behind audit log.
+
+    record() only puts the entry on a bounded in-memory queue; a background
+    thread writes queued entries to the audit_log table in batches, so a
+    request never waits for an audit INSERT. Entries still queued when the
+    process exits are flushed by stop(), which runs at interpreter exit.
+
+    When the queue is full, overflow_policy decides what happens: 'block'
+    makes the writer wait up to block_timeout seconds for room before the
+    entry is dropped, 'drop' drops it at once. Dropped entries are counted
+    and logged.
+
+    A batch that fails to write is kept and retried first by the next flush.
+    Since every flush starts with it, at most one batch is kept this way;
+    while the database stays down, new entries wait in the queue and the
+    overflow policy applies to them.
+    """
+
+    def __init__(self, app, max_queue=10000, batch_size=500, flush_interval=1.0,
+                 overflow_policy='block', block_timeout=1.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(max_queue)
+        # The batch that failed to write, if any; only used under _flush_lock
+        self._retry = []
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._pid = None
+        self.metrics = {'recorded': 0, 'written': 0, 'dropped': 0, 'flushes': 0, 'flush_errors': 0, 'retried': 0}
+
+    def start(self):
+        """Start the flush thread, once per process."""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Entries queued before a fork belong to the parent process
+            self._queue = queue.Queue(self._queue.maxsize)
+            self._retry = []
+            self._pid = os.getpid()
+            self._stop.clear()
+            threading.Thread(target=self._run, daemon=True, name='audit-log-writer').start()
+
+    def stop(self):
+        """Stop the flush thread and write every entry still queued."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._pid == os.getpid():
+            self.flush()
+
+    def record(self, action, resource_type, resource_id, actor=None, details=None):
+        """
+        Queue an audit entry.
+
+        Returns:
+            bool: False if the entry was dropped because the queue was full
+        """
+        self.start()
+        entry = {
+            'occurred_at': datetime.utcnow(),
+            'actor': actor,
+            'action': action,
+            'resource_type': resource_type,
+            'resource_id': resource_id,
+            'details': details,
+        }
+        try:
+            if self.overflow_policy == 'block':
+                self._queue.put(entry, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            self.metrics['dropped'] += 1
+            logger.warning("Audit log queue full; dropped %s %s %s", action, resource_type, resource_id)
+            return False
+
+        self.metrics['recorded'] += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Audit log flush failed")
+
+    def flush(self):
+        """
+        Write queued entries to the database, a batch per transaction.
+
+        A batch that failed before is written first.
+
+        Returns:
+            int: The number of entries written
+        """
+        written = 0
+        with self._flush_lock, self.app.app_context():
+            while True:
+                batch, self._retry = self._retry, []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    break
+                try:
+                    db.session.execute(db.insert(AuditEntry), batch)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    self.metrics['flush_errors'] += 1
+                    self._retry = batch
+                    self.metrics['retried'] += len(batch)
+                    raise
+                finally:
+                    db.session.remove()
+                written += len(batch)
+                self.metrics['flushes'] += 1
+            self.metrics['written'] += written
+        return written
+
+
+def current_actor():
+    """
+    Get the subject responsible for the current work: the caller's JWT
+    subject in a request, or the subject that queued the job in a job runner.
+    """
+    if not has_app_context():
+        return None
+    if g.get('actor'):
+        return g.actor
+    return (g.get('jwt_payload') or {}).get('sub')
+
+
+@tool_changed.connect
+def audit_tool_change(tool, action):
+    if not has_app_context():
+        return
+    audit_log = current_app.extensions.get('audit_log')
+    if audit_log is not None:
+        audit_log.record(f'tool.{action}', 'tool', tool.id, actor=current_actor(), details={'name': tool.name})
+
+
+def init_audit_log(app):
+    """
+    Enable the write-behind audit log for the app when AUDIT_ENABLED is set.
+
+    Settings:
+        AUDIT_QUEUE_SIZE: Entries buffered in memory before the overflow policy applies
+        AUDIT_BATCH_SIZE: Entries written per INSERT batch
+        AUDIT_FLUSH_INTERVAL: Seconds between flushes of a partly filled batch
+        AUDIT_OVERFLOW_POLICY: 'block' (wait AUDIT_BLOCK_TIMEOUT seconds, then drop) or 'drop'
+    """
+    if not app.config.get('AUDIT_ENABLED', False):
+        return
+
+    audit_log = AuditLog(
+        app,
+        max_queue=app.config.get('AUDIT_QUEUE_SIZE', 10000),
+        batch_size=app.config.get('AUDIT_BATCH_SIZE', 500),
+        flush_interval=app.config.get('AUDIT_FLUSH_INTERVAL', 1.0),
+        overflow_policy=app.config.get('AUDIT_OVERFLOW_POLICY', 'block'),
+        block_timeout=app.config.get('AUDIT_BLOCK_TIMEOUT', 1.0)
+    )
+    app.extensions['audit_log'] = audit_log
+    atexit.register(audit_log.stop)
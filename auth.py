@@ -1,24 +1,113 @@
 import json
-from flask import request, abort
+import threading
+import time
+from flask import request, abort, g
 from functools import wraps
 from jose import jwt
 import os
 from urllib.request import urlopen
+from werkzeug.exceptions import GatewayTimeout
+from deadlines import check_deadline, remaining_time
+from ratelimit import check_rate_limit
+from profiling import run_view
 
 
 # Auth0 Configuration - Critical security settings
-# These environment variables must be set for the application to function securely
+# These environment variables must be set for the application to function securely.
+# They are checked by validate_auth_settings() when the app is created, not at import time.
 AUTH0_DOMAIN = os.environ.get('AUTH0_DOMAIN')
-if not AUTH0_DOMAIN:
-    raise ValueError("No AUTH0_DOMAIN set. This is a required environment variable for authentication.")
 
 ALGORITHMS = ['RS256']
 
 # API audience is required for token validation
 # Check both API_AUDIENCE and API_IDENTIFIER for backward compatibility
 API_AUDIENCE = os.environ.get('API_AUDIENCE') or os.environ.get('API_IDENTIFIER')
-if not API_AUDIENCE:
-    raise ValueError("No API_AUDIENCE or API_IDENTIFIER set. One of these is required for authentication.")
+
+# Where the signing keys are published. Defaults to the tenant's standard JWKS endpoint;
+# benchmarks point it at a local stand-in server.
+JWKS_URL = os.environ.get('AUTH0_JWKS_URL') or f'https://{AUTH0_DOMAIN}/.well-known/jwks.json'
+
+# The JWKS is fetched once and reused for this many seconds
+JWKS_CACHE_TTL = int(os.environ.get('JWKS_CACHE_TTL', 600))
+
+# A token signed with an unknown key id triggers an early refresh (key rotation),
+# but never more often than this, so bogus tokens cannot hammer the Auth0 endpoint
+JWKS_MIN_REFRESH_INTERVAL = int(os.environ.get('JWKS_MIN_REFRESH_INTERVAL', 60))
+
+# Upper bound in seconds on fetching the JWKS; a request's deadline may shorten it
+JWKS_FETCH_TIMEOUT = float(os.environ.get('JWKS_FETCH_TIMEOUT', 5))
+
+_jwks_cache = {'jwks': None, 'fetched_at': 0.0}
+_jwks_lock = threading.Lock()
+
+
+def validate_auth_settings():
+    """
+    Check that the Auth0 settings required for token validation are present.
+
+    Raises:
+        ValueError: If AUTH0_DOMAIN or API_AUDIENCE/API_IDENTIFIER is not set.
+    """
+    if not AUTH0_DOMAIN:
+        raise ValueError("No AUTH0_DOMAIN set. This is a required environment variable for authentication.")
+    if not API_AUDIENCE:
+        raise ValueError("No API_AUDIENCE or API_IDENTIFIER set. One of these is required for authentication.")
+
+
+def get_jwks(max_age=None):
+    """
+    Get the Auth0 JSON Web Key Set, fetching it only when the cached copy is stale.
+
+    Args:
+        max_age (float): Maximum age in seconds of a cached copy that may be returned.
+            Defaults to JWKS_CACHE_TTL; 0 always fetches.
+
+    Returns:
+        dict: The JWKS document.
+
+    Raises:
+        GatewayTimeout: If the current request's deadline passes before the key set is fetched.
+    """
+    if max_age is None:
+        max_age = JWKS_CACHE_TTL
+
+    jwks = _jwks_cache['jwks']
+    if jwks is not None and time.monotonic() - _jwks_cache['fetched_at'] < max_age:
+        return jwks
+
+    with _jwks_lock:
+        # Another thread may have refreshed the cache while we waited for the lock
+        jwks = _jwks_cache['jwks']
+        if jwks is not None and time.monotonic() - _jwks_cache['fetched_at'] < max_age:
+            return jwks
+
+        timeout = JWKS_FETCH_TIMEOUT
+        left = remaining_time()
+        if left is not None:
+            check_deadline()
+            timeout = min(timeout, left)
+        jsonurl = urlopen(JWKS_URL, timeout=timeout)
+        jwks = json.loads(jsonurl.read())
+        _jwks_cache['jwks'] = jwks
+        _jwks_cache['fetched_at'] = time.monotonic()
+        return jwks
+
+
+def warm_jwks():
+    """
+    Populate the JWKS cache ahead of the first request.
+
+    Called from the gunicorn master so that forked workers inherit a warm cache.
+    Failures are swallowed; the key set is then fetched on the first request instead.
+
+    Returns:
+        bool: True if the key set was fetched.
+    """
+    try:
+        get_jwks(max_age=0)
+        return True
+    except Exception:
+        return False
 
 
 class AuthError(Exception):
@@ -98,11 +187,14 @@ def verify_decode_jwt(token):
                 'description': f'Unable to parse authentication token: {str(e)}'
             }, 400)
 
-        # Then fetch the JWKS
-        jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-        jwks = json.loads(jsonurl.read())
+        # Then get the JWKS, served from the cache when possible
+        jwks = get_jwks()
         rsa_key = {}
+    except GatewayTimeout:
+        raise
     except Exception as e:
+        # A fetch cut short by the request's deadline is a timeout, not a bad token
+        check_deadline()
         raise AuthError({
             'code': 'invalid_header',
             'description': f'Unable to fetch authentication keys: {str(e)}'
@@ -114,15 +206,16 @@ def verify_decode_jwt(token):
             'description': 'Authorization malformed.'
         }, 401)
 
-    for key in jwks['keys']:
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
-            }
+    rsa_key = _find_rsa_key(jwks, unverified_header['kid'])
+    if not rsa_key:
+        # The signing key may have been rotated since the cache was filled
+        try:
+            rsa_key = _find_rsa_key(get_jwks(max_age=JWKS_MIN_REFRESH_INTERVAL), unverified_header['kid'])
+        except GatewayTimeout:
+            raise
+        except Exception:
+            check_deadline()
+            rsa_key = {}
 
     if rsa_key:
         try:
@@ -160,6 +253,25 @@ def verify_decode_jwt(token):
     }, 400)
 
 
+def _find_rsa_key(jwks, kid):
+    """
+    Find the RSA key with the given key id in a JWKS document.
+
+    Returns:
+        dict: The key, or an empty dict if no key matches.
+    """
+    for key in jwks['keys']:
+        if key['kid'] == kid:
+            return {
+                'kty': key['kty'],
+                'kid': key['kid'],
+                'use': key['use'],
+                'n': key['n'],
+                'e': key['e']
+            }
+    return {}
+
+
 def check_permissions(permission, payload):
     """
     Check if the required permission is in the JWT payload.
@@ -207,7 +319,10 @@ def requires_auth(permission=''):
                 token = get_token_auth_header()
                 payload = verify_decode_jwt(token)
                 check_permissions(permission, payload)
-                return f(*args, **kwargs)
+                check_rate_limit(payload)
+                # Make the verified claims available to the view and request hooks
+                g.jwt_payload = payload
+                return run_view(payload, f, *args, **kwargs)
             except AuthError as e:
                 # Add more context to the error message
                 error_description = e.error['description']
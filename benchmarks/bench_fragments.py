@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+"""
+Fragment Cache Benchmark
+
+Measures what the per-tool fragment cache (fragments.py) saves on list
+responses, in process and offline, with a mixed workload of listing
+requests against a seeded SQLite database:
+
+- full and paged listings (?limit=100&after=...)
+- listings filtered by one or two tags, with facet counts
+- batch lookups of 50 random IDs (?ids=...)
+
+Each request kind is run with the cache disabled and then enabled (after one
+warm-up pass), reporting the request latency and, separately, the time spent
+building the response body from tools that are already loaded, which is the
+part the cache replaces.
+
+Usage:
+    python benchmarks/bench_fragments.py --tools 5000 --requests 300
+    python benchmarks/bench_fragments.py --output fragments.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from common import configure_environment, generate_signing_key, latency_summary, sign_token, write_json
+
+TAGS = ['scanner', 'proxy', 'fuzzer', 'forensics', 'network', 'web', 'wireless', 'malware',
+        'password', 'recon', 'exploit', 'cloud']
+
+
+def build_workload(tool_ids, rng, count):
+    """Return count (kind, query string) pairs, mixed across the request kinds."""
+    workload = []
+    for _ in range(count):
+        kind = rng.choice(['page', 'tag', 'two_tags', 'ids'])
+        if kind == 'page':
+            query = {'limit': 100, 'after': rng.choice(tool_ids)}
+        elif kind == 'tag':
+            query = {'tag': rng.choice(TAGS), 'limit': 200}
+        elif kind == 'two_tags':
+            query = [('tag', tag) for tag in rng.sample(TAGS, 2)]
+        else:
+            query = {'ids': ','.join(str(tool_id) for tool_id in rng.sample(tool_ids, 50))}
+        workload.append((kind, query))
+    return workload
+
+
+def run_workload(client, headers, workload):
+    latencies = {}
+    for kind, query in workload:
+        started = time.perf_counter()
+        response = client.get('/api/tools', query_string=query, headers=headers)
+        latencies.setdefault(kind, []).append(time.perf_counter() - started)
+        assert response.status_code == 200, response.data
+    return {kind: latency_summary(values) for kind, values in sorted(latencies.items())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the serialized tool fragment cache.")
+    parser.add_argument('--tools', type=int, default=5000, help="Tools in the database")
+    parser.add_argument('--requests', type=int, default=400, help="Requests per pass")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    configure_environment()
+
+    import auth
+    from flask import jsonify
+    from app import create_app
+    from config import SQLiteTestConfig
+    from fragments import FragmentCache, tools_response
+    from models import db, Tool, User
+
+    private_pem, jwk = generate_signing_key()
+    auth._jwks_cache['jwks'] = {'keys': [jwk]}
+    auth._jwks_cache['fetched_at'] = time.monotonic()
+    headers = {'Authorization': f'Bearer {sign_token(private_pem)}'}
+
+    app = create_app(SQLiteTestConfig)
+    client = app.test_client()
+    rng = random.Random(args.seed)
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        db.session.add(user)
+        db.session.commit()
+        for i in range(args.tools):
+            tool = Tool(name=f'Tool {i}', description=f'Benchmark tool number {i} for listing workloads.',
+                        user_id=user.id)
+            tool.set_tags(rng.sample(TAGS, rng.randint(1, 4)), db.session)
+            db.session.add(tool)
+        db.session.commit()
+        tool_ids = [tool_id for (tool_id,) in db.session.execute(db.select(Tool.id))]
+        pages = [Tool.get_page(rng.choice(tool_ids), 100) for _ in range(50)]
+
+        workload = build_workload(tool_ids, rng, args.requests)
+        results = {'python': platform.python_version(), 'tools': args.tools, 'requests': args.requests}
+
+        with app.test_request_context():
+            def assemble(build):
+                started = time.perf_counter()
+                for _ in range(5):
+                    for page in pages:
+                        build(page)
+                return (time.perf_counter() - started) / (5 * len(pages)) * 1e6
+
+            uncached_us = assemble(lambda page: jsonify({'success': True, 'tools': [t.serialize() for t in page]}))
+            app.extensions['fragment_cache'] = FragmentCache()
+            assemble(lambda page: tools_response({'success': True}, page))
+            cached_us = assemble(lambda page: tools_response({'success': True}, page))
+            app.extensions.pop('fragment_cache')
+        results['assemble_100_tools_us'] = {'uncached': round(uncached_us, 1), 'cached': round(cached_us, 1)}
+        print(f"assemble 100 tools: {uncached_us:.0f} us uncached, {cached_us:.0f} us cached "
+              f"({uncached_us / cached_us:.1f}x)")
+
+    results['uncached'] = run_workload(client, headers, workload)
+    app.extensions['fragment_cache'] = cache = FragmentCache()
+    run_workload(client, headers, workload)
+    results['cached'] = run_workload(client, headers, workload)
+    results['cache'] = dict(cache.metrics, entries=len(cache), bytes=cache.size)
+
+    for kind in results['uncached']:
+        before, after = results['uncached'][kind]['p50_ms'], results['cached'][kind]['p50_ms']
+        print(f"{kind:>10}: p50 {before:.2f} ms uncached, {after:.2f} ms cached")
+    print(f"cache: {json.dumps(results['cache'])}")
+
+    if args.output:
+        write_json(args.output, results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+"""
+Group Commit Benchmark
+
+Measures POST /api/tools throughput under concurrency with group commit off
+and on. Requests go through the full WSGI stack in process, from several
+threads, against a database server that commits to disk, so the cost of one
+commit per request is visible. Group commit is not enabled on SQLite (writers
+there serialize on the database lock either way), so a server database such
+as PostgreSQL is required.
+
+For each mode the creates per second, latency percentiles and, with group
+commit on, the average number of rows per commit are reported.
+
+Usage:
+    python benchmarks/bench_group_commit.py --database-url postgresql://... --threads 16 --requests 2000
+    python benchmarks/bench_group_commit.py --database-url postgresql://... --window-ms 2 --output gc.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+
+from common import (configure_environment, generate_signing_key, sign_token,
+                    latency_summary, write_json)
+
+
+def build_app(database_url, group_commit, window_ms, max_batch):
+    """Create an app, with its schema and one owner, for a benchmark run."""
+    from app import create_app
+    from config import Config
+    from models import db, User
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        GROUP_COMMIT_ENABLED = group_commit
+        GROUP_COMMIT_WINDOW_MS = window_ms
+        GROUP_COMMIT_MAX_BATCH = max_batch
+        # Keep background writers from competing with the measured commits
+        AUDIT_ENABLED = False
+        JOBS_WORKER_THREADS = 0
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(username='bench_user', email='bench@example.com')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    return app, user_id
+
+
+def run_mode(app, user_id, token, threads, requests):
+    """Send requests creates from threads threads and return the measurements."""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    per_thread = requests // threads
+    start_barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        local = []
+        start_barrier.wait()
+        for i in range(per_thread):
+            body = {'name': f'Tool {index}-{i}', 'description': 'Group commit benchmark.', 'user_id': user_id}
+            started = time.perf_counter()
+            response = client.post('/api/tools', json=body, headers=headers)
+            local.append(time.perf_counter() - started)
+            if response.status_code != 201:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'elapsed_s': round(elapsed, 3),
+        'creates_per_sec': round(len(latencies) / elapsed, 1),
+        'latency': latency_summary(latencies),
+    }
+    committer = app.extensions.get('group_committer')
+    if committer is not None and committer.metrics['batches']:
+        result['rows_per_commit'] = round(committer.metrics['rows'] / committer.metrics['batches'], 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tool creation with and without group commit.")
+    parser.add_argument('--database-url', required=True, help="Database server to write to, e.g. postgresql://...")
+    parser.add_argument('--threads', type=int, default=16, help="Concurrent clients")
+    parser.add_argument('--requests', type=int, default=1600, help="Creates per mode")
+    parser.add_argument('--window-ms', type=float, default=2.0, help="Group commit window")
+    parser.add_argument('--max-batch', type=int, default=64, help="Group commit batch size limit")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url.startswith('sqlite'):
+        parser.error("group commit is not enabled on SQLite; use a server database such as PostgreSQL")
+    configure_environment(database_url=database_url)
+
+    import auth
+    private_pem, jwk = generate_signing_key()
+    auth._jwks_cache['jwks'] = {'keys': [jwk]}
+    auth._jwks_cache['fetched_at'] = time.monotonic()
+    token = sign_token(private_pem)
+
+    results = {
+        'python': platform.python_version(),
+        'database': database_url.split(':', 1)[0],
+        'threads': args.threads,
+        'window_ms': args.window_ms,
+        'max_batch': args.max_batch,
+        'modes': {},
+    }
+    for mode, enabled in (('per_request_commit', False), ('group_commit', True)):
+        app, user_id = build_app(database_url, enabled, args.window_ms, args.max_batch)
+        results['modes'][mode] = run_mode(app, user_id, token, args.threads, args.requests)
+        print(f"{mode:>20}: {json.dumps(results['modes'][mode])}")
+
+    baseline = results['modes']['per_request_commit']['creates_per_sec']
+    if baseline:
+        speedup = results['modes']['group_commit']['creates_per_sec'] / baseline
+        results['speedup'] = round(speedup, 2)
+        print(f"Group commit speedup: {speedup:.2f}x")
+
+    if args.output:
+        write_json(args.output, results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+
+"""
+Load Benchmark for Cybersecurity Tools Management API
+
+Drives a mixed read/write workload against every /api/tools and /api/users
+route using real RS256 tokens. Tokens are signed with a locally generated key
+that is published by a stand-in JWKS server, so the full authentication path
+runs without contacting Auth0.
+
+By default the app is started in a child process against a temporary SQLite
+database. Pass --database-url to use a local PostgreSQL database instead, or
+--url to target a server that is already running (start it with
+AUTH0_JWKS_URL, AUTH0_DOMAIN and API_AUDIENCE pointing at this harness; see --jwks-port).
+
+Reports requests per second and p50/p95/p99 latency per operation. When a
+baseline file is given, exits with status 1 if throughput or tail latency
+regresses by more than the tolerance, and with status 2, before running, if
+the baseline file does not exist.
+
+Usage:
+    python benchmarks/bench_load.py --duration 20 --concurrency 8
+    python benchmarks/bench_load.py --save-baseline benchmarks/baseline_load.json
+    python benchmarks/bench_load.py --baseline benchmarks/baseline_load.json --tolerance 0.2
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from common import (configure_environment, generate_signing_key, sign_token, JWKSServer,
+                    latency_summary, load_json, write_json)
+
+# Relative weight of each operation in the default workload
+DEFAULT_MIX = 'list_tools=25,get_tool=40,create_tool=10,update_tool=10,delete_tool=5,list_users=10'
+
+
+def serve_app(database_url, jwks_url, seed_users, seed_tools, port_queue):
+    """Run the app in a child process with a seeded database and report its port."""
+    configure_environment(jwks_url=jwks_url, database_url=database_url)
+
+    # Per-request access logging would dominate the measurements
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    from werkzeug.serving import make_server
+    from app import app
+    from models import db, User, Tool
+
+    with app.app_context():
+        db.create_all()
+        if db.session.query(User.id).first() is None:
+            db.session.add_all([
+                User(username=f'bench_user_{i}', email=f'bench_user_{i}@example.com')
+                for i in range(seed_users)
+            ])
+            db.session.commit()
+        if db.session.query(Tool.id).first() is None:
+            user_ids = [row.id for row in db.session.query(User.id).all()]
+            db.session.add_all([
+                Tool(name=f'Bench Tool {i}', description=f'Seeded tool number {i}.',
+                     user_id=user_ids[i % len(user_ids)])
+                for i in range(seed_tools)
+            ])
+            db.session.commit()
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def parse_mix(mix):
+    """Parse 'op=weight,...' into a list of operations and a list of weights."""
+    ops, weights = [], []
+    for item in mix.split(','):
+        name, weight = item.split('=')
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation in mix: {name}")
+        ops.append(name)
+        weights.append(float(weight))
+    return ops, weights
+
+
+class LoadWorker(threading.Thread):
+    """
+    Issues requests over one keep-alive connection until the deadline passes.
+    """
+
+    def __init__(self, target, token, state, ops, weights, deadline, seed):
+        super().__init__(daemon=True)
+        parts = urlsplit(target)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        self.prefix = parts.path.rstrip('/')
+        self.headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+        self.state = state
+        self.ops = ops
+        self.weights = weights
+        self.deadline = deadline
+        self.random = random.Random(seed)
+        self.created = []
+        self.latencies = {op: [] for op in ops}
+        self.errors = {op: 0 for op in ops}
+
+    def request(self, method, path, body=None):
+        payload = json.dumps(body) if body is not None else None
+        self.conn.request(method, self.prefix + path, body=payload, headers=self.headers)
+        response = self.conn.getresponse()
+        data = response.read()
+        return response.status, data
+
+    def run(self):
+        while time.perf_counter() < self.deadline:
+            op = self.random.choices(self.ops, self.weights)[0]
+            start = time.perf_counter()
+            try:
+                ok = OPERATIONS[op](self)
+            except (OSError, http.client.HTTPException):
+                self.conn.close()
+                ok = False
+            elapsed = time.perf_counter() - start
+            if ok:
+                self.latencies[op].append(elapsed)
+            else:
+                self.errors[op] += 1
+
+
+def op_list_tools(worker):
+    status, _ = worker.request('GET', '/api/tools')
+    return status == 200
+
+
+def op_get_tool(worker):
+    tool_id = worker.random.choice(worker.state['tool_ids'])
+    status, _ = worker.request('GET', f'/api/tools/{tool_id}')
+    return status == 200
+
+
+def op_create_tool(worker):
+    status, data = worker.request('POST', '/api/tools', {
+        'name': f'Load Tool {worker.random.randrange(1 << 30)}',
+        'description': 'Created by the load benchmark.',
+        'user_id': worker.random.choice(worker.state['user_ids']),
+    })
+    if status == 201:
+        worker.created.append(json.loads(data)['tool']['id'])
+        return True
+    return False
+
+
+def op_update_tool(worker):
+    tool_id = worker.random.choice(worker.state['tool_ids'])
+    status, _ = worker.request('PATCH', f'/api/tools/{tool_id}', {
+        'description': f'Updated by the load benchmark at {time.time():.6f}.'
+    })
+    return status == 200
+
+
+def op_delete_tool(worker):
+    # Only delete tools this worker created, so reads of seeded tools never 404
+    if not worker.created:
+        return op_create_tool(worker)
+    status, _ = worker.request('DELETE', f'/api/tools/{worker.created.pop()}')
+    return status == 200
+
+
+def op_list_users(worker):
+    status, _ = worker.request('GET', '/api/users')
+    return status == 200
+
+
+OPERATIONS = {
+    'list_tools': op_list_tools,
+    'get_tool': op_get_tool,
+    'create_tool': op_create_tool,
+    'update_tool': op_update_tool,
+    'delete_tool': op_delete_tool,
+    'list_users': op_list_users,
+}
+
+
+def discover_ids(target, token):
+    """Collect existing tool and user ids so reads and updates hit real rows."""
+    parts = urlsplit(target)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    headers = {'Authorization': f'Bearer {token}'}
+    state = {}
+    for key, path, field in (('tool_ids', '/api/tools', 'tools'), ('user_ids', '/api/users', 'users')):
+        conn.request('GET', parts.path.rstrip('/') + path, headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"GET {path} returned {response.status}: {body[:200]!r}")
+        state[key] = [row['id'] for row in json.loads(body)[field]]
+        if not state[key]:
+            raise RuntimeError(f"GET {path} returned no rows; seed the database first")
+    conn.close()
+    return state
+
+
+def run_load(target, token, ops, weights, concurrency, duration, warmup, seed):
+    """Run the workload and return per-operation latencies, error counts and elapsed time."""
+    state = discover_ids(target, token)
+
+    if warmup > 0:
+        warm_deadline = time.perf_counter() + warmup
+        warm_workers = [LoadWorker(target, token, state, ops, weights, warm_deadline, seed + i)
+                        for i in range(concurrency)]
+        for worker in warm_workers:
+            worker.start()
+        for worker in warm_workers:
+            worker.join()
+
+    start = time.perf_counter()
+    deadline = start + duration
+    workers = [LoadWorker(target, token, state, ops, weights, deadline, seed + 1000 + i)
+               for i in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = {op: [] for op in ops}
+    errors = {op: 0 for op in ops}
+    for worker in workers:
+        for op in ops:
+            latencies[op].extend(worker.latencies[op])
+            errors[op] += worker.errors[op]
+    return latencies, errors, elapsed
+
+
+def build_report(latencies, errors, elapsed, args):
+    all_latencies = [value for values in latencies.values() for value in values]
+    total = len(all_latencies)
+    return {
+        'benchmark': 'load',
+        'concurrency': args.concurrency,
+        'duration_s': round(elapsed, 3),
+        'mix': args.mix,
+        'total': dict(latency_summary(all_latencies),
+                      rps=round(total / elapsed, 2) if elapsed else 0.0,
+                      errors=sum(errors.values())),
+        'operations': {
+            op: dict(latency_summary(values), rps=round(len(values) / elapsed, 2), errors=errors[op])
+            for op, values in latencies.items()
+        },
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    """Return a list of human-readable regressions against a stored baseline."""
+    regressions = []
+    sections = [('total', report['total'], baseline.get('total', {}))]
+    sections += [(op, stats, baseline.get('operations', {}).get(op, {}))
+                 for op, stats in report['operations'].items()]
+    for name, current, previous in sections:
+        if previous.get('rps') and current['rps'] < previous['rps'] * (1 - tolerance):
+            regressions.append(f"{name}: rps {current['rps']} < baseline {previous['rps']}")
+        for key in ('p95_ms', 'p99_ms'):
+            if previous.get(key) and current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {current[key]} > baseline {previous[key]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive a mixed workload against the API.")
+    parser.add_argument('--url', help="Target an already running server instead of starting one")
+    parser.add_argument('--database-url', help="Database for the started server (default: temporary SQLite file)")
+    parser.add_argument('--jwks-port', type=int, default=0, help="Port for the stand-in JWKS server")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help="Measured seconds")
+    parser.add_argument('--warmup', type=float, default=2.0, help="Unmeasured warm-up seconds")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="Operation weights, e.g. 'get_tool=50,list_tools=50'")
+    parser.add_argument('--seed-users', type=int, default=20)
+    parser.add_argument('--seed-tools', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--baseline', help="Fail if results regress against this JSON file")
+    parser.add_argument('--save-baseline', help="Store the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+    # A gate that silently compares against nothing would always pass
+    if args.baseline and not os.path.exists(args.baseline):
+        parser.error(f"baseline {args.baseline} not found; record one with --save-baseline")
+
+    ops, weights = parse_mix(args.mix)
+
+    private_pem, jwk = generate_signing_key()
+    jwks_server = JWKSServer(jwk, port=args.jwks_port).start()
+    token = sign_token(private_pem)
+
+    server_process = None
+    target = args.url
+    tmpdir = None
+    try:
+        if target is None:
+            database_url = args.database_url
+            if database_url is None:
+                tmpdir = tempfile.mkdtemp(prefix='bench_load_')
+                database_url = 'sqlite:///' + os.path.join(tmpdir, 'bench.db')
+            ctx = multiprocessing.get_context('spawn')
+            port_queue = ctx.Queue()
+            server_process = ctx.Process(
+                target=serve_app,
+                args=(database_url, jwks_server.url, args.seed_users, args.seed_tools, port_queue),
+                daemon=True
+            )
+            server_process.start()
+            target = f'http://127.0.0.1:{port_queue.get(timeout=60)}'
+        else:
+            print(f"Stand-in JWKS served at {jwks_server.url}", file=sys.stderr)
+
+        latencies, errors, elapsed = run_load(target, token, ops, weights, args.concurrency,
+                                              args.duration, args.warmup, args.seed)
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            server_process.join()
+        jwks_server.stop()
+        if tmpdir is not None:
+            for name in os.listdir(tmpdir):
+                os.remove(os.path.join(tmpdir, name))
+            os.rmdir(tmpdir)
+
+    report = build_report(latencies, errors, elapsed, args)
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        write_json(args.output, report)
+    if args.save_baseline:
+        write_json(args.save_baseline, report)
+
+    baseline = load_json(args.baseline)
+    if baseline is not None:
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("Performance regressions detected:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  - {regression}", file=sys.stderr)
+            sys.exit(1)
+        print("No regressions against baseline.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+"""
+Microbenchmarks for the Request Hot Path
+
+Times the individual pieces every authenticated request goes through, in
+process and offline, with a fixed iteration count:
+
+- get_token_auth_header: parsing the Authorization header
+- verify_decode_jwt: RS256 verification against a locally generated key
+  (the JWKS cache is filled directly, so no network is involved)
+- check_permissions: the RBAC check
+- tool_serialize / user_serialize: model serialization
+- blueprint_dispatch: a full WSGI round trip through the api_bp blueprint
+
+For each benchmark the ops/sec and the transient memory allocated by one call
+(peak traced by tracemalloc) are reported. Results can be saved as JSON and
+compared with an earlier run.
+
+Usage:
+    python benchmarks/bench_micro.py --iterations 20000 --output micro.json
+    python benchmarks/bench_micro.py --compare micro.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from common import (configure_environment, generate_signing_key, sign_token,
+                    load_json, write_json)
+
+# Calls sampled under tracemalloc to measure allocations; tracing is slow,
+# so this is much smaller than the timed iteration count
+ALLOCATION_SAMPLES = 200
+
+
+def build_benchmarks():
+    """
+    Set up the app and fixtures and return a dict of benchmark name -> callable.
+    """
+    configure_environment()
+
+    import auth
+    from app import create_app
+    from config import SQLiteTestConfig
+    from models import Tool, User
+
+    private_pem, jwk = generate_signing_key()
+    auth._jwks_cache['jwks'] = {'keys': [jwk]}
+    auth._jwks_cache['fetched_at'] = time.monotonic()
+    token = sign_token(private_pem)
+    payload = auth.verify_decode_jwt(token)
+
+    app = create_app(SQLiteTestConfig)
+    request_context = app.test_request_context(headers={'Authorization': f'Bearer {token}'})
+    request_context.push()
+    client = app.test_client()
+
+    tool = Tool(id=1, name='Nmap', description='Network scanning tool used to discover hosts and services.',
+                created_at=datetime(2025, 1, 20, 3, 15, 24), user_id=1)
+    user = User(id=1, username='admin_user', email='admin@example.com')
+
+    def blueprint_dispatch():
+        response = client.get('/api/')
+        response.close()
+
+    return {
+        'get_token_auth_header': auth.get_token_auth_header,
+        'verify_decode_jwt': lambda: auth.verify_decode_jwt(token),
+        'check_permissions': lambda: auth.check_permissions('update:tools', payload),
+        'tool_serialize': tool.serialize,
+        'user_serialize': user.serialize,
+        'blueprint_dispatch': blueprint_dispatch,
+    }
+
+
+def time_benchmark(func, iterations, repeats):
+    """Return the best and median ops/sec over several timed runs."""
+    rates = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - start
+        rates.append(iterations / elapsed)
+    return max(rates), statistics.median(rates)
+
+
+def measure_allocations(func, samples):
+    """
+    Return the median peak bytes allocated during one call, and the bytes
+    still held after all samples (a non-zero value hints at a leak or a cache).
+    """
+    tracemalloc.start()
+    try:
+        func()  # Fill any lazily initialised state before measuring
+        baseline, _ = tracemalloc.get_traced_memory()
+        peaks = []
+        for _ in range(samples):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - current)
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(peaks), retained - baseline
+
+
+def run(benchmarks, iterations, repeats, only=None):
+    results = {}
+    for name, func in benchmarks.items():
+        if only and name not in only:
+            continue
+        # Warm up caches and code paths before timing
+        for _ in range(min(iterations, 100)):
+            func()
+        best, median = time_benchmark(func, iterations, repeats)
+        peak_bytes, retained_bytes = measure_allocations(func, ALLOCATION_SAMPLES)
+        results[name] = {
+            'ops_per_sec': round(best, 1),
+            'median_ops_per_sec': round(median, 1),
+            'us_per_op': round(1e6 / best, 3),
+            'alloc_peak_bytes_per_op': int(peak_bytes),
+            'alloc_retained_bytes': int(retained_bytes),
+        }
+        print(f"{name:24s} {best:12,.0f} ops/s {1e6 / best:10.2f} us/op {int(peak_bytes):8d} B/op",
+              file=sys.stderr)
+    return results
+
+
+def compare(current, previous):
+    """Print the relative change in ops/sec for each benchmark present in both runs."""
+    print("\nChange against previous run:", file=sys.stderr)
+    for name, stats in current.items():
+        before = previous.get('benchmarks', {}).get(name)
+        if not before:
+            continue
+        change = (stats['ops_per_sec'] - before['ops_per_sec']) / before['ops_per_sec'] * 100
+        print(f"{name:24s} {change:+7.1f}% ops/s  "
+              f"{stats['alloc_peak_bytes_per_op'] - before['alloc_peak_bytes_per_op']:+8d} B/op",
+              file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark the request hot path.")
+    parser.add_argument('--iterations', type=int, default=10000, help="Calls per timed run")
+    parser.add_argument('--repeats', type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument('--only', nargs='*', help="Run only these benchmarks")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--compare', help="Compare with the results in this JSON file")
+    args = parser.parse_args()
+
+    results = run(build_benchmarks(), args.iterations, args.repeats, set(args.only or ()))
+    report = {
+        'benchmark': 'micro',
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'iterations': args.iterations,
+        'repeats': args.repeats,
+        'benchmarks': results,
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.compare:
+        previous = load_json(args.compare)
+        if previous is None:
+            print(f"Previous results {args.compare} not found.", file=sys.stderr)
+        else:
+            compare(results, previous)
+    if args.output:
+        write_json(args.output, report)
+
+
+if __name__ == "__main__":
+    main()
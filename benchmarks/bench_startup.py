@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""
+Startup Benchmark for Cybersecurity Tools Management API
+
+Measures how long a fresh worker takes to become useful:
+
+- import: importing app.py (which creates the module-level app)
+- create_app: building a second app instance from the factory
+- post_fork: resetting the connection pool as gunicorn's post_fork hook does
+- first_request: the first request served by the app, including pool checkout
+
+Each iteration runs in a fresh interpreter so import caches are cold.
+
+Usage:
+    python benchmarks/bench_startup.py --iterations 10 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from common import DEFAULT_ENV, ROOT, write_json
+
+# Runs inside the child interpreter and prints one JSON object with its timings
+CHILD_SCRIPT = '''
+import json, time
+t0 = time.perf_counter()
+import app as app_module
+t1 = time.perf_counter()
+app_module.create_app()
+t2 = time.perf_counter()
+app_module.dispose_engine(app_module.app)
+t3 = time.perf_counter()
+with app_module.app.app_context():
+    from models import db
+    db.create_all()
+client = app_module.app.test_client()
+t4 = time.perf_counter()
+response = client.get('/')
+t5 = time.perf_counter()
+assert response.status_code == 200
+print(json.dumps({
+    "import": t1 - t0,
+    "create_app": t2 - t1,
+    "post_fork": t3 - t2,
+    "first_request": t5 - t4,
+}))
+'''
+
+def run_once(env):
+    """Run one cold start in a child interpreter and return its timings."""
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    """Return median and max in milliseconds for each measured phase."""
+    summary = {}
+    for phase in samples[0]:
+        values = [sample[phase] * 1000 for sample in samples]
+        summary[phase] = {
+            'median_ms': round(statistics.median(values), 3),
+            'max_ms': round(max(values), 3),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark application cold start.")
+    parser.add_argument('--iterations', type=int, default=5, help="Number of cold starts to measure")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    env = dict(DEFAULT_ENV)
+    env.update(os.environ)
+
+    samples = [run_once(env) for _ in range(args.iterations)]
+    results = {
+        'benchmark': 'startup',
+        'iterations': args.iterations,
+        'phases': summarize(samples),
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        write_json(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+"""
+Autocomplete Benchmark
+
+Measures the latency of the in-memory name index behind GET /api/tools/suggest
+at a realistic catalog size (one million names by default), in process and
+without a database:
+
+- build: time to load every name, as on a worker's first suggest request
+- prefix_1 .. prefix_4: queries of 1-4 characters typed from a random name
+- typo: a query of 5-10 characters with one character dropped, swapped or
+  replaced, answered by the one-edit fuzzy matcher
+- miss: a query that matches nothing
+- update: renaming a tool, as applied from the tool_changed signal
+
+Names are generated from vendor, product and edition words with a fixed
+seed, so runs are comparable.
+
+Usage:
+    python benchmarks/bench_suggest.py --names 1000000 --queries 2000
+    python benchmarks/bench_suggest.py --names 100000 --output suggest.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import resource
+import sys
+import time
+
+from common import latency_summary, write_json
+
+VENDORS = ['acme', 'blue', 'cyber', 'dark', 'echo', 'falcon', 'ghost', 'hydra', 'iron', 'jade',
+           'kraken', 'lynx', 'metasploit', 'nessus', 'open', 'phantom', 'quantum', 'red', 'shadow',
+           'titan', 'ultra', 'vortex', 'white', 'xeno', 'yara', 'zero']
+PRODUCTS = ['scanner', 'proxy', 'fuzzer', 'sniffer', 'cracker', 'mapper', 'forensics', 'sandbox',
+            'firewall', 'monitor', 'auditor', 'decoder', 'debugger', 'tracer', 'vault', 'shield',
+            'hunter', 'sentinel', 'analyzer', 'inspector']
+EDITIONS = ['', ' pro', ' lite', ' enterprise', ' community', ' cloud', ' x', ' next']
+
+
+def generate_names(count, rng):
+    """Generate count tool names such as 'Hydra Proxy Pro 417'."""
+    names = []
+    for _ in range(count):
+        name = f'{rng.choice(VENDORS)} {rng.choice(PRODUCTS)}{rng.choice(EDITIONS)} {rng.randrange(1000)}'
+        names.append(name.title())
+    return names
+
+
+def misspell(word, rng):
+    """Drop, swap or replace one character of a word (not the first)."""
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(('drop', 'swap', 'replace'))
+    if kind == 'drop':
+        return word[:i] + word[i + 1:]
+    if kind == 'swap':
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[i + 1:]
+
+
+def time_queries(index, queries, limit):
+    latencies = []
+    matched = 0
+    for query in queries:
+        started = time.perf_counter()
+        results = index.suggest(query, limit)
+        latencies.append(time.perf_counter() - started)
+        matched += bool(results)
+    summary = latency_summary(latencies)
+    summary['matched'] = matched
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the autocomplete name index.")
+    parser.add_argument('--names', type=int, default=1000000, help="Names in the index")
+    parser.add_argument('--queries', type=int, default=2000, help="Queries per kind")
+    parser.add_argument('--limit', type=int, default=10, help="Suggestions per query")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    from suggest import NameIndex
+
+    rng = random.Random(args.seed)
+    names = generate_names(args.names, rng)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    index = NameIndex()
+    gc.disable()
+    started = time.perf_counter()
+    index.add_many(list(enumerate(names, start=1)))
+    build_s = time.perf_counter() - started
+    gc.enable()
+    # ru_maxrss is in kilobytes on Linux
+    rss_growth_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+
+    results = {
+        'python': platform.python_version(),
+        'names': args.names,
+        'limit': args.limit,
+        'build_s': round(build_s, 2),
+        'rss_growth_mb': round(rss_growth_mb, 1),
+        'queries': {},
+    }
+    print(f"build: {build_s:.2f}s for {args.names} names, +{rss_growth_mb:.0f} MB RSS")
+
+    samples = [rng.choice(names).lower() for _ in range(args.queries)]
+    kinds = {f'prefix_{n}': [name[:n] for name in samples] for n in range(1, 5)}
+    kinds['typo'] = [misspell(name[:rng.randrange(5, 11)], rng) for name in samples]
+    kinds['miss'] = [f'qqq{i}' for i in range(args.queries)]
+    for kind, queries in kinds.items():
+        results['queries'][kind] = time_queries(index, queries, args.limit)
+        print(f"{kind:>10}: {json.dumps(results['queries'][kind])}")
+
+    latencies = []
+    for i in range(min(args.queries, 1000)):
+        tool_id = rng.randrange(1, args.names + 1)
+        started = time.perf_counter()
+        index.add(tool_id, f'Renamed Tool {i}')
+        latencies.append(time.perf_counter() - started)
+    results['update'] = latency_summary(latencies)
+    print(f"{'update':>10}: {json.dumps(results['update'])}")
+
+    if args.output:
+        write_json(args.output, results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
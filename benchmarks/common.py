@@ -0,0 +1,191 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Provides an offline stand-in for Auth0: a locally generated RSA key, a JWKS
+endpoint served from a background thread, and RS256 tokens signed with that key.
+Also provides percentile and baseline-comparison helpers.
+"""
+
+import base64
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+BENCH_AUTH0_DOMAIN = 'bench.example.com'
+BENCH_API_AUDIENCE = 'https://bench.example.com/api'
+BENCH_KEY_ID = 'bench-key'
+
+ALL_PERMISSIONS = ['read:tools', 'create:tools', 'update:tools', 'delete:tools']
+
+# Settings used when the environment does not provide them, so the benchmarks run offline
+DEFAULT_ENV = {
+    'SECRET_KEY': 'bench-secret-key',
+    'JWT_SECRET_KEY': 'bench-jwt-secret-key',
+    'DATABASE_URL': 'sqlite://',
+    'AUTH0_DOMAIN': BENCH_AUTH0_DOMAIN,
+    'API_AUDIENCE': BENCH_API_AUDIENCE,
+    'ENABLE_MIGRATE': 'false',
+    # A single benchmark token would otherwise be throttled by the per-subject limiter
+    'RATELIMIT_ENABLED': 'false',
+}
+
+
+def _b64url_uint(value):
+    """Encode an integer as unpadded base64url, as used by JWK 'n' and 'e'."""
+    raw = value.to_bytes((value.bit_length() + 7) // 8, 'big')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def generate_signing_key(bits=2048):
+    """
+    Generate an RSA key pair for signing benchmark tokens.
+
+    Uses the cryptography package when it is installed and falls back to
+    python-rsa (a python-jose dependency), which is much slower to generate keys.
+
+    Returns:
+        tuple: (private key PEM string, public JWK dict)
+    """
+    try:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa as crypto_rsa
+
+        private_key = crypto_rsa.generate_private_key(public_exponent=65537, key_size=bits)
+        pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption()
+        ).decode('ascii')
+        numbers = private_key.public_key().public_numbers()
+        n, e = numbers.n, numbers.e
+    except ImportError:
+        import rsa
+
+        public_key, private_key = rsa.newkeys(bits)
+        pem = private_key.save_pkcs1().decode('ascii')
+        n, e = public_key.n, public_key.e
+
+    jwk = {
+        'kty': 'RSA',
+        'kid': BENCH_KEY_ID,
+        'use': 'sig',
+        'alg': 'RS256',
+        'n': _b64url_uint(n),
+        'e': _b64url_uint(e),
+    }
+    return pem, jwk
+
+
+def sign_token(private_pem, permissions=None, subject='bench|user', expires_in=3600,
+               domain=BENCH_AUTH0_DOMAIN, audience=BENCH_API_AUDIENCE):
+    """
+    Sign an RS256 access token shaped like the ones Auth0 issues for this API.
+
+    Returns:
+        str: The encoded token.
+    """
+    from jose import jwt
+
+    now = int(time.time())
+    claims = {
+        'iss': f'https://{domain}/',
+        'sub': subject,
+        'aud': audience,
+        'iat': now,
+        'exp': now + expires_in,
+        'permissions': list(ALL_PERMISSIONS if permissions is None else permissions),
+    }
+    return jwt.encode(claims, private_pem, algorithm='RS256', headers={'kid': BENCH_KEY_ID})
+
+
+class JWKSServer:
+    """
+    A stand-in for the Auth0 JWKS endpoint, served from a background thread.
+    """
+
+    def __init__(self, jwk, host='127.0.0.1', port=0):
+        body = json.dumps({'keys': [jwk]}).encode('utf-8')
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/.well-known/jwks.json'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def configure_environment(jwks_url=None, database_url=None):
+    """
+    Fill in the settings the app needs before it is imported.
+
+    Values already present in the environment win, except the JWKS URL and
+    database URL, which are set explicitly when given.
+    """
+    for key, value in DEFAULT_ENV.items():
+        os.environ.setdefault(key, value)
+    if jwks_url:
+        os.environ['AUTH0_JWKS_URL'] = jwks_url
+    if database_url:
+        os.environ['DATABASE_URL'] = database_url
+
+
+def percentile(sorted_values, pct):
+    """Return the pct-th percentile of an already sorted list (nearest-rank)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def latency_summary(latencies):
+    """Summarize a list of latencies in seconds as p50/p95/p99/max in milliseconds."""
+    values = sorted(latencies)
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p95_ms': round(percentile(values, 95) * 1000, 3),
+        'p99_ms': round(percentile(values, 99) * 1000, 3),
+        'max_ms': round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def write_json(path, data):
+    """Write benchmark results to a JSON file."""
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def load_json(path):
+    """Read benchmark results from a JSON file, or None if it does not exist."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
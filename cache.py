@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from models import User
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    A bounded, thread-safe cache whose entries expire after ttl seconds.
+
+    When the cache is full the least recently used entry is evicted.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, key, default=None):
+        with self._lock:
+            value, expires = self._entries.get(key, (_MISSING, 0))
+            if value is _MISSING or expires <= self.clock():
+                self._entries.pop(key, None)
+                self.metrics['misses'] += 1
+                return default
+            self._entries.move_to_end(key)
+            self.metrics['hits'] += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, _MISSING) is not _MISSING:
+                self.metrics['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def user_exists(user_id):
+    """
+    Check that a user exists, answering from the user cache when possible.
+
+    Only users that exist are cached, so a user created in another worker
+    process is found immediately. A user deleted in another process may still
+    be reported as existing for up to USER_CACHE_TTL seconds; the foreign key
+    on tool.user_id still rejects tools for it.
+
+    Args:
+        user_id (int): ID of the user
+
+    Returns:
+        bool: True if the user exists
+    """
+    cache = current_app.extensions.get('user_cache')
+    if cache is None:
+        return User.get_user(user_id) is not None
+
+    if cache.get(user_id):
+        return True
+    exists = User.get_user(user_id) is not None
+    if exists:
+        cache.set(user_id, True)
+    return exists
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_cached_user(mapper, connection, target):
+    if not has_app_context():
+        return
+    cache = current_app.extensions.get('user_cache')
+    if cache is not None:
+        cache.invalidate(target.id)
+
+
+def init_user_cache(app):
+    """
+    Enable the per-process user lookup cache when USER_CACHE_TTL is positive.
+    """
+    ttl = app.config.get('USER_CACHE_TTL', 0)
+    if ttl > 0:
+        app.extensions['user_cache'] = TTLCache(app.config.get('USER_CACHE_SIZE', 10000), ttl)
@@ -0,0 +1,22 @@
+"""
+Python client for the Cybersecurity Tools Management API.
+"""
+
+from .aio import AsyncToolsClient
+from .auth import ClientCredentials, StaticToken
+from .client import ToolsClient
+from .errors import ApiError, AuthenticationError, ClientError
+from .pool import ConnectionPool
+
+__version__ = '0.1.0'
+
+__all__ = [
+    'ApiError',
+    'AsyncToolsClient',
+    'AuthenticationError',
+    'ClientCredentials',
+    'ClientError',
+    'ConnectionPool',
+    'StaticToken',
+    'ToolsClient',
+]
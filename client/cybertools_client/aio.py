@@ -0,0 +1,83 @@
+import asyncio
+import functools
+
+from .client import ToolsClient
+
+_DONE = object()
+
+
+class AsyncToolsClient:
+    """
+    An asyncio variant of ToolsClient with the same methods, as coroutines
+    and async iterators.
+
+    Requests run on the default executor's threads over the shared connection
+    pool, so up to pool_size of them are in flight at once and the event loop
+    is never blocked, without depending on a third-party HTTP library.
+
+    Example:
+        async with AsyncToolsClient(base_url, auth) as client:
+            tools = await asyncio.gather(*(client.get_tool(tool_id) for tool_id in ids))
+            async for tool in client.list_tools():
+                ...
+    """
+
+    def __init__(self, base_url, auth, **options):
+        self.client = ToolsClient(base_url, auth, **options)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def _iterate(self, iterator):
+        try:
+            while True:
+                item = await self._run(next, iterator, _DONE)
+                if item is _DONE:
+                    return
+                yield item
+        finally:
+            # Releases the connection of a stream left before its end
+            await self._run(iterator.close)
+
+    async def close(self):
+        await self._run(self.client.close)
+
+    async def request(self, method, path, params=None, json_body=None, idempotency_key=None):
+        return await self._run(self.client.request, method, path, params, json_body, idempotency_key)
+
+    async def get_tool(self, tool_id):
+        return await self._run(self.client.get_tool, tool_id)
+
+    async def get_tools(self, tool_ids):
+        return await self._run(self.client.get_tools, tool_ids)
+
+    async def create_tool(self, name, description, user_id, tags=None, idempotency_key=None):
+        return await self._run(self.client.create_tool, name, description, user_id, tags, idempotency_key)
+
+    async def update_tool(self, tool_id, **fields):
+        return await self._run(self.client.update_tool, tool_id, **fields)
+
+    async def delete_tool(self, tool_id):
+        return await self._run(self.client.delete_tool, tool_id)
+
+    async def import_tools(self, tools):
+        return await self._run(self.client.import_tools, tools)
+
+    def list_tools(self, tags=None, page_size=None):
+        return self._iterate(self.client.list_tools(tags, page_size))
+
+    def iter_changes(self, since=0, page_size=None):
+        return self._iterate(self.client.iter_changes(since, page_size))
+
+    def export_tools(self):
+        return self._iterate(self.client.export_tools())
+
+    def stream_events(self, last_event_id=None):
+        return self._iterate(self.client.stream_events(last_event_id))
@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from .errors import AuthenticationError
+
+
+class StaticToken:
+    """
+    A fixed access token, for callers that obtain tokens themselves.
+    """
+
+    def __init__(self, token):
+        self.token = token
+
+    def get_token(self):
+        return self.token
+
+    def invalidate(self, token=None):
+        """A fixed token cannot be renewed; the request fails with the API's 401."""
+
+
+class ClientCredentials:
+    """
+    Access tokens from the Auth0 client credentials grant, cached until shortly before they expire.
+
+    A token is reused by every request, in every thread, until less than
+    refresh_margin seconds of its lifetime remain; the next request then
+    fetches a new one. Only one thread fetches at a time; the others wait for
+    its token rather than making their own request.
+
+    Args:
+        domain (str): The Auth0 tenant domain, e.g. 'example.us.auth0.com'
+        client_id (str): The machine-to-machine application's client ID
+        client_secret (str): The application's client secret
+        audience (str): The API identifier the token is issued for
+        token_url (str): Overrides https://<domain>/oauth/token, e.g. for a local stand-in
+        refresh_margin (float): Seconds before expiry at which a token is renewed
+        timeout (float): Seconds to wait for the token endpoint
+    """
+
+    def __init__(self, domain, client_id, client_secret, audience, token_url=None, refresh_margin=60.0,
+                 timeout=10.0, clock=time.monotonic):
+        self.token_url = token_url or f'https://{domain}/oauth/token'
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.audience = audience
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self.clock = clock
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    def _fresh(self):
+        return self._token is not None and self.clock() < self._expires_at - self.refresh_margin
+
+    def get_token(self):
+        """
+        Return a token with more than refresh_margin seconds left, fetching one if needed.
+
+        Raises:
+            AuthenticationError: If the token endpoint refuses the credentials or cannot be reached
+        """
+        if self._fresh():
+            return self._token
+        with self._lock:
+            if not self._fresh():
+                self._fetch()
+            return self._token
+
+    def invalidate(self, token=None):
+        """
+        Drop the cached token, e.g. after the API rejected it with 401.
+
+        Args:
+            token (str): Only drop the cached token if it is still this one, so that
+                concurrent failures with the same token cause a single refresh
+        """
+        with self._lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._expires_at = 0.0
+
+    def _fetch(self):
+        body = json.dumps({
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            'audience': self.audience,
+            'grant_type': 'client_credentials',
+        }).encode('utf-8')
+        request = Request(self.token_url, data=body, headers={'Content-Type': 'application/json'}, method='POST')
+        requested_at = self.clock()
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                data = json.loads(response.read())
+        except HTTPError as e:
+            raise AuthenticationError(f'Token request failed with status {e.code}', status=e.code) from e
+        except (OSError, ValueError) as e:
+            raise AuthenticationError(f'Token request failed: {e}') from e
+        if 'access_token' not in data:
+            raise AuthenticationError('Token response has no access_token')
+
+        self.fetches += 1
+        self._token = data['access_token']
+        # Counted from when the request was sent, so a slow response never overstates the lifetime
+        self._expires_at = requested_at + float(data.get('expires_in', 86400))
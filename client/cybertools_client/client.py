@@ -0,0 +1,337 @@
+import http.client
+import json
+import time
+import uuid
+from urllib.parse import urlencode
+
+from .errors import ApiError
+from .pool import ConnectionPool
+
+# Methods that may be sent again when a kept-alive connection turns out to be
+# closed. PATCH in this API sets fields to the given values, so repeating it is harmless.
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'PATCH', 'DELETE'}
+
+# Errors raised when the server closed an idle kept-alive connection
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+# Largest number of IDs the API accepts in one batch lookup
+BATCH_GET_MAX_IDS = 100
+
+
+def _error_message(data):
+    return data.get('message', '') if isinstance(data, dict) else str(data)
+
+
+def _decode(body):
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return body.decode('utf-8', 'replace')
+
+
+class ToolsClient:
+    """
+    A client for the Cybersecurity Tools Management API.
+
+    Requests share a pool of keep-alive connections and a cached access
+    token, so one client should be created per process and shared between
+    threads. Listings are paged through transparently.
+
+    Args:
+        base_url (str): e.g. 'https://cybersecurity-tools-api.onrender.com'
+        auth: A ClientCredentials or StaticToken
+        pool_size (int): Most connections open at once
+        timeout (float): Socket timeout in seconds
+        retries (int): Times a request rejected with 429 or 503 is retried
+        max_retry_wait (float): Longest Retry-After, in seconds, that is waited for
+        page_size (int): Tools fetched per request when paging through listings
+
+    Example:
+        auth = ClientCredentials(domain, client_id, client_secret, audience)
+        with ToolsClient('https://cybersecurity-tools-api.onrender.com', auth) as client:
+            for tool in client.list_tools(tags=['scanner']):
+                print(tool['name'])
+    """
+
+    def __init__(self, base_url, auth, pool_size=10, timeout=30.0, retries=2, max_retry_wait=10.0,
+                 page_size=100, ssl_context=None):
+        self.pool = ConnectionPool(base_url, maxsize=pool_size, timeout=timeout, ssl_context=ssl_context)
+        self.auth = auth
+        self.retries = retries
+        self.max_retry_wait = max_retry_wait
+        self.page_size = page_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.close()
+
+    def _open(self, method, path, params=None, body=None, headers=None):
+        """
+        Send a request and return its response with the connection it arrived on.
+
+        Retries once on a stale kept-alive connection (idempotent methods, or a
+        request carrying an Idempotency-Key),
+        once with a new token after a 401, and up to self.retries times after a
+        429 or 503 whose Retry-After is short enough. A streamed body cannot be
+        sent twice, so its request is never retried.
+
+        Returns:
+            tuple: (connection, response) for a response with status below 400
+
+        Raises:
+            ApiError: For any other response
+        """
+        url = self.pool.base_path + '/api' + path
+        if params:
+            url += '?' + urlencode(params, doseq=True)
+        streamed = body is not None and not isinstance(body, (bytes, str))
+        refreshed = False
+        attempt = 0
+        while True:
+            token = self.auth.get_token()
+            request_headers = {'Authorization': f'Bearer {token}', 'Accept': 'application/json'}
+            request_headers.update(headers or {})
+
+            connection, reused = self.pool.acquire()
+            try:
+                connection.request(method, url, body=body, headers=request_headers, encode_chunked=streamed)
+                response = connection.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                self.pool.release(connection, reusable=False)
+                retryable = method in IDEMPOTENT_METHODS or 'Idempotency-Key' in request_headers
+                if reused and retryable and not streamed:
+                    continue
+                raise
+            except BaseException:
+                self.pool.release(connection, reusable=False)
+                raise
+
+            if response.status < 400:
+                return connection, response
+
+            data = _decode(response.read())
+            self.pool.release(connection, reusable=not response.will_close)
+            if response.status == 401 and not refreshed and not streamed:
+                # The token may have been revoked or rotated; retry once with a new one
+                self.auth.invalidate(token)
+                refreshed = True
+                continue
+            if response.status in (429, 503) and attempt < self.retries and not streamed:
+                retry_after = float(response.getheader('Retry-After') or 1)
+                if retry_after <= self.max_retry_wait:
+                    attempt += 1
+                    time.sleep(retry_after)
+                    continue
+            raise ApiError(response.status, _error_message(data), data)
+
+    def request(self, method, path, params=None, json_body=None, idempotency_key=None):
+        """
+        Send a request and decode its JSON response.
+
+        Args:
+            method (str): HTTP method
+            path (str): Path below /api, e.g. '/tools/1'
+            params (dict): Query string parameters
+            json_body: Request body, encoded as JSON
+            idempotency_key (str): Sent as Idempotency-Key, so the API answers a
+                retry with the first response instead of repeating the operation
+
+        Returns:
+            The decoded response body
+
+        Raises:
+            ApiError: For an error response
+        """
+        body = None
+        headers = {}
+        if json_body is not None:
+            body = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        if idempotency_key is not None:
+            headers['Idempotency-Key'] = idempotency_key
+        connection, response = self._open(method, path, params, body, headers)
+        try:
+            data = response.read()
+        except BaseException:
+            self.pool.release(connection, reusable=False)
+            raise
+        self.pool.release(connection, reusable=not response.will_close)
+        return _decode(data)
+
+    def _lines(self, path, params=None, headers=None):
+        """
+        Yield the lines of a streamed response as they arrive.
+
+        The connection goes back to the pool once the response has been read to
+        the end; a stream abandoned before that closes its connection.
+        """
+        connection, response = self._open('GET', path, params, headers=headers)
+        finished = False
+        try:
+            for line in response:
+                yield line.decode('utf-8')
+            finished = True
+        finally:
+            self.pool.release(connection, reusable=finished and not response.will_close)
+
+    def get_tool(self, tool_id):
+        """
+        Returns:
+            dict: The tool
+
+        Raises:
+            ApiError: With status 404 if the tool does not exist
+        """
+        return self.request('GET', f'/tools/{tool_id}')['tool']
+
+    def list_tools(self, tags=None, page_size=None):
+        """
+        Iterate over every tool, fetching a page at a time.
+
+        Args:
+            tags (list): Only yield tools that carry all of these tags
+            page_size (int): Tools per request; defaults to the client's page_size
+
+        Yields:
+            dict: Each tool, in ID order
+        """
+        params = {'limit': page_size or self.page_size}
+        if tags:
+            params['tag'] = list(tags)
+        while True:
+            page = self.request('GET', '/tools', params)
+            yield from page['tools']
+            if not page.get('has_more'):
+                return
+            params['after'] = page['next_after']
+
+    def get_tools(self, tool_ids):
+        """
+        Look up many tools by ID, BATCH_GET_MAX_IDS per request.
+
+        Returns:
+            dict: The tools found, keyed by ID; unknown and deleted IDs are absent
+        """
+        tool_ids = list(dict.fromkeys(tool_ids))
+        found = {}
+        for start in range(0, len(tool_ids), BATCH_GET_MAX_IDS):
+            data = self.request('POST', '/tools/batch-get', json_body={'ids': tool_ids[start:start + BATCH_GET_MAX_IDS]})
+            found.update((tool['id'], tool) for tool in data['tools'])
+        return found
+
+    def create_tool(self, name, description, user_id, tags=None, idempotency_key=None):
+        """
+        Create a tool. The request carries an Idempotency-Key (a random one unless
+        given), so retrying it never creates the tool twice.
+
+        Returns:
+            dict: The new tool
+        """
+        body = {'name': name, 'description': description, 'user_id': user_id}
+        if tags is not None:
+            body['tags'] = list(tags)
+        key = idempotency_key or str(uuid.uuid4())
+        return self.request('POST', '/tools', json_body=body, idempotency_key=key)['tool']
+
+    def update_tool(self, tool_id, **fields):
+        """
+        Change a tool's name, description or tags.
+
+        Returns:
+            dict: The updated tool
+        """
+        return self.request('PATCH', f'/tools/{tool_id}', json_body=fields)['tool']
+
+    def delete_tool(self, tool_id):
+        """
+        Returns:
+            int: The ID of the deleted tool
+        """
+        return self.request('DELETE', f'/tools/{tool_id}')['deleted']
+
+    def iter_changes(self, since=0, page_size=None):
+        """
+        Iterate over the change feed from a change sequence number until it is caught up.
+
+        Yields:
+            dict: Each change; deleted tools are tombstones with 'deleted': True.
+            Resume later from the last change's 'change_seq'.
+        """
+        params = {'since': since, 'limit': page_size or self.page_size}
+        while True:
+            page = self.request('GET', '/tools/changes', params)
+            yield from page['changes']
+            if not page.get('has_more'):
+                return
+            params['since'] = page['next_since']
+
+    def export_tools(self):
+        """
+        Stream the whole catalog without loading it into memory.
+
+        Yields:
+            dict: Each tool
+        """
+        for line in self._lines('/tools/export', {'format': 'ndjson'}):
+            if line.strip():
+                yield json.loads(line)
+
+    def import_tools(self, tools):
+        """
+        Upload tools as a streamed NDJSON body, encoded as the iterable is consumed.
+
+        Args:
+            tools: An iterable of dicts with name, description and user_id
+
+        Returns:
+            dict: The import summary (imported and skipped counts, and errors)
+        """
+        def ndjson():
+            for tool in tools:
+                yield (json.dumps(tool) + '\n').encode('utf-8')
+
+        connection, response = self._open('POST', '/tools/import', {'format': 'ndjson'}, ndjson(),
+                                          {'Content-Type': 'application/x-ndjson'})
+        try:
+            data = response.read()
+        except BaseException:
+            self.pool.release(connection, reusable=False)
+            raise
+        self.pool.release(connection, reusable=not response.will_close)
+        return _decode(data)
+
+    def stream_events(self, last_event_id=None):
+        """
+        Follow the Server-Sent Events stream of tool changes.
+
+        The stream does not end on its own; stop iterating to close it.
+
+        Args:
+            last_event_id (int): Replay the changes after this event ID first
+
+        Yields:
+            dict: Events with 'id', 'event' (e.g. 'tool.changed') and decoded 'data'
+        """
+        headers = {'Accept': 'text/event-stream'}
+        if last_event_id is not None:
+            headers['Last-Event-ID'] = str(last_event_id)
+        event = {}
+        for line in self._lines('/tools/stream', headers=headers):
+            line = line.rstrip('\r\n')
+            if not line:
+                if 'data' in event:
+                    event['data'] = json.loads(event['data'])
+                    yield event
+                event = {}
+            elif not line.startswith(':'):
+                field, _, value = line.partition(':')
+                value = value[1:] if value.startswith(' ') else value
+                if field == 'data' and 'data' in event:
+                    value = event['data'] + '\n' + value
+                if field in ('id', 'event', 'data'):
+                    event[field] = int(value) if field == 'id' and value.isdigit() else value
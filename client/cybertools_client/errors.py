@@ -0,0 +1,31 @@
+class ClientError(Exception):
+    """
+    Base class for the errors raised by the client.
+    """
+
+
+class AuthenticationError(ClientError):
+    """
+    Raised when an access token cannot be obtained.
+    """
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiError(ClientError):
+    """
+    Raised for an error response from the API.
+
+    Attributes:
+        status (int): The HTTP status code
+        message (str): The error message from the response body
+        body: The decoded response body, or its text if it is not JSON
+    """
+
+    def __init__(self, status, message, body=None):
+        super().__init__(f'{status}: {message}')
+        self.status = status
+        self.message = message
+        self.body = body
@@ -0,0 +1,95 @@
+import http.client
+import ssl
+import threading
+from urllib.parse import urlsplit
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of keep-alive HTTP connections to one host.
+
+    At most maxsize connections are open at once; a caller that needs one
+    beyond that waits for another to be released. Idle connections are
+    reused most recently released first, so a quiet pool keeps few sockets
+    warm and lets the rest be closed by the server.
+
+    Args:
+        base_url (str): e.g. 'https://cybersecurity-tools-api.onrender.com'
+        maxsize (int): Most connections open at once
+        timeout (float): Socket timeout in seconds
+        ssl_context: For https, defaults to ssl.create_default_context()
+    """
+
+    def __init__(self, base_url, maxsize=10, timeout=30.0, ssl_context=None):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f'Unsupported URL scheme: {base_url}')
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self._idle = []
+        self._closed = False
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self.metrics = {'created': 0, 'reused': 0, 'discarded': 0}
+
+    def _connect(self):
+        if self.scheme == 'https':
+            context = self.ssl_context or ssl.create_default_context()
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self, timeout=None):
+        """
+        Take a connection from the pool, opening one if none is idle.
+
+        Args:
+            timeout (float): Longest to wait for a free slot; None waits indefinitely
+
+        Returns:
+            tuple: (connection, reused) where reused is True for a kept-alive connection
+
+        Raises:
+            TimeoutError: If no slot became free in time
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f'No connection free in the pool after {timeout} seconds')
+        with self._lock:
+            if self._idle:
+                self.metrics['reused'] += 1
+                return self._idle.pop(), True
+            self.metrics['created'] += 1
+        return self._connect(), False
+
+    def release(self, connection, reusable=True):
+        """
+        Return a connection to the pool.
+
+        Args:
+            reusable (bool): False if the response was not read to the end or
+                the server asked to close the connection; it is closed instead
+        """
+        try:
+            with self._lock:
+                if reusable and not self._closed:
+                    self._idle.append(connection)
+                    return
+                self.metrics['discarded'] += 1
+            connection.close()
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close the idle connections. Connections in use are closed when released."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def __len__(self):
+        return len(self._idle)
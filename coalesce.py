@@ -0,0 +1,143 @@
+import threading
+from functools import wraps
+from flask import current_app, g, request
+from deadlines import remaining_time
+
+
+class _Call:
+    """
+    An in-flight computation that other requests can wait on.
+    """
+    __slots__ = ('event', 'result', 'failed', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.failed = False
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time and shares its result with
+    every caller that asks for the same key while it is running.
+
+    Only callers that overlap in time are coalesced; nothing is cached once
+    the computation finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.metrics = {'leaders': 0, 'coalesced': 0, 'wait_timeouts': 0, 'leader_errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.metrics[name] += 1
+
+    def waiters(self, key):
+        """Return the number of callers waiting on the in-flight computation for key."""
+        with self._lock:
+            call = self._calls.get(key)
+            return call.waiters if call else 0
+
+    def do(self, key, fn, timeout):
+        """
+        Run fn, or wait for an identical in-flight call to finish and reuse its result.
+
+        Args:
+            key: Identifies identical computations
+            fn (callable): Computes the result
+            timeout (float): Longest a follower waits before computing the result itself
+
+        Returns:
+            tuple: (result, shared) where shared is True if the result came from another caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.metrics['leaders'] += 1
+            else:
+                call.waiters += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException:
+                call.failed = True
+                self._count('leader_errors')
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.event.set()
+            return call.result, False
+
+        # Followers never wait longer than the bound, and recompute if the leader failed
+        if not call.event.wait(timeout):
+            self._count('wait_timeouts')
+            return fn(), False
+        if call.failed:
+            return fn(), False
+
+        self._count('coalesced')
+        return call.result, True
+
+
+def _request_key():
+    """
+    Build the coalescing key for the current request: route, query string and
+    the caller's permission set, so callers with different access never share a response.
+    """
+    payload = g.get('jwt_payload') or {}
+    permissions = tuple(sorted(payload.get('permissions', ())))
+    query = tuple(sorted(request.args.items(multi=True)))
+    return request.endpoint, tuple(sorted(request.view_args.items())), query, permissions
+
+
+def coalesce_requests(f):
+    """
+    A decorator that lets identical concurrent GET requests share one response.
+
+    Apply it below requires_auth so the permission set is known. The first
+    request computes and serializes the response; identical requests arriving
+    while it runs wait up to COALESCE_MAX_WAIT seconds and receive a copy of
+    the same status, headers and body, marked with an X-Coalesced header.
+
+    Coalescing only helps when a worker serves requests concurrently (threaded
+    workers); with one request per process there is nothing to share.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        coalescer = current_app.extensions.get('request_coalescer')
+        if coalescer is None or request.method != 'GET':
+            return f(*args, **kwargs)
+
+        def compute():
+            response = current_app.make_response(f(*args, **kwargs))
+            # Content-Length is recomputed for each copy
+            headers = [(name, value) for name, value in response.headers.items() if name != 'Content-Length']
+            return response.get_data(), response.status_code, headers
+
+        # A follower never waits past its own deadline for the leader
+        timeout = current_app.config.get('COALESCE_MAX_WAIT', 5.0)
+        left = remaining_time()
+        if left is not None:
+            timeout = max(0, min(timeout, left))
+
+        (body, status, headers), shared = coalescer.do(_request_key(), compute, timeout)
+        response = current_app.response_class(body, status=status, headers=headers)
+        if shared:
+            response.headers['X-Coalesced'] = '1'
+        return response
+    return wrapper
+
+
+def init_coalescing(app):
+    """
+    Enable request coalescing for the app when COALESCE_ENABLED is set.
+    """
+    if app.config.get('COALESCE_ENABLED', False):
+        app.extensions['request_coalescer'] = SingleFlight()
@@ -1,31 +1,185 @@
 # config.py
 import os
 from datetime import timedelta
+from dotenv import load_dotenv
+
+# Load the .env file before any settings are read so that values defined there
+# are visible to this module as well as to auth.py
+load_dotenv()
 
 
 class Config:
     """
     Base configuration class with default settings for the application.
     """
-    # Critical security settings - will raise error if not set
+    # Critical security settings - checked by validate() when the app is created
     SECRET_KEY = os.environ.get('SECRET_KEY')
-    if not SECRET_KEY:
-        raise ValueError("No SECRET_KEY set for Flask application. This is a required environment variable.")
-
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
-    if not JWT_SECRET_KEY:
-        raise ValueError("No JWT_SECRET_KEY set for Flask application. This is a required environment variable.")
 
     # Database URI without hardcoded credentials
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
-    if not SQLALCHEMY_DATABASE_URI:
-        raise ValueError("No DATABASE_URL set. This is a required environment variable.")
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_TOKEN_LOCATION = ['headers']  # or wherever you want to look for the JWT token (e.g., cookies, headers)
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)  # 1 hour
     JWT_HEADER_NAME = "Authorization"
 
+    # Flask-Migrate pulls in Alembic, which is only needed by the `flask db` commands.
+    # gunicorn.conf.py turns it off so workers boot faster.
+    ENABLE_MIGRATE = os.environ.get('ENABLE_MIGRATE', 'true').lower() == 'true'
+
+    # Per-subject, per-route token-bucket rate limiting (see ratelimit.py).
+    # Set RATELIMIT_STORAGE_PATH to a local file to share buckets between gunicorn workers.
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_RATE = float(os.environ.get('RATELIMIT_RATE', 10))
+    RATELIMIT_BURST = int(os.environ.get('RATELIMIT_BURST', 20))
+    RATELIMIT_STORAGE_PATH = os.environ.get('RATELIMIT_STORAGE_PATH')
+
+    # Requests a worker process handles at once before shedding load with 503; 0 disables the cap
+    MAX_IN_FLIGHT_REQUESTS = int(os.environ.get('MAX_IN_FLIGHT_REQUESTS', 0))
+
+    # Seconds a request may take before it is answered with 504 (see deadlines.py); 0 disables.
+    # Clients may shorten it with an X-Request-Timeout header. Per-endpoint overrides go in
+    # REQUEST_TIMEOUT_ROUTES; streaming and file transfer routes have no deadline.
+    REQUEST_TIMEOUT = float(os.environ.get('REQUEST_TIMEOUT', 30))
+    REQUEST_TIMEOUT_ROUTES = {
+        'api.stream_tools': 0,
+        'api.export_tools': 0,
+        'api.import_tools_file': 0,
+    }
+
+    # Identical concurrent GET requests on listing routes share one response (see coalesce.py)
+    COALESCE_ENABLED = os.environ.get('COALESCE_ENABLED', 'true').lower() == 'true'
+    COALESCE_MAX_WAIT = float(os.environ.get('COALESCE_MAX_WAIT', 5))
+
+    # Page size of GET /api/tools/changes, and the largest page a client may request
+    CHANGES_PAGE_SIZE = int(os.environ.get('CHANGES_PAGE_SIZE', 100))
+    CHANGES_MAX_PAGE_SIZE = int(os.environ.get('CHANGES_MAX_PAGE_SIZE', 1000))
+
+    # Largest page of GET /api/tools?limit=N
+    TOOLS_MAX_PAGE_SIZE = int(os.environ.get('TOOLS_MAX_PAGE_SIZE', 1000))
+
+    # Most tags a tool may carry
+    MAX_TAGS_PER_TOOL = int(os.environ.get('MAX_TAGS_PER_TOOL', 20))
+
+    # GET /api/tools/suggest (see suggest.py): 'memory' keeps a name index in each worker,
+    # refreshed from the change feed every SUGGEST_REFRESH_SECONDS; 'postgres' uses pg_trgm
+    SUGGEST_BACKEND = os.environ.get('SUGGEST_BACKEND', 'memory')
+    SUGGEST_REFRESH_SECONDS = float(os.environ.get('SUGGEST_REFRESH_SECONDS', 5))
+    SUGGEST_MAX_LIMIT = int(os.environ.get('SUGGEST_MAX_LIMIT', 25))
+
+    # GET /api/tools/stream: 'memory' fans events out within one worker process,
+    # 'postgres' across all workers through LISTEN/NOTIFY. Streams hold a worker for
+    # their whole duration, so serve them with threaded or async gunicorn workers.
+    EVENTS_BROKER = os.environ.get('EVENTS_BROKER', 'memory')
+    EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))
+    EVENTS_HEARTBEAT_INTERVAL = float(os.environ.get('EVENTS_HEARTBEAT_INTERVAL', 15))
+    EVENTS_STREAM_MAX_SECONDS = float(os.environ.get('EVENTS_STREAM_MAX_SECONDS', 300))
+
+    # Background jobs (see jobs.py): job threads per web worker process (0 to run jobs
+    # only with `flask run-jobs`), queue polling, heartbeat timeout and export directory
+    JOBS_WORKER_THREADS = int(os.environ.get('JOBS_WORKER_THREADS', 1))
+    JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', 1))
+    JOBS_STALE_AFTER = int(os.environ.get('JOBS_STALE_AFTER', 60))
+    JOBS_RESULT_DIR = os.environ.get('JOBS_RESULT_DIR')
+
+    # GET /api/tools/export rows fetched per cursor round trip, and
+    # POST /api/tools/import rows inserted per transaction (see transfer.py)
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 500))
+
+    # Most tool IDs one batch lookup (GET /api/tools?ids= or POST /api/tools/batch-get) may request
+    BATCH_GET_MAX_IDS = int(os.environ.get('BATCH_GET_MAX_IDS', 100))
+
+    # Write-behind audit log of tool changes (see audit.py). Entries are buffered in
+    # memory and written in batches; when the buffer is full, 'block' waits
+    # AUDIT_BLOCK_TIMEOUT seconds for room before dropping an entry, 'drop' drops it at once.
+    AUDIT_ENABLED = os.environ.get('AUDIT_ENABLED', 'true').lower() == 'true'
+    AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 500))
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 1))
+    AUDIT_OVERFLOW_POLICY = os.environ.get('AUDIT_OVERFLOW_POLICY', 'block')
+    AUDIT_BLOCK_TIMEOUT = float(os.environ.get('AUDIT_BLOCK_TIMEOUT', 1))
+    AUDIT_PAGE_SIZE = int(os.environ.get('AUDIT_PAGE_SIZE', 100))
+    AUDIT_MAX_PAGE_SIZE = int(os.environ.get('AUDIT_MAX_PAGE_SIZE', 1000))
+
+    # On-demand request profiling (see profiling.py). Callers with the profile:requests
+    # permission send `X-Profile: cpu` or `X-Profile: memory`; PROFILE_SAMPLE_RATE also
+    # profiles that fraction of requests automatically. The last PROFILE_KEEP profiles are kept.
+    PROFILE_ENABLED = os.environ.get('PROFILE_ENABLED', 'false').lower() == 'true'
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 100))
+
+    # Idempotency-Key support on the write endpoints (see idempotency.py): the first response to
+    # each key is replayed to retries for IDEMPOTENCY_TTL seconds; a retry of a request still
+    # running waits up to IDEMPOTENCY_MAX_WAIT seconds. Set IDEMPOTENCY_STORAGE_PATH to a local
+    # file to share stored responses between gunicorn workers.
+    IDEMPOTENCY_ENABLED = os.environ.get('IDEMPOTENCY_ENABLED', 'true').lower() == 'true'
+    IDEMPOTENCY_TTL = float(os.environ.get('IDEMPOTENCY_TTL', 3600))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.environ.get('IDEMPOTENCY_MAX_ENTRIES', 10000))
+    IDEMPOTENCY_MAX_WAIT = float(os.environ.get('IDEMPOTENCY_MAX_WAIT', 10))
+    IDEMPOTENCY_STORAGE_PATH = os.environ.get('IDEMPOTENCY_STORAGE_PATH')
+
+    # Archive tier (see archive.py): the tool_archive job moves retired tools, and tools created
+    # more than ARCHIVE_AFTER_DAYS days ago (0: only retired ones), out of the tool table,
+    # ARCHIVE_BATCH_SIZE tools per transaction. Queue it regularly with `flask archive-tools`.
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 500))
+
+    # Tool read counters (see usage.py): reads of GET /api/tools/:id are counted in memory and
+    # added to USAGE_BUCKET_SECONDS-wide buckets of the tool_usage table every USAGE_FLUSH_INTERVAL
+    # seconds. Buckets are kept USAGE_RETENTION_DAYS days, the longest GET /api/tools/popular window.
+    USAGE_ENABLED = os.environ.get('USAGE_ENABLED', 'true').lower() == 'true'
+    USAGE_BUCKET_SECONDS = int(os.environ.get('USAGE_BUCKET_SECONDS', 3600))
+    USAGE_FLUSH_INTERVAL = float(os.environ.get('USAGE_FLUSH_INTERVAL', 60))
+    USAGE_RETENTION_DAYS = int(os.environ.get('USAGE_RETENTION_DAYS', 90))
+    USAGE_POPULAR_MAX_LIMIT = int(os.environ.get('USAGE_POPULAR_MAX_LIMIT', 100))
+
+    # Per-process cache of user lookups on the tool create path; 0 disables it
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+
+    # Per-process cache of serialized tools used to assemble list responses (see fragments.py),
+    # bounded in bytes; 0 disables it
+    FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get('FRAGMENT_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+    # Most tools a user may own; 0 means no limit
+    MAX_TOOLS_PER_USER = int(os.environ.get('MAX_TOOLS_PER_USER', 0))
+
+    # Group commit (see groupcommit.py): concurrent POST /api/tools requests arriving within
+    # GROUP_COMMIT_WINDOW_MS share one transaction of up to GROUP_COMMIT_MAX_BATCH rows.
+    # Only useful with threaded workers, and ignored on SQLite.
+    GROUP_COMMIT_ENABLED = os.environ.get('GROUP_COMMIT_ENABLED', 'false').lower() == 'true'
+    GROUP_COMMIT_WINDOW_MS = float(os.environ.get('GROUP_COMMIT_WINDOW_MS', 2))
+    GROUP_COMMIT_MAX_BATCH = int(os.environ.get('GROUP_COMMIT_MAX_BATCH', 64))
+
+    # Sharding (see sharding.py): a comma-separated list of databases that hold the tool
+    # table, routed by owner. Users and everything else stay on DATABASE_URL. Empty disables it.
+    SHARD_DATABASE_URLS = [url for url in os.environ.get('SHARD_DATABASE_URLS', '').split(',') if url]
+
+    # Required settings and the error raised when they are missing
+    REQUIRED_SETTINGS = {
+        'SECRET_KEY': "No SECRET_KEY set for Flask application. This is a required environment variable.",
+        'JWT_SECRET_KEY': "No JWT_SECRET_KEY set for Flask application. This is a required environment variable.",
+        'SQLALCHEMY_DATABASE_URI': "No DATABASE_URL set. This is a required environment variable.",
+    }
+
+    @classmethod
+    def validate(cls):
+        """
+        Check that all required settings are present.
+
+        Validation happens when the app is created rather than at import time,
+        so importing this module never fails and the .env file is always honoured.
+
+        Raises:
+            ValueError: If a required setting is missing.
+        """
+        for name, message in cls.REQUIRED_SETTINGS.items():
+            if not getattr(cls, name, None):
+                raise ValueError(message)
+
 
 class TestConfig(Config):
     """
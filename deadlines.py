@@ -0,0 +1,164 @@
+import math
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from flask import abort, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from werkzeug.exceptions import GatewayTimeout
+from models import db
+
+# Clients may ask for a shorter deadline than the route's, in seconds
+DEADLINE_HEADER = 'X-Request-Timeout'
+
+# SQLite virtual machine instructions between two deadline checks
+SQLITE_PROGRESS_STEPS = 1000
+
+# Deadline of the request a worker thread is working for, set by deadline_scope()
+_worker = threading.local()
+
+
+def current_deadline():
+    """
+    Return the deadline bounding the current thread's work: the request's
+    deadline in a request, or the one given to deadline_scope() in a worker
+    thread without a request context.
+
+    Returns:
+        float: The deadline as a time.monotonic() value, or None
+    """
+    if has_request_context():
+        return g.get('deadline')
+    return getattr(_worker, 'deadline', None)
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """
+    Bound the statements run by the current thread with a request's deadline.
+
+    For worker threads doing part of a request's work, such as the shard
+    queries of a fan-out, which have no request context of their own.
+
+    Args:
+        deadline (float): The request's current_deadline(), or None for no deadline
+    """
+    previous = getattr(_worker, 'deadline', None)
+    _worker.deadline = deadline
+    try:
+        yield
+    finally:
+        _worker.deadline = previous
+
+
+def remaining_time():
+    """
+    Return the seconds left before the current request's deadline.
+
+    Returns:
+        float: The remaining budget (negative once it has passed), or None
+        outside a request or for a request without a deadline
+    """
+    deadline = current_deadline()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline():
+    """
+    Raises:
+        GatewayTimeout: If the current request's deadline has passed
+    """
+    left = remaining_time()
+    if left is not None and left <= 0:
+        raise GatewayTimeout(description="The request did not complete within its deadline.")
+
+
+def start_deadline():
+    """
+    Set the deadline of the current request from REQUEST_TIMEOUT, its route's
+    entry in REQUEST_TIMEOUT_ROUTES and the client's X-Request-Timeout header,
+    whichever is shortest. A budget of 0 means no deadline.
+    """
+    routes = current_app.config.get('REQUEST_TIMEOUT_ROUTES') or {}
+    budget = routes.get(request.endpoint, current_app.config.get('REQUEST_TIMEOUT', 0))
+
+    requested = request.headers.get(DEADLINE_HEADER)
+    if requested is not None:
+        try:
+            requested = float(requested)
+        except ValueError:
+            abort(400)
+        if not (requested > 0 and math.isfinite(requested)):
+            abort(400)
+        budget = min(budget, requested) if budget else requested
+
+    if budget:
+        g.deadline = time.monotonic() + budget
+
+
+def bound_statement(conn, cursor, statement, parameters, context, executemany):
+    """
+    Apply the remaining request budget to a statement about to run: as
+    statement_timeout on PostgreSQL, or as a progress handler that interrupts
+    the statement on SQLite.
+    """
+    left = remaining_time()
+    if left is None:
+        return
+    check_deadline()
+
+    if conn.dialect.name == 'postgresql':
+        # LOCAL: reset when the transaction ends, before the connection is reused.
+        # Rounded up so that a cancelled statement is always past the deadline.
+        cursor.execute('SET LOCAL statement_timeout = %d' % math.ceil(left * 1000))
+    elif conn.dialect.name == 'sqlite':
+        # Installed before every statement, replacing any handler left by another
+        # request, and kept until the connection goes back to the pool so that
+        # fetching rows is bounded too
+        deadline = current_deadline()
+        conn.connection.dbapi_connection.set_progress_handler(
+            lambda: time.monotonic() > deadline, SQLITE_PROGRESS_STEPS
+        )
+
+
+def clear_progress_handler(dbapi_connection, connection_record):
+    """Remove the deadline handler from a SQLite connection returned to the pool."""
+    if dbapi_connection is None:
+        return
+    try:
+        dbapi_connection.set_progress_handler(None, 0)
+    except sqlite3.ProgrammingError:
+        # Already closed
+        pass
+
+
+def init_deadlines(app):
+    """
+    Enforce request deadlines for the app.
+
+    Settings:
+        REQUEST_TIMEOUT: Default budget of a request in seconds; 0 for none
+        REQUEST_TIMEOUT_ROUTES: {endpoint: seconds} overrides, e.g. 0 for streaming routes
+    """
+    app.before_request(start_deadline)
+
+    with app.app_context():
+        engines = [db.engine]
+    router = app.extensions.get('shard_router')
+    if router is not None:
+        engines.extend(router.engines)
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', bound_statement)
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'checkin', clear_progress_handler)
+
+    @app.errorhandler(OperationalError)
+    def statement_timed_out(error):
+        # PostgreSQL cancels the statement, SQLite interrupts it: either way an
+        # OperationalError past the deadline means the request ran out of time
+        left = remaining_time()
+        if left is None or left > 0:
+            raise error
+        db.session.rollback()
+        return app.handle_http_exception(GatewayTimeout())
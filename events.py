@@ -0,0 +1,221 @@
+import json
+import os
+import queue
+import select
+import threading
+import time
+from flask import current_app
+from models import db, ArchivedTool, Tool, tool_changed
+
+
+class Subscription:
+    """
+    A subscriber's bounded queue of pending events.
+
+    When the queue is full the subscriber is marked as overflowed instead of
+    blocking the publisher; its stream then ends and the client resumes from
+    its Last-Event-ID, replaying what it missed from the change feed.
+    """
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+
+class InProcessBroker:
+    """
+    Fans events out to the subscribers connected to this process.
+
+    Events published in one gunicorn worker only reach streams served by the
+    same worker; use PostgresNotifyBroker to fan out across workers.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        """Publish an event to every subscriber."""
+        self.deliver(event)
+
+    def deliver(self, event):
+        """Put an event on the queue of every local subscriber without blocking."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                subscription.overflowed = True
+
+
+class PostgresNotifyBroker(InProcessBroker):
+    """
+    Fans events out to every worker process through PostgreSQL LISTEN/NOTIFY.
+
+    publish() sends a NOTIFY; each process that has subscribers runs one
+    listener thread that receives the notifications and delivers them locally,
+    including to subscribers of the process that published the event.
+    """
+
+    CHANNEL = 'tool_events'
+
+    def __init__(self, dsn, queue_size=100):
+        super().__init__(queue_size)
+        self.dsn = dsn
+        self._local = threading.local()
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    def _connect(self):
+        import psycopg2
+
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        return conn
+
+    def _publish_connection(self):
+        # psycopg2 connections must not be shared between threads or across a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or conn.closed or getattr(self._local, 'pid', None) != os.getpid():
+            conn = self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+        return conn
+
+    def subscribe(self):
+        self._ensure_listener()
+        return super().subscribe()
+
+    def publish(self, event):
+        with self._publish_connection().cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', (self.CHANNEL, json.dumps(event)))
+
+    def _ensure_listener(self):
+        # The listener is started lazily, so it never runs in a preloading gunicorn master
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            threading.Thread(target=self._listen, daemon=True, name='tool-events-listener').start()
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            try:
+                conn = self._connect()
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.CHANNEL}')
+                backoff = 1
+                while True:
+                    if select.select([conn], [], [], 5)[0]:
+                        conn.poll()
+                        while conn.notifies:
+                            self.deliver(json.loads(conn.notifies.pop(0).payload))
+            except Exception:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+
+def tool_event(tool, action):
+    """Build the event published for a change to a tool."""
+    return {'id': tool.change_seq, 'event': f'tool.{action}', 'data': tool.serialize_change()}
+
+
+def replay_action(tool):
+    """Name the change a replayed feed entry stands for; the feed only keeps each tool's latest state."""
+    if isinstance(tool, ArchivedTool):
+        return 'archived'
+    return 'deleted' if tool.deleted_at else 'changed'
+
+
+def format_sse(event):
+    """Render an event in the text/event-stream wire format."""
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+@tool_changed.connect
+def publish_tool_change(tool, action):
+    broker = current_app.extensions.get('event_broker')
+    if broker is not None:
+        broker.publish(tool_event(tool, action))
+
+
+def stream_tool_events(last_event_id=None):
+    """
+    Generate the Server-Sent Events stream of tool changes.
+
+    If the client supplies the id of the last event it received, the changes
+    it missed are replayed from the change feed before live events follow.
+    A comment line is sent as a heartbeat whenever no event arrives for
+    EVENTS_HEARTBEAT_INTERVAL seconds, and the stream ends after
+    EVENTS_STREAM_MAX_SECONDS so the worker is released and the client reconnects.
+
+    Args:
+        last_event_id (int): The Last-Event-ID sent by the client, or None
+
+    Yields:
+        str: Chunks of the event stream
+    """
+    config = current_app.config
+    broker = current_app.extensions['event_broker']
+    heartbeat = config.get('EVENTS_HEARTBEAT_INTERVAL', 15)
+    deadline = time.monotonic() + config.get('EVENTS_STREAM_MAX_SECONDS', 300)
+    page_size = config.get('CHANGES_MAX_PAGE_SIZE', 1000)
+
+    # Subscribe before replaying so no change committed during the replay is lost
+    subscription = broker.subscribe()
+    try:
+        yield f"retry: {config.get('EVENTS_RETRY_MS', 3000)}\n\n"
+
+        replayed_up_to = None
+        if last_event_id is not None:
+            replayed_up_to = last_event_id
+            while True:
+                changes = Tool.get_changes(replayed_up_to, page_size)
+                for tool in changes:
+                    yield format_sse(tool_event(tool, replay_action(tool)))
+                    replayed_up_to = tool.change_seq
+                if len(changes) < page_size:
+                    break
+
+        # Do not hold a database connection for the lifetime of the stream
+        db.session.remove()
+
+        while time.monotonic() < deadline and not subscription.overflowed:
+            try:
+                event = subscription.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+                continue
+            # Skip live events already sent during the replay
+            if replayed_up_to is not None and event['id'] <= replayed_up_to:
+                continue
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def init_events(app):
+    """
+    Create the event broker selected by EVENTS_BROKER ('memory' or 'postgres').
+    """
+    queue_size = app.config.get('EVENTS_QUEUE_SIZE', 100)
+    if app.config.get('EVENTS_BROKER', 'memory') == 'postgres':
+        from sqlalchemy.engine import make_url
+
+        dsn = make_url(app.config['SQLALCHEMY_DATABASE_URI']).set(drivername='postgresql')
+        broker = PostgresNotifyBroker(dsn.render_as_string(hide_password=False), queue_size)
+    else:
+        broker = InProcessBroker(queue_size)
+    app.extensions['event_broker'] = broker
@@ -0,0 +1,144 @@
+import threading
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from models import Tool
+
+# Rough per-entry overhead of the dict, tuple and bytes objects, counted
+# against FRAGMENT_CACHE_MAX_BYTES along with the fragment itself
+ENTRY_OVERHEAD = 200
+
+
+class FragmentCache:
+    """
+    A thread-safe cache of serialized tools, as compact JSON bytes.
+
+    Each fragment is stored with the change_seq of the row it was encoded
+    from; change_seq is bumped by every insert and update, so a fragment is
+    only returned for the exact row version it was made from, even if another
+    process changed the tool. Entries are evicted least recently used first
+    once their total size exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+
+    def get(self, tool_id, version):
+        with self._lock:
+            entry = self._entries.get(tool_id)
+            if entry is None or entry[0] != version:
+                self.metrics['misses'] += 1
+                return None
+            self._entries.move_to_end(tool_id)
+            self.metrics['hits'] += 1
+            return entry[1]
+
+    def set(self, tool_id, version, fragment):
+        with self._lock:
+            self._pop(tool_id)
+            self._entries[tool_id] = (version, fragment)
+            self.size += len(fragment) + ENTRY_OVERHEAD
+            while self.size > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted) + ENTRY_OVERHEAD
+                self.metrics['evictions'] += 1
+
+    def invalidate(self, tool_id):
+        with self._lock:
+            if self._pop(tool_id):
+                self.metrics['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _pop(self, tool_id):
+        entry = self._entries.pop(tool_id, None)
+        if entry is None:
+            return False
+        self.size -= len(entry[1]) + ENTRY_OVERHEAD
+        return True
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def encode(value):
+    """Encode a value as compact JSON bytes, with the app's JSON settings."""
+    return current_app.json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def tool_fragments(tools):
+    """
+    Serialize tools, reusing the cached fragment of each unchanged tool.
+
+    Args:
+        tools (list): Tools to serialize
+
+    Returns:
+        list: One JSON bytes fragment per tool, in order
+    """
+    cache = current_app.extensions.get('fragment_cache')
+    if cache is None:
+        return [encode(tool.serialize()) for tool in tools]
+
+    fragments = []
+    for tool in tools:
+        if not isinstance(tool, Tool):
+            # Archived tools are read rarely and have no change_seq to version a fragment by
+            fragments.append(encode(tool.serialize()))
+            continue
+        fragment = cache.get(tool.id, tool.change_seq)
+        if fragment is None:
+            fragment = encode(tool.serialize())
+            cache.set(tool.id, tool.change_seq, fragment)
+        fragments.append(fragment)
+    return fragments
+
+
+def tools_response(result, tools, key='tools'):
+    """
+    Build a JSON response from a result dict and a list of tools.
+
+    The same as jsonify(dict(result, tools=[tool.serialize() ...])), but the
+    tools are concatenated from their cached fragments rather than encoded
+    again; the tools array comes last in the body.
+
+    Args:
+        result (dict): The other members of the response
+        tools (list): The tools to include under key
+
+    Returns:
+        Response: The JSON response
+    """
+    head = encode(result)[:-1]
+    if len(head) > 1:
+        head += b','
+    body = b''.join([head, encode(key), b':[', b','.join(tool_fragments(tools)), b']}\n'])
+    return current_app.response_class(body, mimetype=current_app.json.mimetype)
+
+
+@event.listens_for(Tool, 'after_update')
+@event.listens_for(Tool, 'after_delete')
+def invalidate_tool_fragment(mapper, connection, target):
+    # Stale fragments are never served, since they carry the old change_seq;
+    # dropping them here only frees their memory sooner
+    if not has_app_context():
+        return
+    cache = current_app.extensions.get('fragment_cache')
+    if cache is not None:
+        cache.invalidate(target.id)
+
+
+def init_fragment_cache(app):
+    """
+    Enable the per-process cache of serialized tools when FRAGMENT_CACHE_MAX_BYTES is positive.
+    """
+    max_bytes = app.config.get('FRAGMENT_CACHE_MAX_BYTES', 0)
+    if max_bytes > 0:
+        app.extensions['fragment_cache'] = FragmentCache(max_bytes)
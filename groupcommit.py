@@ -0,0 +1,180 @@
+import threading
+from flask import current_app
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from models import db, Tool, send_tool_changed
+
+
+class _Entry:
+    """
+    One caller's row in a group commit batch.
+    """
+    __slots__ = ('values', 'done', 'tool', 'error')
+
+    def __init__(self, values):
+        self.values = values
+        self.done = threading.Event()
+        self.tool = None
+        self.error = None
+
+
+class _Batch:
+    __slots__ = ('entries', 'full')
+
+    def __init__(self):
+        self.entries = []
+        self.full = threading.Event()
+
+
+class GroupCommitter:
+    """
+    Coalesces concurrent tool creations into one transaction.
+
+    The first caller to arrive opens a batch and becomes its leader: it waits
+    up to window seconds (or until max_batch rows have joined), then inserts
+    every row of the batch with one multi-row INSERT and one commit. The other
+    callers wait for the leader and receive their own tool, or their own
+    error: if the batch fails as a whole, the leader retries its rows one at a
+    time so that one bad row does not fail the rest.
+
+    The batch runs in a session of its own rather than the leader request's
+    db.session, so it neither commits nor rolls back the leader's pending work.
+
+    Batches only form when a worker serves requests concurrently (threaded
+    workers); with one request per process every batch has a single row.
+
+    The other callers wait for as long as the batch takes, with no timeout of
+    their own: the leader's queries are bounded by the statement deadline, and
+    it marks every entry done however the batch ends. A caller therefore always
+    learns whether its row was committed, and a client retry after an error
+    cannot create the tool a second time.
+    """
+
+    def __init__(self, window=0.002, max_batch=64):
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._open = None
+        self.metrics = {'batches': 0, 'rows': 0, 'retried_batches': 0}
+
+    def submit(self, values):
+        """
+        Insert a tool as part of a batch and wait for its outcome.
+
+        Args:
+            values (dict): Column values of the new tool
+
+        Returns:
+            Tool: The committed tool, detached from any session
+
+        Raises:
+            The exception raised when inserting this caller's row
+        """
+        entry = _Entry(values)
+        with self._lock:
+            batch = self._open
+            leader = batch is None
+            if leader:
+                batch = self._open = _Batch()
+            batch.entries.append(entry)
+            if len(batch.entries) >= self.max_batch:
+                self._open = None
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open is batch:
+                    self._open = None
+            self._commit(batch.entries)
+        else:
+            entry.done.wait()
+
+        if entry.error is not None:
+            raise entry.error
+        return entry.tool
+
+    def _commit(self, entries):
+        try:
+            try:
+                self._insert(entries)
+            except Exception:
+                if len(entries) == 1:
+                    raise
+                self.metrics['retried_batches'] += 1
+                for entry in entries:
+                    try:
+                        self._insert([entry])
+                    except Exception as e:
+                        entry.error = e
+        except Exception as e:
+            entries[0].error = e
+        finally:
+            for entry in entries:
+                entry.done.set()
+
+    def _insert(self, entries):
+        # Attributes stay loaded after the commit, since each caller
+        # serializes its detached tool in its own thread
+        with Session(db.engine, expire_on_commit=False) as session:
+            tools = []
+            for entry in entries:
+                values = dict(entry.values)
+                tags = values.pop('tags', None)
+                tool = Tool(**values)
+                # Set even when empty, so the detached tool serializes without a lazy load
+                tool.set_tags(tags or [], session)
+                tools.append(tool)
+            session.add_all(tools)
+            session.commit()
+
+        for entry, tool in zip(entries, tools):
+            entry.tool = tool
+        self.metrics['batches'] += 1
+        self.metrics['rows'] += len(entries)
+
+
+def insert_tool(name, description, user_id, tags=None):
+    """
+    Create a tool, through the group committer when group commit is enabled.
+
+    Args:
+        name (str): Name of the tool
+        description (str): Description of the tool
+        user_id (int): ID of the user who owns the tool
+        tags (list): Normalized tag names
+
+    Returns:
+        Tool: The newly created tool
+    """
+    committer = current_app.extensions.get('group_committer')
+    if committer is None:
+        return Tool.create_tool(name=name, description=description, user_id=user_id, tags=tags)
+
+    tool = committer.submit({'name': name, 'description': description, 'user_id': user_id, 'tags': tags})
+    # Sent by each caller, so listeners see the caller's own request
+    send_tool_changed(tool, 'created')
+    return tool
+
+
+def init_group_commit(app):
+    """
+    Enable group commit for tool creation when GROUP_COMMIT_ENABLED is set.
+
+    Group commit is not enabled on SQLite: writers there take turns on one
+    database lock whether or not their rows share a commit, so the window only
+    adds latency.
+
+    Settings:
+        GROUP_COMMIT_WINDOW_MS: How long a batch stays open for more rows
+        GROUP_COMMIT_MAX_BATCH: Rows that close a batch early
+    """
+    if not app.config.get('GROUP_COMMIT_ENABLED', False):
+        return
+    if make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'sqlite':
+        app.logger.warning("GROUP_COMMIT_ENABLED is ignored on SQLite; tools are committed one per request")
+        return
+    app.extensions['group_committer'] = GroupCommitter(
+            window=app.config.get('GROUP_COMMIT_WINDOW_MS', 2) / 1000.0,
+            max_batch=app.config.get('GROUP_COMMIT_MAX_BATCH', 64)
+        )
@@ -0,0 +1,54 @@
+# gunicorn.conf.py
+"""
+Gunicorn settings, picked up automatically by `gunicorn app:app`.
+
+The app is preloaded in the master so workers start from a fully imported,
+warmed-up copy of it. Anything that must not be shared between processes
+(database connections) is reset in post_fork.
+"""
+import os
+
+# Workers do not need the Alembic-backed `flask db` commands
+os.environ.setdefault('ENABLE_MIGRATE', 'false')
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+
+def when_ready(server):
+    """Warm caches in the master once, before any worker is forked."""
+    if not preload_app:
+        return
+
+    from auth import warm_jwks
+    if warm_jwks():
+        server.log.info("JWKS cache warmed")
+    else:
+        server.log.warning("Unable to warm JWKS cache; workers will fetch it on first request")
+
+
+def post_fork(server, worker):
+    """Give each worker its own database connection pool and start its job threads."""
+    if not preload_app:
+        return
+
+    from app import app, dispose_engine
+    dispose_engine(app)
+
+    runner = app.extensions['job_runner']
+    if runner.threads:
+        runner.start()
+
+
+def worker_exit(server, worker):
+    """Write the audit entries and tool read counts still buffered in the worker before it exits."""
+    from app import app
+
+    # Flushed here too rather than only at interpreter exit; the later atexit flush finds nothing left
+    for name in ('audit_log', 'usage_counter'):
+        buffer = app.extensions.get(name)
+        if buffer is not None:
+            try:
+                buffer.stop()
+            except Exception:
+                server.log.exception("Unable to flush %s on worker exit", name)
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from flask import abort, current_app, g, request
+from werkzeug.exceptions import Conflict
+from cache import TTLCache
+from deadlines import remaining_time
+from ratelimit import get_subject
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+# Set on responses answered from the store rather than by running the request again
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# Outcomes of MemoryStore.begin() and SQLiteStore.begin()
+STORED, OWNER, BUSY = 'stored', 'owner', 'busy'
+
+
+class MemoryStore:
+    """
+    Responses kept in this process's memory for ttl seconds, at most maxsize of them.
+
+    Each gunicorn worker keeps its own store, so a retry served by another
+    worker runs again; use SQLiteStore to share the store between workers.
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600.0, clock=time.monotonic):
+        self.responses = TTLCache(maxsize, ttl, clock)
+        self.clock = clock
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key, timeout):
+        """
+        Look up the response stored for key, or claim the key to run the request.
+
+        A request that finds the key claimed by one still running waits for it
+        to finish, for at most timeout seconds.
+
+        Returns:
+            tuple: (STORED, entry), (OWNER, None) if the caller must run the
+            request and then call finish(), or (BUSY, None) if the wait timed out
+        """
+        deadline = self.clock() + timeout
+        while True:
+            with self._lock:
+                entry = self.responses.get(key)
+                if entry is not None:
+                    return STORED, entry
+                running = self._in_flight.get(key)
+                if running is None:
+                    self._in_flight[key] = threading.Event()
+                    return OWNER, None
+            # The owner may finish without storing a response; then the key is claimed again
+            left = deadline - self.clock()
+            if left <= 0 or not running.wait(left):
+                return BUSY, None
+
+    def finish(self, key, entry=None):
+        """
+        Release a claimed key, storing the request's response unless entry is None.
+        """
+        with self._lock:
+            if entry is not None:
+                self.responses.set(key, entry)
+            self._in_flight.pop(key).set()
+
+
+class SQLiteStore:
+    """
+    Responses shared by all worker processes on one host through a SQLite file.
+
+    A claimed key is a row without a status. Requests waiting on a key
+    claimed by another process poll it every poll_interval seconds. A claim
+    left behind by a crashed worker expires after lease seconds.
+    """
+
+    def __init__(self, path, maxsize=10000, ttl=3600.0, lease=60.0, poll_interval=0.05, clock=time.time):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.stores = 0
+        self._local = threading.local()
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS idempotency_key '
+            '(key TEXT PRIMARY KEY, status INTEGER, entry TEXT, body BLOB, expires REAL NOT NULL)'
+        )
+
+    def _connection(self):
+        # SQLite connections must not be shared between threads or across a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def begin(self, key, timeout):
+        """Look up or claim key. See MemoryStore.begin."""
+        conn = self._connection()
+        deadline = self.clock() + timeout
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = self.clock()
+                conn.execute('DELETE FROM idempotency_key WHERE key = ? AND expires <= ?', (key, now))
+                row = conn.execute('SELECT status, entry, body FROM idempotency_key WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    conn.execute('INSERT INTO idempotency_key (key, expires) VALUES (?, ?)', (key, now + self.lease))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+            if row is None:
+                return OWNER, None
+            if row[0] is not None:
+                return STORED, dict(json.loads(row[1]), status=row[0], body=row[2])
+            left = deadline - self.clock()
+            if left <= 0:
+                return BUSY, None
+            time.sleep(min(self.poll_interval, left))
+
+    def finish(self, key, entry=None):
+        """Release a claimed key. See MemoryStore.finish."""
+        conn = self._connection()
+        if entry is None:
+            conn.execute('DELETE FROM idempotency_key WHERE key = ? AND status IS NULL', (key,))
+            return
+        conn.execute(
+            'UPDATE idempotency_key SET status = ?, entry = ?, body = ?, expires = ? WHERE key = ?',
+            (entry['status'], json.dumps({'fingerprint': entry['fingerprint'], 'headers': entry['headers']}),
+             entry['body'], self.clock() + self.ttl, key)
+        )
+        self.stores += 1
+        if self.stores % 100 == 0:
+            self._prune(conn)
+
+    def _prune(self, conn):
+        # Drop expired responses, then the ones closest to expiry beyond maxsize
+        conn.execute('DELETE FROM idempotency_key WHERE expires <= ?', (self.clock(),))
+        conn.execute(
+            'DELETE FROM idempotency_key WHERE key IN (SELECT key FROM idempotency_key '
+            'WHERE status IS NOT NULL ORDER BY expires LIMIT max(0, '
+            '(SELECT COUNT(*) FROM idempotency_key WHERE status IS NOT NULL) - ?))',
+            (self.maxsize,)
+        )
+
+
+def _fingerprint():
+    """Hash the method, path, query string and body, to tell a retry from another request reusing its key."""
+    digest = hashlib.sha256()
+    for part in (request.method, request.full_path):
+        digest.update(part.encode('utf-8') + b'\0')
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def idempotent(f):
+    """
+    A decorator that makes a write endpoint safe to retry with an Idempotency-Key header.
+
+    Apply it below requires_auth. Keys are scoped to the caller. The first
+    request with a key runs; its response (unless a 5xx, or an error raised
+    before it was built) is stored for IDEMPOTENCY_TTL seconds and returned to
+    every retry with the same key, marked with an Idempotent-Replayed header,
+    without running the view again. A retry arriving while the first request
+    is still running waits up to IDEMPOTENCY_MAX_WAIT seconds for it, then
+    gets 409. Reusing a key for a different request returns 422.
+
+    Requests without the header are not affected.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        store = current_app.extensions.get('idempotency_store')
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if store is None or key is None:
+            return f(*args, **kwargs)
+        if not key.strip() or len(key) > MAX_KEY_LENGTH:
+            abort(400)
+
+        subject = get_subject(g.get('jwt_payload') or {})
+        store_key = f'{subject}\n{key}'
+        fingerprint = _fingerprint()
+        # A retry never waits past its own deadline for the first request
+        timeout = current_app.config.get('IDEMPOTENCY_MAX_WAIT', 10.0)
+        left = remaining_time()
+        if left is not None:
+            timeout = max(0, min(timeout, left))
+
+        outcome, entry = store.begin(store_key, timeout)
+        if outcome == BUSY:
+            raise Conflict(description="A request with this Idempotency-Key is still in progress.")
+        if outcome == STORED:
+            if entry['fingerprint'] != fingerprint:
+                abort(422, description="This Idempotency-Key was used for a different request.")
+            response = current_app.response_class(entry['body'], status=entry['status'], headers=entry['headers'])
+            response.headers[REPLAYED_HEADER] = 'true'
+            return response
+
+        entry = None
+        try:
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code < 500 and not response.is_streamed:
+                entry = {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'headers': [(name, value) for name, value in response.headers.items() if name != 'Content-Length'],
+                    'body': response.get_data()
+                }
+            return response
+        finally:
+            store.finish(store_key, entry)
+    return wrapper
+
+
+def init_idempotency(app):
+    """
+    Enable Idempotency-Key handling on the write endpoints when IDEMPOTENCY_ENABLED is set.
+
+    Settings:
+        IDEMPOTENCY_TTL: Seconds a stored response is replayed for
+        IDEMPOTENCY_MAX_ENTRIES: Most responses stored; the oldest are dropped first
+        IDEMPOTENCY_MAX_WAIT: Longest a retry waits for the request it repeats
+        IDEMPOTENCY_STORAGE_PATH: SQLite file shared by all workers; in-memory when empty
+    """
+    if not app.config.get('IDEMPOTENCY_ENABLED', False):
+        return
+
+    ttl = app.config.get('IDEMPOTENCY_TTL', 3600)
+    maxsize = app.config.get('IDEMPOTENCY_MAX_ENTRIES', 10000)
+    storage_path = app.config.get('IDEMPOTENCY_STORAGE_PATH')
+    if storage_path:
+        store = SQLiteStore(storage_path, maxsize, ttl, lease=max(60, app.config.get('REQUEST_TIMEOUT', 0)))
+    else:
+        store = MemoryStore(maxsize, ttl)
+    app.extensions['idempotency_store'] = store
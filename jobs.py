@@ -0,0 +1,404 @@
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from flask import g
+from models import db, ArchivedTool, Job, Tool, send_tool_changed
+from transfer import add_tool_rows
+
+logger = logging.getLogger(__name__)
+
+# Registered job types: name -> {'permission': str, 'handler': callable, 'check_params': callable}
+JOB_TYPES = {}
+
+
+def job_type(name, permission, check_params=None):
+    """
+    Register a job handler.
+
+    The handler is called as handler(context, params) inside an app context and
+    returns a JSON-serializable result. permission is the token permission
+    required to queue the job. check_params, if given, is called with the
+    params when the job is queued and raises InvalidJobParams to reject them.
+    """
+    def decorator(handler):
+        JOB_TYPES[name] = {'permission': permission, 'handler': handler, 'check_params': check_params}
+        return handler
+    return decorator
+
+
+class InvalidJobParams(ValueError):
+    """
+    Raised when a job's params are of the wrong type or out of range.
+    """
+
+
+def int_param(params, name, default, minimum, maximum):
+    """
+    Read an integer job param.
+
+    Args:
+        params (dict): The job's params
+        name (str): The param to read
+        default (int): Returned when the param is missing or null
+        minimum (int): Smallest accepted value
+        maximum (int): Largest accepted value
+
+    Returns:
+        int: The param's value
+
+    Raises:
+        InvalidJobParams: If the value is not an integer between minimum and maximum
+    """
+    value = params.get(name)
+    if value is None:
+        return default
+    # bool is an int subclass, but true is not a count
+    if isinstance(value, bool) or not isinstance(value, int) or not minimum <= value <= maximum:
+        raise InvalidJobParams(f"{name} must be an integer from {minimum} to {maximum}")
+    return value
+
+
+class JobCancelled(Exception):
+    """
+    Raised from JobContext.report() when the job has been cancelled.
+    """
+
+
+class JobContext:
+    """
+    Lets a running job report progress and notice cancellation.
+    """
+
+    def __init__(self, job, result_dir):
+        self.job_id = job.id
+        self.progress = job.progress
+        self.result = json.loads(job.result) if job.result else {}
+        self.result_dir = result_dir
+
+    def report(self, progress, total=None, result=None):
+        """
+        Record progress and commit the job's pending database work with it.
+
+        Committing both in one transaction means a job resumed after a restart
+        continues exactly where its last committed chunk ended.
+
+        Raises:
+            JobCancelled: If cancellation has been requested.
+        """
+        values = {'progress': progress, 'heartbeat_at': datetime.utcnow()}
+        if total is not None:
+            values['total'] = total
+        if result is not None:
+            values['result'] = json.dumps(result)
+            self.result = result
+        db.session.execute(db.update(Job).where(Job.id == self.job_id).values(**values))
+        db.session.commit()
+        self.progress = progress
+
+        cancel_requested = db.session.execute(
+            db.select(Job.cancel_requested).where(Job.id == self.job_id)
+        ).scalar_one()
+        if cancel_requested:
+            raise JobCancelled()
+
+
+class JobRunner:
+    """
+    A pool of threads that claim queued jobs from the database and run them.
+
+    Several runners (in several processes or hosts) can share one database:
+    a job is claimed with a conditional UPDATE, so only one runner gets it.
+    Jobs whose runner stops sending heartbeats are put back in the queue.
+
+    While a job runs, a separate thread renews its heartbeat every quarter of
+    stale_after, so a chunk that takes longer than stale_after does not get
+    its job requeued and run a second time while it is still running.
+    """
+
+    def __init__(self, app, threads=2, poll_interval=1.0, stale_after=60, result_dir=None):
+        self.app = app
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.result_dir = result_dir or os.path.join(tempfile.gettempdir(), 'tool-jobs')
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def worker_id(self, index):
+        return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+    def start(self):
+        """Start the worker threads, once per process."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            for index in range(self.threads):
+                threading.Thread(target=self._run, args=(index,), daemon=True, name=f'job-runner-{index}').start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def notify(self):
+        """Wake idle worker threads because a job was queued."""
+        self._wakeup.set()
+
+    def _run(self, index):
+        with self.app.app_context():
+            while not self._stop.is_set():
+                try:
+                    if index == 0:
+                        self.requeue_stale_jobs()
+                    if not self.run_next(self.worker_id(index)):
+                        self._wakeup.wait(self.poll_interval)
+                        self._wakeup.clear()
+                except Exception:
+                    logger.exception("Job runner iteration failed")
+                    db.session.rollback()
+                    self._stop.wait(self.poll_interval)
+                finally:
+                    db.session.remove()
+
+    def run_pending(self):
+        """Run queued jobs in the calling thread until the queue is empty."""
+        while self.run_next(self.worker_id('sync')):
+            pass
+
+    def requeue_stale_jobs(self):
+        """
+        Put running jobs whose runner has stopped sending heartbeats back in the queue.
+
+        Returns:
+            int: The number of jobs requeued
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        result = db.session.execute(
+            db.update(Job)
+            .where(Job.status == 'running', Job.heartbeat_at < cutoff)
+            .values(status='queued', worker_id=None)
+        )
+        db.session.commit()
+        return result.rowcount
+
+    def claim_next(self, worker_id):
+        """
+        Claim the oldest queued job.
+
+        Returns:
+            int: The claimed job's ID, or None if the queue is empty
+        """
+        while True:
+            job_id = db.session.execute(
+                db.select(Job.id).where(Job.status == 'queued').order_by(Job.id).limit(1)
+            ).scalar()
+            if job_id is None:
+                db.session.rollback()
+                return None
+
+            now = datetime.utcnow()
+            result = db.session.execute(
+                db.update(Job)
+                .where(Job.id == job_id, Job.status == 'queued')
+                .values(status='running', worker_id=worker_id, heartbeat_at=now,
+                        started_at=db.func.coalesce(Job.started_at, now))
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                return job_id
+            # Another runner claimed it first; try the next one
+
+    def run_next(self, worker_id):
+        """
+        Claim and run one job.
+
+        Returns:
+            bool: True if a job was run
+        """
+        job_id = self.claim_next(worker_id)
+        if job_id is None:
+            return False
+
+        job = Job.get_job(job_id)
+        spec = JOB_TYPES.get(job.type)
+        # Changes made by the job are attributed to the subject that queued it
+        g.actor = job.created_by
+        finished = threading.Event()
+        threading.Thread(target=self._send_heartbeats, args=(job_id, finished), daemon=True,
+                         name=f'job-heartbeat-{job_id}').start()
+        try:
+            if job.cancel_requested:
+                raise JobCancelled()
+            if spec is None:
+                raise ValueError(f"Unknown job type: {job.type}")
+            context = JobContext(job, self.result_dir)
+            result = spec['handler'](context, json.loads(job.params or '{}'))
+        except JobCancelled:
+            db.session.rollback()
+            self._finish(job_id, 'cancelled')
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Job %s failed", job_id)
+            self._finish(job_id, 'failed', error=str(e))
+        else:
+            self._finish(job_id, 'succeeded', result=result)
+        finally:
+            finished.set()
+            g.pop('actor', None)
+        return True
+
+    def _send_heartbeats(self, job_id, finished):
+        # Runs in its own app context, so the heartbeats commit in a session of their own
+        with self.app.app_context():
+            while not finished.wait(self.stale_after / 4):
+                try:
+                    db.session.execute(
+                        db.update(Job).where(Job.id == job_id, Job.status == 'running')
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+                    db.session.commit()
+                except Exception:
+                    logger.exception("Heartbeat for job %s failed", job_id)
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    def _finish(self, job_id, status, result=None, error=None):
+        values = {'status': status, 'finished_at': datetime.utcnow(), 'error': error}
+        if result is not None:
+            values['result'] = json.dumps(result)
+        db.session.execute(db.update(Job).where(Job.id == job_id).values(**values))
+        db.session.commit()
+
+
+# Largest chunk_size of the import and export jobs; each chunk is one transaction
+MAX_JOB_CHUNK_SIZE = 10000
+
+
+def import_params(params):
+    """
+    Read and check the params of an import job.
+
+    Returns:
+        tuple: (rows, chunk_size)
+
+    Raises:
+        InvalidJobParams: If tools is not a list, or chunk_size not a positive integer
+    """
+    rows = params.get('tools') or []
+    if not isinstance(rows, list):
+        raise InvalidJobParams("tools must be a list")
+    return rows, int_param(params, 'chunk_size', 500, 1, MAX_JOB_CHUNK_SIZE)
+
+
+def export_params(params):
+    """
+    Read and check the params of an export job.
+
+    Returns:
+        tuple: (chunk_size, include_archived)
+
+    Raises:
+        InvalidJobParams: If chunk_size is not a positive integer
+    """
+    return int_param(params, 'chunk_size', 1000, 1, MAX_JOB_CHUNK_SIZE), bool(params.get('include_archived'))
+
+
+@job_type('tool_import', permission='create:tools', check_params=import_params)
+def import_tools(context, params):
+    """
+    Import a list of tools in chunks.
+
+    params: {'tools': [{'name': ..., 'description': ..., 'user_id': ...}, ...]}
+
+    Rows with a missing name or an unknown user are skipped and reported.
+    """
+    rows, chunk_size = import_params(params)
+    summary = dict({'imported': 0, 'skipped': 0, 'errors': []}, **context.result)
+
+    for start in range(context.progress, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        new_tools = add_tool_rows(chunk, start, summary)
+        context.report(start + len(chunk), total=len(rows), result=summary)
+
+        for tool in new_tools:
+            send_tool_changed(tool, 'created')
+
+    return summary
+
+
+@job_type('tool_export', permission='read:tools', check_params=export_params)
+def export_tools(context, params):
+    """
+    Export the full tool catalog to a newline-delimited JSON file.
+
+    params: {'include_archived': true} exports archived tools as well, merged in ID order.
+
+    The file is written next to the runner and can be downloaded with
+    GET /api/jobs/<id>/download. An interrupted export starts over.
+    """
+    chunk_size, include_archived = export_params(params)
+    os.makedirs(context.result_dir, exist_ok=True)
+    filename = f'tools-export-{context.job_id}.ndjson'
+    total = db.session.execute(db.select(db.func.count(Tool.id)).where(Tool.deleted_at.is_(None))).scalar()
+    if include_archived:
+        total += db.session.execute(db.select(db.func.count(ArchivedTool.id))).scalar()
+
+    rows = 0
+    last_id = 0
+    with open(os.path.join(context.result_dir, filename), 'w') as f:
+        while True:
+            # Keyset pagination keeps each query cheap however large the catalog is
+            tools = Tool.get_page(last_id, chunk_size, include_archived=include_archived)
+            if not tools:
+                break
+            for tool in tools:
+                f.write(json.dumps(tool.serialize()) + '\n')
+            rows += len(tools)
+            last_id = tools[-1].id
+            db.session.expunge_all()
+            context.report(rows, total=total)
+
+    return {'file': filename, 'format': 'ndjson', 'rows': rows}
+
+
+def init_jobs(app):
+    """
+    Set up the job runner for the app.
+
+    With JOBS_WORKER_THREADS > 0 each web worker process runs that many job
+    threads, started after fork (by gunicorn's post_fork hook, or on the first
+    request otherwise). `flask run-jobs` runs a dedicated job worker instead.
+    """
+    runner = JobRunner(
+        app,
+        threads=app.config.get('JOBS_WORKER_THREADS', 0),
+        poll_interval=app.config.get('JOBS_POLL_INTERVAL', 1.0),
+        stale_after=app.config.get('JOBS_STALE_AFTER', 60),
+        result_dir=app.config.get('JOBS_RESULT_DIR')
+    )
+    app.extensions['job_runner'] = runner
+
+    if runner.threads:
+        @app.before_request
+        def start_job_runner():
+            runner.start()
+
+    @app.cli.command('run-jobs')
+    def run_jobs():
+        """Run queued background jobs until interrupted."""
+        runner.threads = runner.threads or 2
+        runner.start()
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            runner.stop()
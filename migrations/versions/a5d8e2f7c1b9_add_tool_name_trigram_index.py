@@ -0,0 +1,31 @@
+"""Add a trigram index on tool names for autocomplete (PostgreSQL only)
+
+Revision ID: a5d8e2f7c1b9
+Revises: f2b9c6d3e8a4
+Create Date: 2026-10-19 18:11:36.540921
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5d8e2f7c1b9'
+down_revision = 'f2b9c6d3e8a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Serves GET /api/tools/suggest with SUGGEST_BACKEND=postgres: both the prefix
+    # LIKE and the pg_trgm similarity operator use it. Other databases use the
+    # in-memory index instead.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute('CREATE INDEX ix_tool_name_trgm ON tool USING gin (lower(name) gin_trgm_ops)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('DROP INDEX IF EXISTS ix_tool_name_trgm')
@@ -0,0 +1,43 @@
+"""Add tool change feed
+
+Revision ID: b3f1c2d4e5a6
+Revises: 7344ec28d6f6
+Create Date: 2026-10-19 09:12:41.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f1c2d4e5a6'
+down_revision = '7344ec28d6f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_counter',
+    sa.Column('name', sa.String(length=40), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    with op.batch_alter_table('tool', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_tool_change_seq'), ['change_seq'], unique=False)
+
+    # Existing tools enter the feed in ID order, and the counter continues after them
+    op.execute('UPDATE tool SET change_seq = id')
+    op.execute("INSERT INTO change_counter (name, value) SELECT 'tool', COALESCE(MAX(id), 0) FROM tool")
+
+
+def downgrade():
+    # Tombstones have no meaning without the feed
+    op.execute('DELETE FROM tool WHERE deleted_at IS NOT NULL')
+    with op.batch_alter_table('tool', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tool_change_seq'))
+        batch_op.drop_column('deleted_at')
+        batch_op.drop_column('change_seq')
+
+    op.drop_table('change_counter')
@@ -0,0 +1,47 @@
+"""Record archive moves in the change feed and stop SQLite reusing archived tool IDs
+
+Revision ID: d2f5a8c3b6e1
+Revises: c4e7a2b9d1f6
+Create Date: 2026-10-20 10:14:27.918305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f5a8c3b6e1'
+down_revision = 'c4e7a2b9d1f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tool_archive', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_tool_archive_change_seq'), ['change_seq'], unique=False)
+
+    # Sequences never hand out an ID twice; SQLite without AUTOINCREMENT reuses
+    # the highest free rowid, which may belong to an archived tool
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('tool', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'tool'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) "
+        "SELECT 'tool', MAX(id) FROM (SELECT id FROM tool UNION ALL SELECT id FROM tool_archive) "
+        "HAVING MAX(id) IS NOT NULL"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('tool', schema=None, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+            pass
+
+    with op.batch_alter_table('tool_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tool_archive_change_seq'))
+        batch_op.drop_column('change_seq')
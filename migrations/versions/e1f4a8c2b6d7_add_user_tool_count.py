@@ -0,0 +1,32 @@
+"""Add denormalized tool count to user
+
+Revision ID: e1f4a8c2b6d7
+Revises: d7e3b5a1f902
+Create Date: 2026-10-19 14:21:09.402755
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f4a8c2b6d7'
+down_revision = 'd7e3b5a1f902'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tool_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Count the tools users already own
+    op.execute(
+        'UPDATE "user" SET tool_count = '
+        '(SELECT COUNT(*) FROM tool WHERE tool.user_id = "user".id AND tool.deleted_at IS NULL)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('tool_count')
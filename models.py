@@ -1,8 +1,156 @@
+import heapq
+import json
+import logging
 from datetime import datetime
+from blinker import Namespace
+from flask import current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+logger = logging.getLogger(__name__)
 
 db = SQLAlchemy()
 
+# Sent by the Tool helpers after a change has been committed, with the tool as
+# sender and action='created', 'updated', 'deleted' or 'retired'; the archive job
+# sends action='archived' with the ArchivedTool
+model_signals = Namespace()
+tool_changed = model_signals.signal('tool-changed')
+
+
+def send_tool_changed(tool, action):
+    """
+    Send tool_changed for a committed change, to each receiver in turn.
+
+    The change is already committed when this runs, so a receiver that fails
+    is logged and skipped: it neither stops the other receivers nor fails the
+    request that made the change.
+
+    Args:
+        tool: The changed Tool, or the ArchivedTool for action='archived'
+        action (str): What happened to the tool
+    """
+    for receiver in tool_changed.receivers_for(tool):
+        try:
+            receiver(tool, action=action)
+        except Exception:
+            logger.exception("tool_changed receiver %r failed for tool %s (%s)", receiver, tool.id, action)
+
+
+class ChangeCounter(db.Model):
+    """
+    Named, monotonically increasing counters used to order change feeds.
+
+    The counter row is updated inside the writing transaction, so its row lock
+    orders concurrent writers: a change with a higher sequence number is never
+    committed before one with a lower number.
+    """
+    __tablename__ = 'change_counter'
+    name = db.Column(db.String(40), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+def next_change_seq(connection, name, count=1):
+    """
+    Increment a change counter and return its new value.
+
+    Args:
+        connection: The connection of the transaction making the change
+        name (str): The counter name, e.g. 'tool'
+        count (int): How many sequence numbers to reserve, for bulk loads
+
+    Returns:
+        int: The next sequence number (the last one reserved when count > 1)
+    """
+    counter = ChangeCounter.__table__
+    result = connection.execute(
+        counter.update().where(counter.c.name == name).values(value=counter.c.value + count)
+    )
+    if result.rowcount == 0:
+        connection.execute(counter.insert().values(name=name, value=count))
+        return count
+    return connection.execute(db.select(counter.c.value).where(counter.c.name == name)).scalar_one()
+
+
+def _tagged_tool_ids(link, tags):
+    """
+    Select the IDs of the tools linked to all of the given tags through a link table.
+    """
+    tags = set(tags)
+    return db.select(link.c.tool_id) \
+        .join(Tag, Tag.id == link.c.tag_id) \
+        .where(Tag.name.in_(tags)) \
+        .group_by(link.c.tool_id) \
+        .having(db.func.count() == len(tags))
+
+
+# Many-to-many link between tools and tags. The primary key serves lookups by
+# tool; the (tag_id, tool_id) index serves filtering and counting by tag.
+tool_tags = db.Table(
+    'tool_tag',
+    db.Column('tool_id', db.Integer, db.ForeignKey('tool.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_tool_tag_tag_id_tool_id', 'tag_id', 'tool_id')
+)
+
+
+class Tag(db.Model):
+    __tablename__ = 'tag'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f'<Tag {self.name}>'
+
+    @classmethod
+    def get_or_create(cls, session, names):
+        """
+        Helper method to look up tags by name, creating the missing ones.
+
+        Args:
+            session: The session the tags are needed in
+            names (list): Normalized tag names
+
+        Returns:
+            list: The tags, in the order of names
+        """
+        found = {tag.name: tag for tag in session.scalars(db.select(cls).where(cls.name.in_(names)))}
+        for name in names:
+            if name not in found:
+                found[name] = cls(name=name)
+                session.add(found[name])
+        return [found[name] for name in names]
+
+    @classmethod
+    def get_facets(cls, tags=None, session=None, include_archived=False):
+        """
+        Helper method to count the tools carrying each tag, with one grouped query.
+
+        Args:
+            tags (list): Only count tools that carry all of these tags
+            session: The session to query; db.session by default
+            include_archived (bool): Count archived tools as well
+
+        Returns:
+            dict: Number of tools that have not been deleted, keyed by tag name
+        """
+        query = db.select(cls.name, db.func.count()) \
+            .select_from(tool_tags) \
+            .join(cls, cls.id == tool_tags.c.tag_id) \
+            .join(Tool, Tool.id == tool_tags.c.tool_id) \
+            .where(Tool.deleted_at.is_(None)) \
+            .group_by(cls.name) \
+            .order_by(cls.name)
+        if tags:
+            query = query.where(Tool.tagged_with(tags))
+        facets = dict((session or db.session).execute(query).all())
+        if include_archived:
+            for name, count in ArchivedTool.get_facets(tags, session).items():
+                facets[name] = facets.get(name, 0) + count
+            facets = dict(sorted(facets.items()))
+        return facets
+
 
 class Tool(db.Model):
     __tablename__ = 'tool'
@@ -12,6 +160,18 @@ class Tool(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     user = db.relationship('User', backref=db.backref('tools', lazy=True))
+    # Sequence number of the last change to this row, assigned on every insert and update
+    change_seq = db.Column(db.BigInteger, nullable=False, default=0, server_default='0', index=True)
+    # Deleted tools are kept as tombstones so the change feed can report the deletion
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    # Retired tools stay readable but are moved to the archive by the next archive job
+    retired_at = db.Column(db.DateTime, nullable=True)
+    # Loaded with one extra query per list of tools rather than one per tool
+    tags = db.relationship('Tag', secondary=tool_tags, lazy='selectin', order_by='Tag.name')
+
+    # The archive job removes rows from this table, so SQLite must never hand
+    # out the ID of an archived tool again
+    __table_args__ = {'sqlite_autoincrement': True}
 
     def __repr__(self):
         return f'<Tool {self.name}>'
@@ -22,11 +182,36 @@ class Tool(db.Model):
             'name': self.name,
             'description': self.description,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'user_id': self.user_id
+            'user_id': self.user_id,
+            'tags': [tag.name for tag in self.tags]
         }
 
+    def set_tags(self, names, session=None):
+        """
+        Replace the tool's tags.
+
+        Args:
+            names (list): Normalized tag names
+            session: The session the tool is saved in; by default the tool's own session, or db.session
+        """
+        session = session or object_session(self) or db.session
+        self.tags = Tag.get_or_create(session, names) if names else []
+
+    @classmethod
+    def tagged_with(cls, tags):
+        """
+        Build a filter matching the tools that carry all of the given tags.
+
+        Args:
+            tags (list): Normalized tag names
+
+        Returns:
+            A criterion for Query.filter() or Select.where()
+        """
+        return cls.id.in_(_tagged_tool_ids(tool_tags, tags))
+
     @classmethod
-    def create_tool(cls, name, description, user_id):
+    def create_tool(cls, name, description, user_id, tags=None):
         """
         Helper method to create a new tool in the database.
 
@@ -34,6 +219,7 @@ class Tool(db.Model):
             name (str): Name of the tool
             description (str): Description of the tool
             user_id (int): ID of the user who owns the tool
+            tags (list): Normalized tag names
 
         Returns:
             Tool: The newly created tool
@@ -44,35 +230,136 @@ class Tool(db.Model):
             description=description,
             user_id=user_id
         )
+        if tags:
+            new_tool.set_tags(tags, db.session)
 
         # Save it to the database
         db.session.add(new_tool)
         db.session.commit()
+        send_tool_changed(new_tool, 'created')
 
         return new_tool
 
+    def serialize_change(self):
+        """
+        Serialize the tool as an entry of the change feed.
+
+        Deleted tools are reported as tombstones carrying only their ID.
+        """
+        if self.deleted_at is not None:
+            return {
+                'id': self.id,
+                'change_seq': self.change_seq,
+                'deleted': True,
+                'deleted_at': self.deleted_at.isoformat()
+            }
+        change = self.serialize()
+        change['change_seq'] = self.change_seq
+        change['deleted'] = False
+        return change
+
     @classmethod
-    def get_tool(cls, tool_id):
+    def get_tool(cls, tool_id, include_archived=False):
         """
         Helper method to get a tool by ID.
 
         Args:
             tool_id (int): ID of the tool to retrieve
+            include_archived (bool): Look in the archive if the tool is not in the tool table
 
         Returns:
-            Tool: The tool with the given ID, or None if not found
+            Tool: The tool with the given ID (an ArchivedTool if it came from the
+            archive), or None if not found or deleted
         """
-        return cls.query.get(tool_id)
+        tool = cls.query.filter_by(id=tool_id, deleted_at=None).first()
+        if tool is None and include_archived:
+            return ArchivedTool.get_tool(tool_id)
+        return tool
 
     @classmethod
-    def get_all_tools(cls):
+    def get_tools_by_ids(cls, tool_ids, include_archived=False):
+        """
+        Helper method to get several tools by ID with one query.
+
+        Args:
+            tool_ids (list): IDs of the tools to retrieve
+            include_archived (bool): Look up the IDs missing from the tool table in the archive
+
+        Returns:
+            dict: The tools found, keyed by ID; deleted and unknown IDs are absent
+        """
+        if not tool_ids:
+            return {}
+        tools = cls.query.filter(cls.id.in_(tool_ids), cls.deleted_at.is_(None)).all()
+        found = {tool.id: tool for tool in tools}
+        if include_archived and len(found) < len(set(tool_ids)):
+            found.update(ArchivedTool.get_tools_by_ids([tool_id for tool_id in tool_ids if tool_id not in found]))
+        return found
+
+    @classmethod
+    def get_all_tools(cls, tags=None, include_archived=False):
         """
         Helper method to get all tools.
 
+        Args:
+            tags (list): Only return tools that carry all of these tags
+            include_archived (bool): Return archived tools as well, merged in ID order
+
         Returns:
-            list: A list of all tools
+            list: A list of all tools that have not been deleted
         """
-        return cls.query.all()
+        query = cls.query.filter_by(deleted_at=None)
+        if tags:
+            query = query.filter(cls.tagged_with(tags))
+        if include_archived:
+            return sorted(query.all() + ArchivedTool.get_all_tools(tags), key=lambda tool: tool.id)
+        return query.all()
+
+    @classmethod
+    def get_page(cls, after, limit, tags=None, include_archived=False):
+        """
+        Helper method to get a page of tools in ID order.
+
+        Args:
+            after (int): Only return tools with a higher ID, or None for the first page
+            limit (int): Maximum number of tools to return
+            tags (list): Only return tools that carry all of these tags
+            include_archived (bool): Page through archived tools as well
+
+        Returns:
+            list: Tools that have not been deleted, in ID order
+        """
+        query = cls.query.filter(cls.deleted_at.is_(None))
+        if tags:
+            query = query.filter(cls.tagged_with(tags))
+        if after is not None:
+            query = query.filter(cls.id > after)
+        tools = query.order_by(cls.id).limit(limit).all()
+        if include_archived:
+            # Both pages are in ID order, so the merged page is their first `limit` tools
+            archived = ArchivedTool.get_page(after, limit, tags)
+            tools = list(heapq.merge(tools, archived, key=lambda tool: tool.id))[:limit]
+        return tools
+
+    @classmethod
+    def get_changes(cls, since, limit):
+        """
+        Helper method to get the tools changed after a change sequence number.
+
+        Args:
+            since (int): Only return changes with a higher sequence number
+            limit (int): Maximum number of changes to return
+
+        Returns:
+            list: Changed tools, including deleted ones, in sequence order; tools
+            moved to the archive since are ArchivedTools
+        """
+        changes = cls.query.filter(cls.change_seq > since).order_by(cls.change_seq).limit(limit).all()
+        archived = ArchivedTool.query.filter(ArchivedTool.change_seq > since) \
+            .order_by(ArchivedTool.change_seq).limit(limit).all()
+        if not archived:
+            return changes
+        return list(heapq.merge(changes, archived, key=lambda tool: tool.change_seq))[:limit]
 
     def update(self, data):
         """
@@ -88,21 +375,232 @@ class Tool(db.Model):
             self.name = data['name']
         if 'description' in data:
             self.description = data['description']
+        if 'tags' in data:
+            self.set_tags(data['tags'])
 
-        db.session.commit()
+        # Commit the session the tool was loaded in, which is a shard's in sharded mode
+        object_session(self).commit()
+        send_tool_changed(self, 'updated')
         return self
 
     def delete(self):
         """
         Helper method to delete a tool.
 
+        The row is kept as a tombstone so that clients following the change
+        feed learn about the deletion.
+
         Returns:
             int: The ID of the deleted tool
         """
-        tool_id = self.id
-        db.session.delete(self)
-        db.session.commit()
-        return tool_id
+        self.deleted_at = datetime.utcnow()
+        object_session(self).commit()
+        send_tool_changed(self, 'deleted')
+        return self.id
+
+    def retire(self):
+        """
+        Helper method to mark a tool as retired.
+
+        The tool stays in the tool table until the next archive job moves it
+        to the archive (see archive.py).
+
+        Returns:
+            Tool: The retired tool
+        """
+        if self.retired_at is None:
+            self.retired_at = datetime.utcnow()
+            object_session(self).commit()
+            send_tool_changed(self, 'retired')
+        return self
+
+
+@event.listens_for(Tool, 'before_insert')
+@event.listens_for(Tool, 'before_update')
+def assign_tool_change_seq(mapper, connection, target):
+    target.change_seq = next_change_seq(connection, 'tool')
+
+
+# Tags of archived tools, kept apart from tool_tag so the hot link table only holds hot tools
+archived_tool_tags = db.Table(
+    'tool_archive_tag',
+    db.Column('tool_id', db.Integer, db.ForeignKey('tool_archive.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_tool_archive_tag_tag_id_tool_id', 'tag_id', 'tool_id')
+)
+
+
+class ArchivedTool(db.Model):
+    """
+    A tool moved out of the tool table by the archive job (see archive.py).
+
+    Archived tools keep their IDs and can still be read, but they are left
+    out of default listings and cannot be changed. Their owners still count
+    them in tool_count.
+    """
+    __tablename__ = 'tool_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(80), nullable=False)
+    description = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    retired_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Sequence number of the move to the archive, from the tool change counter, so
+    # the change feed reports the tool leaving the tool table
+    change_seq = db.Column(db.BigInteger, nullable=False, default=0, server_default='0', index=True)
+    tags = db.relationship('Tag', secondary=archived_tool_tags, lazy='selectin', order_by='Tag.name')
+
+    def __repr__(self):
+        return f'<ArchivedTool {self.name}>'
+
+    def serialize(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'user_id': self.user_id,
+            'tags': [tag.name for tag in self.tags],
+            'archived': True,
+            'archived_at': self.archived_at.isoformat()
+        }
+
+    def serialize_change(self):
+        """
+        Serialize the tool as an entry of the change feed, reporting its move to the archive.
+        """
+        change = self.serialize()
+        change['change_seq'] = self.change_seq
+        change['deleted'] = False
+        return change
+
+    @classmethod
+    def tagged_with(cls, tags):
+        """
+        Build a filter matching the archived tools that carry all of the given tags.
+        """
+        return cls.id.in_(_tagged_tool_ids(archived_tool_tags, tags))
+
+    @classmethod
+    def get_tool(cls, tool_id):
+        """
+        Helper method to get an archived tool by ID.
+
+        Returns:
+            ArchivedTool: The archived tool, or None if not found
+        """
+        return db.session.get(cls, tool_id)
+
+    @classmethod
+    def get_tools_by_ids(cls, tool_ids):
+        """
+        Helper method to get several archived tools by ID with one query.
+
+        Returns:
+            dict: The archived tools found, keyed by ID
+        """
+        if not tool_ids:
+            return {}
+        return {tool.id: tool for tool in cls.query.filter(cls.id.in_(tool_ids)).all()}
+
+    @classmethod
+    def get_all_tools(cls, tags=None):
+        """
+        Helper method to get all archived tools, in ID order.
+
+        Args:
+            tags (list): Only return tools that carry all of these tags
+        """
+        query = cls.query
+        if tags:
+            query = query.filter(cls.tagged_with(tags))
+        return query.order_by(cls.id).all()
+
+    @classmethod
+    def get_page(cls, after, limit, tags=None):
+        """
+        Helper method to get a page of archived tools in ID order, as Tool.get_page.
+        """
+        query = cls.query
+        if tags:
+            query = query.filter(cls.tagged_with(tags))
+        if after is not None:
+            query = query.filter(cls.id > after)
+        return query.order_by(cls.id).limit(limit).all()
+
+    @classmethod
+    def get_facets(cls, tags=None, session=None):
+        """
+        Helper method to count the archived tools carrying each tag, as Tag.get_facets.
+        """
+        query = db.select(Tag.name, db.func.count()) \
+            .select_from(archived_tool_tags) \
+            .join(Tag, Tag.id == archived_tool_tags.c.tag_id) \
+            .group_by(Tag.name)
+        if tags:
+            query = query.where(archived_tool_tags.c.tool_id.in_(_tagged_tool_ids(archived_tool_tags, tags)))
+        return dict((session or db.session).execute(query).all())
+
+
+class ToolQuotaExceeded(Exception):
+    """
+    Raised when creating a tool would take its owner past MAX_TOOLS_PER_USER.
+    """
+
+
+def adjust_tool_count(connection, user_id, delta, limit=0):
+    """
+    Add delta to a user's denormalized tool count.
+
+    With a limit, the count is only raised if it stays within the limit; the
+    check and the increment are one UPDATE, so concurrent creates cannot
+    overshoot the quota.
+
+    Returns:
+        bool: True if the user's count was changed
+    """
+    user = User.__table__
+    query = user.update().where(user.c.id == user_id).values(tool_count=user.c.tool_count + delta)
+    if delta > 0 and limit:
+        query = query.where(user.c.tool_count + delta <= limit)
+    return connection.execute(query).rowcount == 1
+
+
+def recount_tools(connection):
+    """
+    Recompute every user's tool count, after bulk loads that bypass the ORM hooks.
+    """
+    tool, archive, user = Tool.__table__, ArchivedTool.__table__, User.__table__
+    count = db.select(db.func.count(tool.c.id)) \
+        .where(tool.c.user_id == user.c.id, tool.c.deleted_at.is_(None)) \
+        .scalar_subquery()
+    archived = db.select(db.func.count(archive.c.id)).where(archive.c.user_id == user.c.id).scalar_subquery()
+    connection.execute(user.update().values(tool_count=count + archived))
+
+
+def _on_shard(target):
+    # Tools on a shard are counted by sharding.py, since the user table is elsewhere
+    session = object_session(target)
+    return session is not None and 'shard' in session.info
+
+
+@event.listens_for(Tool, 'after_insert')
+def count_inserted_tool(mapper, connection, target):
+    if target.deleted_at is not None or _on_shard(target):
+        return
+    limit = current_app.config.get('MAX_TOOLS_PER_USER', 0) if has_app_context() else 0
+    if not adjust_tool_count(connection, target.user_id, 1, limit) and limit:
+        raise ToolQuotaExceeded(f'User {target.user_id} already owns {limit} tools')
+
+
+@event.listens_for(Tool, 'after_update')
+def count_deleted_tool(mapper, connection, target):
+    if _on_shard(target):
+        return
+    history = db.inspect(target).attrs.deleted_at.history
+    if history.added and history.added[0] is not None and not any(history.deleted):
+        adjust_tool_count(connection, target.user_id, -1)
 
 
 class User(db.Model):
@@ -110,6 +608,9 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(120), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
+    # Number of tools the user owns that have not been deleted, archived ones included,
+    # maintained by the Tool mapper events
+    tool_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -118,7 +619,8 @@ class User(db.Model):
         return {
             'id': self.id,
             'username': self.username,
-            'email': self.email
+            'email': self.email,
+            'tool_count': self.tool_count
         }
 
     @classmethod
@@ -143,3 +645,244 @@ class User(db.Model):
             list: A list of all users
         """
         return cls.query.all()
+
+
+class Job(db.Model):
+    """
+    A background job, such as a bulk import or a catalog export.
+
+    Job state lives in the database so that queued and interrupted jobs
+    survive a restart of the worker processes.
+    """
+    __tablename__ = 'job'
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(40), nullable=False)
+    # queued, running, succeeded, failed or cancelled
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    params = db.Column(db.Text, nullable=True)
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=True)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    created_by = db.Column(db.String(255), nullable=True)
+    worker_id = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+    FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.type} {self.status}>'
+
+    def serialize(self):
+        return {
+            'id': self.id,
+            'type': self.type,
+            'status': self.status,
+            'progress': self.progress,
+            'total': self.total,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'cancel_requested': self.cancel_requested,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    @classmethod
+    def create_job(cls, job_type, params, created_by=None):
+        """
+        Helper method to queue a new job.
+
+        Args:
+            job_type (str): The job type
+            params (dict): Parameters passed to the job handler
+            created_by (str): Subject of the token that queued the job
+
+        Returns:
+            Job: The newly queued job
+        """
+        job = cls(type=job_type, params=json.dumps(params), created_by=created_by)
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    @classmethod
+    def get_job(cls, job_id):
+        """
+        Helper method to get a job by ID.
+
+        Returns:
+            Job: The job with the given ID, or None if not found
+        """
+        return db.session.get(cls, job_id)
+
+    def cancel(self):
+        """
+        Helper method to cancel a job.
+
+        A queued job is cancelled immediately; a running job stops at its next
+        progress report.
+
+        Returns:
+            Job: The job
+        """
+        if self.status == 'queued':
+            self.status = 'cancelled'
+            self.finished_at = datetime.utcnow()
+        elif self.status == 'running':
+            self.cancel_requested = True
+        db.session.commit()
+        return self
+
+
+class AuditEntry(db.Model):
+    """
+    A record of who changed what, written in batches by the audit log (see audit.py).
+    """
+    __tablename__ = 'audit_log'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    occurred_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # JWT subject of the caller, or of the caller who queued a background job
+    actor = db.Column(db.String(255), nullable=True, index=True)
+    action = db.Column(db.String(40), nullable=False)
+    resource_type = db.Column(db.String(40), nullable=False)
+    resource_id = db.Column(db.Integer, nullable=True)
+    details = db.Column(db.JSON, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_audit_log_resource', 'resource_type', 'resource_id'),
+    )
+
+    def serialize(self):
+        return {
+            'id': self.id,
+            'occurred_at': self.occurred_at.isoformat(),
+            'actor': self.actor,
+            'action': self.action,
+            'resource_type': self.resource_type,
+            'resource_id': self.resource_id,
+            'details': self.details
+        }
+
+    @classmethod
+    def get_page(cls, before=None, limit=100, actor=None, resource_type=None, resource_id=None):
+        """
+        Helper method to get a page of audit entries, newest first.
+
+        Pages are keyed on the entry ID rather than an offset, so each page
+        costs the same however deep into the log it is.
+
+        Args:
+            before (int): Only return entries with a lower ID
+            limit (int): Maximum number of entries to return
+            actor (str): Only return entries by this subject
+            resource_type (str): Only return entries about this type of resource
+            resource_id (int): Only return entries about this resource
+
+        Returns:
+            list: Audit entries in descending ID order
+        """
+        query = cls.query
+        if before is not None:
+            query = query.filter(cls.id < before)
+        if actor is not None:
+            query = query.filter(cls.actor == actor)
+        if resource_type is not None:
+            query = query.filter(cls.resource_type == resource_type)
+        if resource_id is not None:
+            query = query.filter(cls.resource_id == resource_id)
+        return query.order_by(cls.id.desc()).limit(limit).all()
+
+
+class ToolUsage(db.Model):
+    """
+    Reads of each tool, counted per time bucket and written in aggregated
+    batches by the usage counter (see usage.py).
+
+    Rows are keyed by bucket first, so totals over a recent window are read
+    with one range scan. There is no foreign key to tool, since counts stay
+    valid when a tool moves to the archive.
+    """
+    __tablename__ = 'tool_usage'
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    tool_id = db.Column(db.Integer, primary_key=True)
+    hits = db.Column(db.BigInteger, nullable=False, default=0)
+
+    @classmethod
+    def add_hits(cls, connection, hits):
+        """
+        Add access counts to their buckets with one upsert statement.
+
+        Rows are written in key order, so concurrent flushes from several
+        workers lock them in the same order and cannot deadlock.
+
+        Args:
+            connection: The connection of the flushing transaction
+            hits (dict): Counts keyed by (bucket_start, tool_id)
+        """
+        table = cls.__table__
+        rows = [{'bucket_start': bucket_start, 'tool_id': tool_id, 'hits': count}
+                for (bucket_start, tool_id), count in sorted(hits.items())]
+        if not rows:
+            return
+
+        dialect = connection.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.bucket_start, table.c.tool_id],
+                set_={'hits': table.c.hits + stmt.excluded.hits}
+            )
+            connection.execute(stmt, rows)
+            return
+
+        # Databases without INSERT ... ON CONFLICT: update, then insert the rows that were missing
+        for row in rows:
+            result = connection.execute(
+                table.update()
+                .where(table.c.bucket_start == row['bucket_start'], table.c.tool_id == row['tool_id'])
+                .values(hits=table.c.hits + row['hits'])
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(**row))
+
+    @classmethod
+    def get_popular(cls, since, limit=10):
+        """
+        Helper method to get the most read tools since a point in time.
+
+        Args:
+            since (datetime): Start of the oldest bucket to count
+            limit (int): Maximum number of tools to return
+
+        Returns:
+            list: (tool_id, hits) tuples, most hits first, ties in ID order
+        """
+        total = db.func.sum(cls.hits).label('total')
+        rows = db.session.execute(
+            db.select(cls.tool_id, total)
+            .where(cls.bucket_start >= since)
+            .group_by(cls.tool_id)
+            .order_by(total.desc(), cls.tool_id)
+            .limit(limit)
+        ).all()
+        return [(row.tool_id, int(row.total)) for row in rows]
+
+    @classmethod
+    def prune(cls, connection, before):
+        """
+        Delete buckets that start before a point in time.
+
+        Returns:
+            int: The number of rows deleted
+        """
+        table = cls.__table__
+        return connection.execute(table.delete().where(table.c.bucket_start < before)).rowcount
@@ -5,14 +5,55 @@ Database Population Script for Cybersecurity Tools Management API
 
 This script populates the database with sample data for testing purposes.
 It creates sample users and tools that can be used to test the API functionality.
+
+Run without arguments to insert a handful of well-known sample tools. Pass
+--users and/or --tools to generate large volumes of reproducible synthetic
+data instead, e.g. for benchmarking indexes, pagination and search:
+
+    python populate_db.py --users 10000 --tools 10000000 --seed 42
+
+Synthetic rows are streamed in batches: with PostgreSQL (psycopg2) each batch
+is loaded with COPY, on other databases with a single executemany INSERT.
 """
 
-import os
+import argparse
+import csv
+import io
+import random
 import sys
-from flask import Flask
-from models import db, User, Tool
+import time
+from datetime import datetime, timedelta
+from models import db, User, Tool, next_change_seq, recount_tools
 from app import create_app
 
+# Vocabulary for synthetic tool names and descriptions
+TOOL_CATEGORIES = [
+    'Scanner', 'Proxy', 'Fuzzer', 'Sniffer', 'Cracker', 'Exploit Kit', 'Forensics Suite',
+    'Disassembler', 'Debugger', 'Vulnerability Scanner', 'Password Auditor', 'Packet Crafter',
+    'Log Analyzer', 'Honeypot', 'Firewall Tester', 'Malware Sandbox', 'Recon Framework',
+]
+TOOL_PREFIXES = [
+    'Net', 'Web', 'Cloud', 'Wire', 'Hash', 'Shadow', 'Iron', 'Red', 'Blue', 'Deep', 'Quick',
+    'Stealth', 'Cyber', 'Packet', 'Root', 'Kernel', 'Zero', 'Hex', 'Byte', 'Vault',
+]
+TOOL_TARGETS = [
+    'web applications', 'wireless networks', 'Active Directory', 'cloud workloads',
+    'TLS endpoints', 'mobile apps', 'IoT devices', 'container images', 'REST APIs',
+    'memory dumps', 'disk images', 'network traffic', 'password hashes', 'DNS zones',
+]
+TOOL_ACTIONS = [
+    'Discovers and fingerprints', 'Intercepts and modifies traffic to', 'Audits the configuration of',
+    'Automates exploitation of', 'Extracts artefacts from', 'Continuously monitors',
+    'Brute-forces credentials for', 'Maps the attack surface of', 'Reverse engineers',
+]
+USERNAME_WORDS = [
+    'alpha', 'bravo', 'cipher', 'delta', 'echo', 'falcon', 'ghost', 'hunter', 'ion', 'jolt',
+    'kilo', 'lynx', 'matrix', 'nova', 'onyx', 'pixel', 'quartz', 'raven', 'sigma', 'talon',
+]
+
+# Synthetic tools are spread over this many days before now
+CREATED_AT_SPAN_DAYS = 3 * 365
+
 def populate_database():
     """
     Populate the database with sample data.
@@ -23,10 +64,10 @@ def populate_database():
     try:
         print("Creating sample users...")
         
-        # Check if users already exist to avoid duplicates
-        existing_users = User.query.all()
-        if existing_users:
-            print(f"Found {len(existing_users)} existing users. Skipping user creation.")
+        # Check if users already exist to avoid duplicates.
+        # Only fetch one id: loading every row just to test emptiness is a full table scan.
+        if db.session.query(User.id).first() is not None:
+            print("Found existing users. Skipping user creation.")
         else:
             users = [
                 User(username="admin_user", email="admin@example.com"),
@@ -40,16 +81,15 @@ def populate_database():
             db.session.commit()
             print(f"Created {len(users)} sample users.")
         
-        # Get all users for reference when creating tools
-        all_users = User.query.all()
+        # Get the first few users for reference when creating tools
+        all_users = User.query.order_by(User.id).limit(3).all()
         
         # Create sample tools
         print("Creating sample tools...")
         
         # Check if tools already exist to avoid duplicates
-        existing_tools = Tool.query.all()
-        if existing_tools:
-            print(f"Found {len(existing_tools)} existing tools. Skipping tool creation.")
+        if db.session.query(Tool.id).first() is not None:
+            print("Found existing tools. Skipping tool creation.")
         else:
             # Create tools for each user
             tools = [
@@ -99,9 +139,180 @@ def populate_database():
         print(f"Error populating database: {e}")
         return False
 
+def generate_users(count, rng, seed):
+    """
+    Yield synthetic user rows as (username, email) tuples.
+
+    The seed is part of every username so that runs with different seeds
+    never collide on the unique username and email columns.
+    """
+    for i in range(count):
+        username = f"{rng.choice(USERNAME_WORDS)}_{rng.choice(USERNAME_WORDS)}_{seed}_{i}"
+        yield username, f"{username}@example.com"
+
+
+def generate_tools(count, user_ids, rng, first_change_seq):
+    """
+    Yield synthetic tool rows as (name, description, created_at, user_id, change_seq) tuples.
+
+    created_at is rendered as an ISO 8601 string, which both COPY and the
+    SQLite DateTime column accept directly.
+    """
+    now = datetime.utcnow().replace(microsecond=0)
+    span_seconds = CREATED_AT_SPAN_DAYS * 24 * 3600
+    for i in range(count):
+        category = rng.choice(TOOL_CATEGORIES)
+        name = f"{rng.choice(TOOL_PREFIXES)}{rng.choice(TOOL_PREFIXES).lower()} {category} {i}"
+        description = f"{rng.choice(TOOL_ACTIONS)} {rng.choice(TOOL_TARGETS)}. Category: {category.lower()}."
+        created_at = (now - timedelta(seconds=rng.randrange(span_seconds))).isoformat(' ')
+        yield name[:80], description[:255], created_at, rng.choice(user_ids), first_change_seq + i
+
+
+def batched(rows, size):
+    """Group an iterable of rows into lists of at most size rows."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def supports_copy():
+    """Return True if the database is PostgreSQL accessed through psycopg2."""
+    return db.engine.dialect.name == 'postgresql' and db.engine.dialect.driver == 'psycopg2'
+
+
+def copy_rows(table, columns, rows):
+    """
+    Load one batch of rows with PostgreSQL COPY.
+
+    The batch is rendered as CSV into memory, so memory use is bounded by the batch size.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+
+    raw_connection = db.engine.raw_connection()
+    try:
+        cursor = raw_connection.cursor()
+        cursor.copy_expert(
+            f'COPY "{table.name}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+        raw_connection.commit()
+    finally:
+        raw_connection.close()
+
+
+def insert_rows(table, columns, rows):
+    """
+    Load one batch of rows with a single executemany INSERT.
+
+    The statement is passed straight to the driver: building a parameter dict
+    per row through the ORM or Core would cost more than the insert itself.
+    """
+    placeholder = '?' if db.engine.dialect.paramstyle == 'qmark' else '%s'
+    statement = (
+        f'INSERT INTO "{table.name}" ({", ".join(columns)}) '
+        f'VALUES ({", ".join([placeholder] * len(columns))})'
+    )
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql(statement, rows)
+
+
+def load_rows(table, columns, rows, batch_size, label):
+    """
+    Stream rows into a table in batches, reporting progress.
+
+    Returns:
+        int: The number of rows loaded.
+    """
+    load_batch = copy_rows if supports_copy() else insert_rows
+    loaded = 0
+    start = time.perf_counter()
+    for batch in batched(rows, batch_size):
+        load_batch(table, columns, batch)
+        loaded += len(batch)
+        elapsed = time.perf_counter() - start
+        print(f"  {label}: {loaded} rows ({loaded / elapsed:,.0f} rows/s)")
+    return loaded
+
+
+def generate_database(user_count, tool_count, seed, batch_size):
+    """
+    Populate the database with large volumes of synthetic, reproducible data.
+
+    Args:
+        user_count (int): Number of users to generate
+        tool_count (int): Number of tools to generate
+        seed (int): Random seed; the same seed produces the same rows
+        batch_size (int): Rows per COPY or INSERT batch
+
+    Returns:
+        bool: True if generation succeeded
+    """
+    rng = random.Random(seed)
+    method = 'COPY' if supports_copy() else 'executemany'
+    print(f"Generating {user_count} users and {tool_count} tools (seed {seed}, {method})...")
+
+    try:
+        if user_count:
+            load_rows(User.__table__, ['username', 'email'],
+                      generate_users(user_count, rng, seed), batch_size, 'users')
+
+        if tool_count:
+            # Only the id column is loaded so that owners can be assigned to tools
+            user_ids = [row.id for row in db.session.query(User.id).order_by(User.id)]
+            if not user_ids:
+                print("Error: tools need at least one user. Pass --users as well.")
+                return False
+
+            # Bulk loads bypass the ORM hooks, so reserve a block of change sequence
+            # numbers up front to make the new tools visible in the change feed
+            with db.engine.begin() as connection:
+                first_change_seq = next_change_seq(connection, 'tool', tool_count) - tool_count + 1
+
+            load_rows(Tool.__table__, ['name', 'description', 'created_at', 'user_id', 'change_seq'],
+                      generate_tools(tool_count, user_ids, rng, first_change_seq), batch_size, 'tools')
+
+            # The per-user tool counts are maintained by the ORM hooks too
+            with db.engine.begin() as connection:
+                recount_tools(connection)
+
+        print("Synthetic data generation completed successfully!")
+        return True
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error generating synthetic data: {e}")
+        return False
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Populate the database with sample or synthetic data.")
+    parser.add_argument('--users', type=int, default=0, help="Number of synthetic users to generate")
+    parser.add_argument('--tools', type=int, default=0, help="Number of synthetic tools to generate")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for reproducible data")
+    parser.add_argument('--batch-size', type=int, default=50000, help="Rows per COPY or INSERT batch")
+    parser.add_argument('--create-tables', action='store_true',
+                        help="Create missing tables first (useful for a fresh SQLite file)")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parse_args()
+
     # Create Flask app and push application context
     app = create_app()
     with app.app_context():
-        success = populate_database()
-        sys.exit(0 if success else 1)
\ No newline at end of file
+        if args.create_tables:
+            db.create_all()
+
+        if args.users or args.tools:
+            success = generate_database(args.users, args.tools, args.seed, args.batch_size)
+        else:
+            success = populate_database()
+        sys.exit(0 if success else 1)
@@ -0,0 +1,218 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from flask import current_app, make_response, request
+
+# Token permission required to profile a request and to read profiles
+PROFILE_PERMISSION = 'profile:requests'
+
+PROFILE_MODES = ('cpu', 'memory')
+
+_PROFILE_ID = re.compile(r'^[0-9]+-[0-9a-f]{8}-(cpu|memory)$')
+
+
+class ProfileStore:
+    """
+    Keeps the most recent profiles as files in a directory.
+
+    CPU profiles are stored in pstats format, memory profiles as text reports.
+    """
+
+    def __init__(self, directory, keep=100):
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, profile_id):
+        """Return the file of a profile, or None if the ID is not valid."""
+        match = _PROFILE_ID.match(profile_id)
+        if match is None:
+            return None
+        extension = 'pstats' if match.group(1) == 'cpu' else 'txt'
+        return os.path.join(self.directory, f'{profile_id}.{extension}')
+
+    def new_id(self, mode):
+        return f'{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}-{mode}'
+
+    def list(self):
+        """Return the IDs of the stored profiles, newest first."""
+        names = [os.path.splitext(name)[0] for name in os.listdir(self.directory)]
+        return sorted((name for name in names if _PROFILE_ID.match(name)), reverse=True)
+
+    def prune(self):
+        for profile_id in self.list()[self.keep:]:
+            try:
+                os.remove(self.path(profile_id))
+            except OSError:
+                pass
+
+    def report(self, profile_id, limit=40):
+        """
+        Render a stored profile as text.
+
+        Returns:
+            str: The report, or None if there is no such profile
+        """
+        path = self.path(profile_id)
+        if path is None or not os.path.exists(path):
+            return None
+        if path.endswith('.txt'):
+            with open(path) as f:
+                return f.read()
+        output = io.StringIO()
+        pstats.Stats(path, stream=output).sort_stats('cumulative').print_stats(limit)
+        return output.getvalue()
+
+
+class RequestProfiler:
+    """
+    Profiles individual requests on demand.
+
+    'cpu' runs the view under cProfile. 'memory' traces allocations with
+    tracemalloc, records the request's allocation peak for its endpoint and
+    stores the lines that allocated the most. Only one request per process is
+    profiled at a time, since both profilers observe the whole interpreter;
+    a request that asks while another is being profiled runs unprofiled.
+    """
+
+    def __init__(self, store, sample_rate=0.0):
+        self.store = store
+        self.sample_rate = sample_rate
+        self.memory_peaks = {}
+        self._busy = threading.Lock()
+        self._peaks_lock = threading.Lock()
+
+    def choose_mode(self, payload):
+        """
+        Decide whether and how to profile the current request.
+
+        Returns:
+            tuple: (mode, on_demand) where mode is 'cpu', 'memory' or None to run
+            the request unprofiled, and on_demand is False for sampled requests
+        """
+        requested = request.headers.get('X-Profile')
+        if requested in PROFILE_MODES and PROFILE_PERMISSION in payload.get('permissions', ()):
+            return requested, True
+        if self.sample_rate and random.random() < self.sample_rate:
+            return 'cpu', False
+        return None, False
+
+    def run(self, mode, f, *args, **kwargs):
+        """
+        Run a view under the profiler selected by mode.
+
+        Returns:
+            tuple: (response, profile ID or None if the profiler was busy)
+        """
+        if not self._busy.acquire(blocking=False):
+            return make_response(f(*args, **kwargs)), None
+        try:
+            if mode == 'memory':
+                return self._run_memory(f, *args, **kwargs)
+            return self._run_cpu(f, *args, **kwargs)
+        finally:
+            self._busy.release()
+
+    def _run_cpu(self, f, *args, **kwargs):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            # The response is built inside the profile so serialization is included
+            response = make_response(f(*args, **kwargs))
+        finally:
+            profiler.disable()
+        profile_id = self.store.new_id('cpu')
+        profiler.dump_stats(self.store.path(profile_id))
+        self.store.prune()
+        return response, profile_id
+
+    def _run_memory(self, f, *args, **kwargs):
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(10)
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        before = tracemalloc.take_snapshot()
+        try:
+            response = make_response(f(*args, **kwargs))
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+        finally:
+            if started:
+                tracemalloc.stop()
+
+        peak_bytes = peak - baseline
+        self.record_memory_peak(request.endpoint, peak_bytes)
+
+        lines = [
+            f'{request.method} {request.full_path.rstrip("?")} ({request.endpoint})',
+            f'Allocation peak: {peak_bytes} bytes; retained after the request: {current - baseline} bytes',
+            '',
+            'Top allocating lines (size difference, count difference):',
+        ]
+        lines.extend(str(stat) for stat in after.compare_to(before, 'lineno')[:25])
+        profile_id = self.store.new_id('memory')
+        with open(self.store.path(profile_id), 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        self.store.prune()
+        return response, profile_id
+
+    def record_memory_peak(self, endpoint, peak_bytes):
+        with self._peaks_lock:
+            stats = self.memory_peaks.setdefault(
+                endpoint, {'requests': 0, 'max_peak_bytes': 0, 'last_peak_bytes': 0}
+            )
+            stats['requests'] += 1
+            stats['max_peak_bytes'] = max(stats['max_peak_bytes'], peak_bytes)
+            stats['last_peak_bytes'] = peak_bytes
+
+    def memory_report(self):
+        """Return a copy of the per-endpoint allocation peaks."""
+        with self._peaks_lock:
+            return {endpoint: dict(stats) for endpoint, stats in self.memory_peaks.items()}
+
+
+def run_view(payload, f, *args, **kwargs):
+    """
+    Run a view for requires_auth, profiling it when the caller asked for it
+    or the request was sampled.
+
+    The response to a caller who asked for a profile carries the stored
+    profile's ID in the X-Profile-Id header; sampled profiles are only stored.
+    """
+    profiler = current_app.extensions.get('request_profiler')
+    mode, on_demand = profiler.choose_mode(payload) if profiler is not None else (None, False)
+    if mode is None:
+        return f(*args, **kwargs)
+
+    response, profile_id = profiler.run(mode, f, *args, **kwargs)
+    if profile_id is not None and on_demand:
+        response.headers['X-Profile-Id'] = profile_id
+    return response
+
+
+def init_profiling(app):
+    """
+    Enable on-demand request profiling for the app when PROFILE_ENABLED is set.
+
+    Settings:
+        PROFILE_SAMPLE_RATE: Fraction of authenticated requests profiled automatically
+        PROFILE_DIR: Directory where profiles are stored
+        PROFILE_KEEP: Number of most recent profiles kept
+    """
+    if not app.config.get('PROFILE_ENABLED', False):
+        return
+
+    store = ProfileStore(
+        app.config.get('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'tool-profiles'),
+        keep=app.config.get('PROFILE_KEEP', 100)
+    )
+    app.extensions['request_profiler'] = RequestProfiler(store, app.config.get('PROFILE_SAMPLE_RATE', 0.0))
@@ -0,0 +1,253 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, request
+from werkzeug.exceptions import TooManyRequests, ServiceUnavailable
+
+
+class MemoryBackend:
+    """
+    Token buckets kept in this process's memory.
+
+    Each gunicorn worker enforces its own limits, so the effective limit for a
+    subject is multiplied by the number of workers.
+
+    At most max_keys buckets are kept. Past that, the least recently used
+    bucket is dropped: it is the one most likely to have refilled, and if it
+    had not, its caller only gets a full bucket back early.
+    """
+
+    def __init__(self, max_keys=10000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        # Least recently used first
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """
+        Take one token from the bucket for key.
+
+        Args:
+            key (str): The bucket key
+            rate (float): Tokens added per second
+            burst (int): Bucket capacity
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until one is available
+        """
+        with self._lock:
+            now = self.clock()
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class SQLiteBackend:
+    """
+    Token buckets shared by all worker processes on one host through a SQLite file.
+
+    Every take() runs in its own write transaction, so buckets stay consistent
+    across processes at the cost of one small local write per request. At most
+    every prune_interval seconds, a take() also deletes the buckets that have
+    refilled completely.
+    """
+
+    def __init__(self, path, clock=time.time, prune_interval=60.0):
+        self.path = path
+        self.clock = clock
+        self.prune_interval = prune_interval
+        self._last_prune = clock()
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit_bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                'updated REAL NOT NULL, full_at REAL NOT NULL DEFAULT 0)'
+            )
+            # Files written before buckets recorded when they are full again; their rows are pruned first
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(rate_limit_bucket)')}
+            if 'full_at' not in columns:
+                conn.execute('ALTER TABLE rate_limit_bucket ADD COLUMN full_at REAL NOT NULL DEFAULT 0')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_rate_limit_bucket_full_at ON rate_limit_bucket (full_at)')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _connection(self):
+        # SQLite connections must not be shared between threads or across a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, key, rate, burst):
+        """Take one token from the bucket for key. See MemoryBackend.take."""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = self.clock()
+            row = conn.execute('SELECT tokens, updated FROM rate_limit_bucket WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute('INSERT OR REPLACE INTO rate_limit_bucket (key, tokens, updated, full_at) '
+                         'VALUES (?, ?, ?, ?)', (key, tokens, now, now + (burst - tokens) / rate))
+            if now - self._last_prune >= self.prune_interval:
+                conn.execute('DELETE FROM rate_limit_bucket WHERE full_at <= ?', (now,))
+                self._last_prune = now
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+
+class RateLimiter:
+    """
+    Per-subject, per-route token-bucket rate limiter.
+
+    Args:
+        backend: A MemoryBackend or SQLiteBackend
+        rate (float): Default requests per second allowed for each subject and route
+        burst (int): Default number of requests allowed in a burst
+        route_limits (dict): Optional {endpoint: (rate, burst)} overrides
+    """
+
+    def __init__(self, backend, rate, burst, route_limits=None):
+        self.backend = backend
+        self.rate = rate
+        self.burst = burst
+        self.route_limits = route_limits or {}
+
+    def hit(self, subject, endpoint):
+        """
+        Record a request and return the seconds to wait before retrying, or 0 if allowed.
+        """
+        rate, burst = self.route_limits.get(endpoint, (self.rate, self.burst))
+        return self.backend.take(f'{subject}:{endpoint}', rate, burst)
+
+
+class AdmissionController:
+    """
+    Caps the number of requests a process works on at the same time.
+
+    Requests over the cap are rejected immediately instead of queueing for a
+    database connection.
+    """
+
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+def _retry_after_seconds(wait):
+    # Retry-After takes whole seconds; never tell a client to retry immediately
+    return max(1, int(wait + 0.999))
+
+
+def get_subject(payload):
+    """
+    Get the key that identifies the caller of a request.
+
+    Uses the JWT subject, falling back to the client id for machine tokens
+    and to the remote address when neither is present.
+    """
+    return payload.get('sub') or payload.get('azp') or payload.get('client_id') or request.remote_addr
+
+
+def check_rate_limit(payload):
+    """
+    Enforce the rate limit for the authenticated caller of the current request.
+
+    Called by requires_auth once the token has been verified. Does nothing
+    when rate limiting is not enabled for the app.
+
+    Raises:
+        TooManyRequests: If the caller has exhausted its bucket for this route.
+    """
+    limiter = current_app.extensions.get('rate_limiter')
+    if limiter is None:
+        return
+
+    wait = limiter.hit(get_subject(payload), request.endpoint)
+    if wait > 0:
+        raise TooManyRequests(
+            description="Rate limit exceeded. Please slow down and retry later.",
+            retry_after=_retry_after_seconds(wait)
+        )
+
+
+def init_rate_limiting(app):
+    """
+    Configure rate limiting and admission control for the app from its config.
+
+    Settings:
+        RATELIMIT_ENABLED: Turn the per-subject limiter on
+        RATELIMIT_RATE, RATELIMIT_BURST: Default bucket refill rate and size
+        RATELIMIT_ROUTE_LIMITS: {endpoint: (rate, burst)} overrides
+        RATELIMIT_STORAGE_PATH: SQLite file shared by all workers; in-memory when empty
+        MAX_IN_FLIGHT_REQUESTS: Per-process concurrency cap; 0 disables it
+    """
+    if app.config.get('RATELIMIT_ENABLED', False):
+        storage_path = app.config.get('RATELIMIT_STORAGE_PATH')
+        backend = SQLiteBackend(storage_path) if storage_path else MemoryBackend()
+        app.extensions['rate_limiter'] = RateLimiter(
+            backend,
+            rate=app.config.get('RATELIMIT_RATE', 10.0),
+            burst=app.config.get('RATELIMIT_BURST', 20),
+            route_limits=app.config.get('RATELIMIT_ROUTE_LIMITS')
+        )
+
+    max_in_flight = app.config.get('MAX_IN_FLIGHT_REQUESTS', 0)
+    if max_in_flight:
+        admission = AdmissionController(max_in_flight)
+        app.extensions['admission_controller'] = admission
+
+        @app.before_request
+        def admit_request():
+            if not admission.try_acquire():
+                raise ServiceUnavailable(
+                    description="Server is at capacity. Please retry later.",
+                    retry_after=app.config.get('SHED_RETRY_AFTER', 1)
+                )
+            g.admitted = True
+
+        @app.teardown_request
+        def release_request(exc):
+            if g.pop('admitted', False):
+                admission.release()
@@ -1,6 +1,22 @@
-from flask import Blueprint, jsonify, request, abort
-from models import db, Tool, User
-from auth import requires_auth, AuthError
+import csv
+import os
+from flask import Blueprint, jsonify, request, abort, current_app, Response, stream_with_context, g, send_file
+from models import db, Tool, Tag, User, Job, AuditEntry, ToolQuotaExceeded
+from auth import requires_auth, AuthError, check_permissions
+from cache import user_exists
+from groupcommit import insert_tool
+from coalesce import coalesce_requests
+from deadlines import check_deadline
+from events import stream_tool_events
+from fragments import tools_response
+from idempotency import idempotent
+from jobs import JOB_TYPES, InvalidJobParams
+from profiling import PROFILE_PERMISSION
+import sharding
+from sharding import get_shard_router, unsharded_only
+from suggest import suggest_names
+from transfer import EXPORT_MIMETYPES, EXPORT_RENDERERS, IMPORT_READERS, iter_tool_rows, import_tools
+from usage import parse_window, record_tool_read
 
 api_bp = Blueprint('api', __name__)
 
@@ -15,9 +31,12 @@ def home():
 @api_bp.route('/tools/<int:tool_id>', methods=['GET'])
 @requires_auth('read:tools')
 def get_tool(tool_id):
-    tool = Tool.get_tool(tool_id)
+    router = get_shard_router()
+    # Tools that are no longer in the tool table are looked up in the archive
+    tool = sharding.get_tool(router, tool_id) if router else Tool.get_tool(tool_id, include_archived=True)
     if tool is None:
         abort(404)
+    record_tool_read(tool_id)
     return jsonify({
         "success": True,
         "tool": tool.serialize()
@@ -27,6 +46,7 @@ def get_tool(tool_id):
 # POST a new tool
 @api_bp.route('/tools', methods=['POST'])
 @requires_auth('create:tools')
+@idempotent
 def create_tool():
     try:
         data = request.get_json()
@@ -37,14 +57,19 @@ def create_tool():
         name = data['name'].strip()
         description = data['description'].strip()
         user_id = data['user_id']
+        tags = parse_tags(data.get('tags', []))
 
         # Check if user exists
-        user = User.get_user(user_id)
-        if user is None:
+        if not user_exists(user_id):
             abort(404, description="User not found")
 
-        # Create and save the new tool using the helper method
-        new_tool = Tool.create_tool(name=name, description=description, user_id=user_id)
+        # Create and save the new tool on its owner's shard in sharded mode, otherwise
+        # batched with concurrent creates when group commit is on
+        router = get_shard_router()
+        if router is not None:
+            new_tool = sharding.create_tool(router, name, description, user_id, tags)
+        else:
+            new_tool = insert_tool(name=name, description=description, user_id=user_id, tags=tags)
 
         return jsonify({
             "success": True,
@@ -53,27 +78,266 @@ def create_tool():
     except KeyError:
         # If any of the required fields are missing, return 400 Bad Request
         abort(400)
+    except ToolQuotaExceeded:
+        db.session.rollback()
+        abort(403)
     except Exception as e:
         db.session.rollback()  # Rollback any changes if an error occurs
+        check_deadline()
         abort(422)
 
 
 # GET all tools
 @api_bp.route('/tools', methods=['GET'])
 @requires_auth('read:tools')
+@coalesce_requests
 def get_tools():
-    tools_list = Tool.get_all_tools()  # Fetch all tools using the helper method
+    if 'ids' in request.args:
+        try:
+            tool_ids = [int(tool_id) for tool_id in request.args['ids'].split(',') if tool_id.strip()]
+        except ValueError:
+            abort(400)
+        return batch_get_response(tool_ids)
+
+    # ?tag=a&tag=b keeps the tools that carry every given tag
+    tags = parse_tags(request.args.getlist('tag'))
+    # Archived tools are only listed on request; sharded deployments have no archive
+    include_archived = request.args.get('include_archived') == 'true'
+    router = get_shard_router()
+    if 'limit' not in request.args:
+        # Fetch all tools using the helper method, merged from every shard in sharded mode
+        tools_list = sharding.list_tools(router, tags=tags)[0] if router else Tool.get_all_tools(tags, include_archived)
+        result = {"success": True}
+    else:
+        # Keyset paging: ?limit=N, then ?after=<next_after> for the following pages
+        after = request.args.get('after', type=int)
+        limit = request.args.get('limit', type=int)
+        if limit is None or limit < 1:
+            abort(400)
+        limit = min(limit, current_app.config.get('TOOLS_MAX_PAGE_SIZE', 1000))
+
+        if router is not None:
+            tools_list, has_more = sharding.list_tools(router, after, limit, tags)
+        else:
+            # Fetch one extra row to learn whether another page follows
+            tools_list = Tool.get_page(after, limit + 1, tags, include_archived)
+            has_more = len(tools_list) > limit
+            tools_list = tools_list[:limit]
+
+        result = {
+            "success": True,
+            "next_after": tools_list[-1].id if has_more else None,
+            "has_more": has_more
+        }
+
+    # Tag counts over the whole filtered set, not just this page
+    if tags or request.args.get('facets') == 'true':
+        result['facets'] = sharding.get_facets(router, tags) if router \
+            else Tag.get_facets(tags, include_archived=include_archived)
+    # Assembled from the cached serialization of each tool
+    return tools_response(result, tools_list)
+
+
+def parse_tags(value):
+    """
+    Validate and normalize tag names from a request.
+
+    Args:
+        value (list): Tag names; they are stripped and lowercased, and repeats dropped
+
+    Returns:
+        list: The normalized tag names
+
+    Raises:
+        400 if value is not a list of non-empty strings of at most 50 characters,
+        or has more than MAX_TAGS_PER_TOOL names
+    """
+    if not isinstance(value, list) or len(value) > current_app.config.get('MAX_TAGS_PER_TOOL', 20) \
+            or not all(isinstance(tag, str) and 0 < len(tag.strip()) <= 50 for tag in value):
+        abort(400)
+    return list(dict.fromkeys(tag.strip().lower() for tag in value))
+
+
+# GET tool name suggestions for what a user has typed so far
+@api_bp.route('/tools/suggest', methods=['GET'])
+@requires_auth('read:tools')
+@unsharded_only
+def suggest_tools():
+    prefix = request.args.get('prefix', '')
+    limit = request.args.get('limit', 10, type=int)
+    if not prefix.strip() or len(prefix) > 80 or limit < 1:
+        abort(400)
+    limit = min(limit, current_app.config.get('SUGGEST_MAX_LIMIT', 25))
+
     return jsonify({
         "success": True,
-        "tools": [tool.serialize() for tool in tools_list]
+        "suggestions": [
+            {"id": tool_id, "name": name, "match": match}
+            for tool_id, name, match in suggest_names(prefix, limit)
+        ]
+    })
+
+
+# POST a list of tool IDs to fetch in one request
+@api_bp.route('/tools/batch-get', methods=['POST'])
+@requires_auth('read:tools')
+def batch_get_tools():
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('ids'), list) \
+            or not all(isinstance(tool_id, int) and not isinstance(tool_id, bool) for tool_id in data['ids']):
+        abort(400)
+    return batch_get_response(data['ids'])
+
+
+def batch_get_response(tool_ids):
+    """
+    Look up a batch of tools with one query.
+
+    Args:
+        tool_ids (list): Requested tool IDs; duplicates are returned once
+
+    Returns:
+        Response: The tools found, in request order, and the IDs not found
+    """
+    tool_ids = list(dict.fromkeys(tool_ids))
+    if not tool_ids or len(tool_ids) > current_app.config.get('BATCH_GET_MAX_IDS', 100):
+        abort(400)
+
+    router = get_shard_router()
+    found = sharding.get_tools_by_ids(router, tool_ids) if router \
+        else Tool.get_tools_by_ids(tool_ids, include_archived=True)
+    return tools_response({
+        "success": True,
+        "missing": [tool_id for tool_id in tool_ids if tool_id not in found]
+    }, [found[tool_id] for tool_id in tool_ids if tool_id in found])
+
+
+# GET the most read tools over a recent window
+@api_bp.route('/tools/popular', methods=['GET'])
+@requires_auth('read:tools')
+def get_popular_tools():
+    counter = current_app.extensions.get('usage_counter')
+    if counter is None:
+        abort(404)
+    window = request.args.get('window', '24h')
+    seconds = parse_window(window)
+    limit = request.args.get('limit', 10, type=int)
+    if seconds is None or seconds > current_app.config.get('USAGE_RETENTION_DAYS', 90) * 86400 or limit < 1:
+        abort(400)
+    limit = min(limit, current_app.config.get('USAGE_POPULAR_MAX_LIMIT', 100))
+
+    popular = counter.get_popular(seconds, limit)
+    tool_ids = [tool_id for tool_id, hits in popular]
+    router = get_shard_router()
+    found = sharding.get_tools_by_ids(router, tool_ids) if router \
+        else Tool.get_tools_by_ids(tool_ids, include_archived=True)
+    # Deleted tools keep their counts but are left out
+    popular = [(tool_id, hits) for tool_id, hits in popular if tool_id in found]
+    return tools_response({
+        "success": True,
+        "window": window,
+        "hits": [hits for tool_id, hits in popular]
+    }, [found[tool_id] for tool_id, hits in popular])
+
+
+# GET the tools changed since a change sequence number
+@api_bp.route('/tools/changes', methods=['GET'])
+@requires_auth('read:tools')
+@unsharded_only
+def get_tool_changes():
+    since = request.args.get('since', 0, type=int)
+    limit = request.args.get('limit', current_app.config.get('CHANGES_PAGE_SIZE', 100), type=int)
+    if since < 0 or limit < 1:
+        abort(400)
+    limit = min(limit, current_app.config.get('CHANGES_MAX_PAGE_SIZE', 1000))
+
+    # Fetch one extra row to learn whether another page follows
+    changes = Tool.get_changes(since, limit + 1)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    return jsonify({
+        "success": True,
+        "changes": [tool.serialize_change() for tool in changes],
+        "next_since": changes[-1].change_seq if changes else since,
+        "has_more": has_more
+    })
+
+
+# GET a Server-Sent Events stream of tool changes
+@api_bp.route('/tools/stream', methods=['GET'])
+@requires_auth('read:tools')
+@unsharded_only
+def stream_tools():
+    # EventSource sends Last-Event-ID when it reconnects; clients may also pass it explicitly
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_event_id is not None:
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            abort(400)
+
+    return Response(
+        stream_with_context(stream_tool_events(last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+# GET the whole tool catalog as a streamed NDJSON or CSV file
+@api_bp.route('/tools/export', methods=['GET'])
+@requires_auth('read:tools')
+@unsharded_only
+def export_tools():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_RENDERERS:
+        abort(400)
+
+    rows = iter_tool_rows(current_app.config.get('EXPORT_BATCH_SIZE', 1000),
+                          include_archived=request.args.get('include_archived') == 'true')
+    return Response(
+        stream_with_context(EXPORT_RENDERERS[export_format](rows)),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename=tools.{export_format}'}
+    )
+
+
+# POST a streamed NDJSON or CSV file of tools to import
+@api_bp.route('/tools/import', methods=['POST'])
+@requires_auth('create:tools')
+@unsharded_only
+def import_tools_file():
+    # The format follows the Content-Type unless given explicitly
+    import_format = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+    if import_format not in IMPORT_READERS:
+        abort(400)
+
+    try:
+        # The body is parsed as it arrives rather than loaded into memory
+        summary = import_tools(
+            IMPORT_READERS[import_format](request.stream),
+            current_app.config.get('IMPORT_CHUNK_SIZE', 500)
+        )
+    except (UnicodeDecodeError, csv.Error):
+        db.session.rollback()
+        abort(400)
+    except ToolQuotaExceeded:
+        db.session.rollback()
+        abort(403)
+
+    return jsonify({
+        "success": True,
+        **summary
     })
 
 
 # PATCH an existing tool
 @api_bp.route('/tools/<int:tool_id>', methods=['PATCH'])
 @requires_auth('update:tools')
+@idempotent
 def update_tool(tool_id):
-    tool = Tool.get_tool(tool_id)
+    router = get_shard_router()
+    tool = sharding.get_tool(router, tool_id) if router else Tool.get_tool(tool_id)
     if tool is None:
         abort(404)
 
@@ -81,9 +345,13 @@ def update_tool(tool_id):
         data = request.get_json()
         if not data:
             abort(400)
+        if 'tags' in data:
+            data['tags'] = parse_tags(data['tags'])
 
-        # Update the tool using the helper method
-        updated_tool = tool.update(data)
+        # Update the tool using the helper method, on its shard in sharded mode
+        updated_tool = sharding.update_tool(router, tool_id, data) if router else tool.update(data)
+        if updated_tool is None:
+            abort(404)
 
         return jsonify({
             "success": True,
@@ -91,20 +359,25 @@ def update_tool(tool_id):
         })
     except Exception:
         db.session.rollback()
+        check_deadline()
         abort(422)
 
 
 # DELETE a tool
 @api_bp.route('/tools/<int:tool_id>', methods=['DELETE'])
 @requires_auth('delete:tools')
+@idempotent
 def delete_tool(tool_id):
-    tool = Tool.get_tool(tool_id)
+    router = get_shard_router()
+    tool = sharding.get_tool(router, tool_id) if router else Tool.get_tool(tool_id)
     if tool is None:
         abort(404)
 
     try:
-        # Delete the tool using the helper method
-        deleted_id = tool.delete()
+        # Delete the tool using the helper method, on its shard in sharded mode
+        deleted_id = sharding.delete_tool(router, tool_id) if router else tool.delete()
+        if deleted_id is None:
+            abort(404)
 
         return jsonify({
             "success": True,
@@ -112,12 +385,37 @@ def delete_tool(tool_id):
         })
     except Exception:
         db.session.rollback()
+        check_deadline()
+        abort(422)
+
+
+# POST a request to retire a tool; the next archive job moves it to the archive
+@api_bp.route('/tools/<int:tool_id>/retire', methods=['POST'])
+@requires_auth('update:tools')
+@idempotent
+@unsharded_only
+def retire_tool(tool_id):
+    tool = Tool.get_tool(tool_id)
+    if tool is None:
+        abort(404)
+
+    try:
+        retired_tool = tool.retire()
+        return jsonify({
+            "success": True,
+            "tool": retired_tool.serialize(),
+            "retired_at": retired_tool.retired_at.isoformat()
+        })
+    except Exception:
+        db.session.rollback()
+        check_deadline()
         abort(422)
 
 
 # GET all users
 @api_bp.route('/users', methods=['GET'])
 @requires_auth('read:tools')
+@coalesce_requests
 def get_users():
     users = User.get_all_users()  # Fetch all users using the helper method
     return jsonify({
@@ -126,6 +424,159 @@ def get_users():
     })
 
 
+# GET the audit log, newest entries first
+@api_bp.route('/audit', methods=['GET'])
+@requires_auth('read:audit')
+def get_audit_log():
+    before = request.args.get('before', type=int)
+    limit = request.args.get('limit', current_app.config.get('AUDIT_PAGE_SIZE', 100), type=int)
+    if limit < 1:
+        abort(400)
+    limit = min(limit, current_app.config.get('AUDIT_MAX_PAGE_SIZE', 1000))
+
+    # Fetch one extra row to learn whether another page follows
+    entries = AuditEntry.get_page(
+        before=before,
+        limit=limit + 1,
+        actor=request.args.get('actor'),
+        resource_type=request.args.get('resource_type'),
+        resource_id=request.args.get('resource_id', type=int)
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    return jsonify({
+        "success": True,
+        "entries": [entry.serialize() for entry in entries],
+        "next_before": entries[-1].id if has_more else None,
+        "has_more": has_more
+    })
+
+
+def get_request_profiler():
+    profiler = current_app.extensions.get('request_profiler')
+    if profiler is None:
+        abort(404)
+    return profiler
+
+
+# GET the IDs of the stored request profiles
+@api_bp.route('/admin/profiles', methods=['GET'])
+@requires_auth(PROFILE_PERMISSION)
+def list_profiles():
+    return jsonify({
+        "success": True,
+        "profiles": get_request_profiler().store.list()
+    })
+
+
+# GET a stored request profile as a text report, or as the raw pstats file
+@api_bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+@requires_auth(PROFILE_PERMISSION)
+def get_profile(profile_id):
+    store = get_request_profiler().store
+    if request.args.get('format') == 'pstats':
+        path = store.path(profile_id)
+        if path is None or not path.endswith('.pstats') or not os.path.exists(path):
+            abort(404)
+        return send_file(path, mimetype='application/octet-stream', as_attachment=True)
+
+    report = store.report(profile_id)
+    if report is None:
+        abort(404)
+    return Response(report, mimetype='text/plain')
+
+
+# GET the allocation peaks of the requests profiled in memory mode, per endpoint
+@api_bp.route('/admin/memory', methods=['GET'])
+@requires_auth(PROFILE_PERMISSION)
+def get_memory_peaks():
+    return jsonify({
+        "success": True,
+        "endpoints": get_request_profiler().memory_report()
+    })
+
+
+# POST a new background job
+@api_bp.route('/jobs', methods=['POST'])
+@requires_auth('read:tools')
+@idempotent
+@unsharded_only
+def create_job():
+    data = request.get_json(silent=True)
+    if not data or 'type' not in data:
+        abort(400)
+
+    spec = JOB_TYPES.get(data['type'])
+    if spec is None:
+        abort(422)
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        abort(422)
+
+    # Each job type requires the permission of the operation it performs
+    check_permissions(spec['permission'], g.jwt_payload)
+    if spec.get('check_params') is not None:
+        try:
+            spec['check_params'](params)
+        except InvalidJobParams:
+            abort(422)
+
+    job = Job.create_job(data['type'], params, created_by=g.jwt_payload.get('sub'))
+    current_app.extensions['job_runner'].notify()
+
+    return jsonify({
+        "success": True,
+        "job": job.serialize()
+    }), 202, {'Location': f'/api/jobs/{job.id}'}
+
+
+# GET the status of a background job
+@api_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@requires_auth('read:tools')
+def get_job(job_id):
+    job = Job.get_job(job_id)
+    if job is None:
+        abort(404)
+    return jsonify({
+        "success": True,
+        "job": job.serialize()
+    })
+
+
+# POST a cancellation request for a background job
+@api_bp.route('/jobs/<int:job_id>/cancel', methods=['POST'])
+@requires_auth('read:tools')
+@idempotent
+def cancel_job(job_id):
+    job = Job.get_job(job_id)
+    if job is None:
+        abort(404)
+    check_permissions(JOB_TYPES[job.type]['permission'], g.jwt_payload)
+
+    return jsonify({
+        "success": True,
+        "job": job.cancel().serialize()
+    })
+
+
+# GET the file produced by a finished export job
+@api_bp.route('/jobs/<int:job_id>/download', methods=['GET'])
+@requires_auth('read:tools')
+def download_job_result(job_id):
+    job = Job.get_job(job_id)
+    if job is None or job.status != 'succeeded':
+        abort(404)
+    result = job.serialize()['result'] or {}
+    if 'file' not in result:
+        abort(404)
+
+    path = os.path.join(current_app.extensions['job_runner'].result_dir, result['file'])
+    if not os.path.exists(path):
+        abort(404)
+    return send_file(path, mimetype='application/x-ndjson', as_attachment=True, download_name=result['file'])
+
+
 # Error handler for AuthError
 @api_bp.errorhandler(AuthError)
 def handle_auth_error(error):
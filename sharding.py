@@ -0,0 +1,297 @@
+import heapq
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from itertools import islice
+from flask import abort, current_app
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from deadlines import current_deadline, deadline_scope
+from models import (db, ChangeCounter, Tag, Tool, ToolQuotaExceeded, adjust_tool_count, next_change_seq,
+                    send_tool_changed, tool_tags)
+
+# Tool IDs encode their shard: id = per-shard sequence number * SHARD_ID_STRIDE + shard index,
+# so a tool is found from its ID alone and IDs stay unique across shards
+SHARD_ID_STRIDE = 1024
+
+
+# Tables stored on every shard; each shard keeps its own tags for its own tools
+SHARD_TABLES = (Tool.__table__, ChangeCounter.__table__, Tag.__table__, tool_tags)
+
+
+def _shard_metadata():
+    """
+    Build the schema of a tool shard: the SHARD_TABLES, without the foreign key
+    from tool to the user table (which lives on the directory database).
+    """
+    metadata = db.MetaData()
+    names = {table.name for table in SHARD_TABLES}
+    for table in SHARD_TABLES:
+        copy = table.to_metadata(metadata)
+        external = [key for key in copy.foreign_keys if key.target_fullname.split('.')[0] not in names]
+        for key in external:
+            copy.constraints.discard(key.constraint)
+            copy.foreign_keys.discard(key)
+            key.parent.foreign_keys.discard(key)
+    return metadata
+
+
+class ShardRouter:
+    """
+    Routes tool rows to one of several databases by a hash of their owner's ID.
+
+    Users, jobs and the audit log stay on the directory database (the app's
+    SQLALCHEMY_DATABASE_URI). The number of shards must not change once tools
+    have been stored, since a tool's shard is derived from its owner and ID.
+    """
+
+    def __init__(self, urls, engine_options=None):
+        if not 0 < len(urls) <= SHARD_ID_STRIDE:
+            raise ValueError(f"Between 1 and {SHARD_ID_STRIDE} shard URLs are supported")
+        self.engines = [create_engine(url, **(engine_options or {})) for url in urls]
+        self._executor = ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix='shard-query')
+
+    def __len__(self):
+        return len(self.engines)
+
+    def for_user(self, user_id):
+        """Return the index of the shard that stores the tools of a user."""
+        # crc32 rather than hash(): the result must be the same in every process
+        return zlib.crc32(str(user_id).encode('ascii')) % len(self.engines)
+
+    def for_tool(self, tool_id):
+        """Return the index of the shard that stores a tool, or None for an impossible ID."""
+        index = tool_id % SHARD_ID_STRIDE
+        return index if index < len(self.engines) else None
+
+    def session(self, index):
+        """Open an ORM session on a shard."""
+        return Session(self.engines[index], info={'shard': index}, expire_on_commit=False)
+
+    def fan_out(self, query):
+        """
+        Run query(session) on every shard in parallel.
+
+        The queries run in pool threads, bounded by the calling request's deadline.
+
+        Returns:
+            list: The result from each shard, in shard order
+        """
+        deadline = current_deadline()
+
+        def run(index):
+            with deadline_scope(deadline), self.session(index) as session:
+                return query(session)
+        return list(self._executor.map(run, range(len(self.engines))))
+
+    def create_all(self):
+        """Create the tool tables on every shard."""
+        metadata = _shard_metadata()
+        for engine in self.engines:
+            metadata.create_all(engine)
+
+    def dispose(self, close=True):
+        for engine in self.engines:
+            engine.dispose(close=close)
+
+
+def get_shard_router():
+    return current_app.extensions.get('shard_router')
+
+
+def unsharded_only(f):
+    """
+    A decorator for routes that read the tool table of the default database
+    directly, and so are not available in sharded mode.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if get_shard_router() is not None:
+            abort(501)
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def _live_tools(session, *criteria):
+    return session.scalars(
+        db.select(Tool).where(Tool.deleted_at.is_(None), *criteria).order_by(Tool.id)
+    ).all()
+
+
+def get_tool(router, tool_id):
+    """
+    Get a tool from its shard.
+
+    Returns:
+        Tool: The tool, detached from its session, or None if not found or deleted
+    """
+    index = router.for_tool(tool_id)
+    if index is None:
+        return None
+    with router.session(index) as session:
+        tools = _live_tools(session, Tool.id == tool_id)
+    return tools[0] if tools else None
+
+
+def get_tools_by_ids(router, tool_ids):
+    """
+    Get several tools, with one query on each shard that holds any of them.
+
+    Returns:
+        dict: The tools found, keyed by ID
+    """
+    by_shard = {}
+    for tool_id in tool_ids:
+        index = router.for_tool(tool_id)
+        if index is not None:
+            by_shard.setdefault(index, []).append(tool_id)
+
+    def query(session):
+        shard_ids = by_shard.get(session.info['shard'])
+        return _live_tools(session, Tool.id.in_(shard_ids)) if shard_ids else []
+
+    found = {}
+    for tools in router.fan_out(query):
+        found.update((tool.id, tool) for tool in tools)
+    return found
+
+
+def list_tools(router, after=None, limit=None, tags=None):
+    """
+    List tools from every shard in ID order.
+
+    Each shard returns at most limit + 1 tools after the cursor; the sorted
+    lists are merged, so a page costs one indexed range scan per shard.
+
+    Args:
+        after (int): Only return tools with a higher ID (the previous page's last ID)
+        limit (int): Page size; all tools when None
+        tags (list): Only return tools that carry all of these tags
+
+    Returns:
+        tuple: (tools, has_more)
+    """
+    criteria = [Tool.id > after] if after is not None else []
+    if tags:
+        criteria.append(Tool.tagged_with(tags))
+
+    def query(session):
+        statement = db.select(Tool).where(Tool.deleted_at.is_(None), *criteria).order_by(Tool.id)
+        if limit is not None:
+            statement = statement.limit(limit + 1)
+        return session.scalars(statement).all()
+
+    merged = heapq.merge(*router.fan_out(query), key=lambda tool: tool.id)
+    if limit is None:
+        return list(merged), False
+    page = list(islice(merged, limit + 1))
+    return page[:limit], len(page) > limit
+
+
+def get_facets(router, tags=None):
+    """
+    Count the tools carrying each tag, summed over the shards.
+
+    Returns:
+        dict: Number of tools keyed by tag name, in name order
+    """
+    totals = Counter()
+    for facets in router.fan_out(lambda session: Tag.get_facets(tags, session)):
+        totals.update(facets)
+    return dict(sorted(totals.items()))
+
+
+def create_tool(router, name, description, user_id, tags=None):
+    """
+    Create a tool on its owner's shard.
+
+    The owner's tool count on the directory database is raised first, which
+    also enforces MAX_TOOLS_PER_USER, and lowered again if the insert fails.
+
+    Returns:
+        Tool: The new tool, detached from its session
+
+    Raises:
+        ToolQuotaExceeded: If the owner already has the maximum number of tools
+        ValueError: If the owner does not exist
+    """
+    limit = current_app.config.get('MAX_TOOLS_PER_USER', 0)
+    if not adjust_tool_count(db.session.connection(), user_id, 1, limit):
+        db.session.rollback()
+        if limit:
+            raise ToolQuotaExceeded(f'User {user_id} already owns {limit} tools')
+        raise ValueError(f'User {user_id} not found')
+    db.session.commit()
+
+    index = router.for_user(user_id)
+    try:
+        with router.session(index) as session:
+            tool = Tool(name=name, description=description, user_id=user_id)
+            # Set even when empty, so the detached tool serializes without a lazy load
+            tool.set_tags(tags or [], session)
+            tool.id = next_change_seq(session.connection(), 'tool_id') * SHARD_ID_STRIDE + index
+            session.add(tool)
+            session.commit()
+    except Exception:
+        adjust_tool_count(db.session.connection(), user_id, -1)
+        db.session.commit()
+        raise
+
+    send_tool_changed(tool, 'created')
+    return tool
+
+
+def update_tool(router, tool_id, data):
+    """
+    Update a tool on its shard.
+
+    Returns:
+        Tool: The updated tool, or None if not found
+    """
+    index = router.for_tool(tool_id)
+    if index is None:
+        return None
+    with router.session(index) as session:
+        tools = _live_tools(session, Tool.id == tool_id)
+        return tools[0].update(data) if tools else None
+
+
+def delete_tool(router, tool_id):
+    """
+    Soft-delete a tool on its shard and lower its owner's tool count.
+
+    Returns:
+        int: The ID of the deleted tool, or None if not found
+    """
+    index = router.for_tool(tool_id)
+    if index is None:
+        return None
+    with router.session(index) as session:
+        tools = _live_tools(session, Tool.id == tool_id)
+        if not tools:
+            return None
+        tools[0].delete()
+
+    adjust_tool_count(db.session.connection(), tools[0].user_id, -1)
+    db.session.commit()
+    return tool_id
+
+
+def init_sharding(app):
+    """
+    Enable sharded mode when SHARD_DATABASE_URLS lists one or more databases.
+
+    Adds the `flask create-shards` command, which creates the tool tables on every shard.
+    """
+    urls = app.config.get('SHARD_DATABASE_URLS') or []
+    if not urls:
+        return
+
+    router = ShardRouter(urls, app.config.get('SHARD_ENGINE_OPTIONS'))
+    app.extensions['shard_router'] = router
+
+    @app.cli.command('create-shards')
+    def create_shards():
+        """Create the tool tables on every shard."""
+        router.create_all()
@@ -0,0 +1,286 @@
+import bisect
+import string
+import threading
+import time
+from flask import current_app, has_app_context
+from models import db, ArchivedTool, ChangeCounter, Tool, tool_changed
+
+# Queries shorter than this only get prefix matches; fuzzy matches of one or
+# two characters would be noise
+FUZZY_MIN_LENGTH = 3
+
+# Queries longer than this only get prefix matches from the in-memory index,
+# which bounds the edits looked up for one query
+FUZZY_MAX_LENGTH = 16
+
+# Characters tried as replacements and insertions by the in-memory index
+FUZZY_ALPHABET = string.ascii_lowercase + string.digits + ' -._'
+
+
+def normalize(name):
+    """Lowercase a name and collapse its whitespace, for matching."""
+    return ' '.join(name.lower().split())
+
+
+class NameIndex:
+    """
+    An in-memory index of tool names for autocomplete.
+
+    Names are kept normalized in a sorted list, which serves as a compact
+    prefix trie: the names starting with a prefix are found with a binary
+    search and a scan of the matches. Typos are tolerated by also looking up
+    every string one edit (a deleted, swapped, replaced or inserted character)
+    away from the query. Replacements and insertions are drawn from
+    FUZZY_ALPHABET and only queries of up to FUZZY_MAX_LENGTH characters are
+    fuzzy matched, so a query costs at most about 1,300 binary searches,
+    however large the catalog and whatever characters its names use.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._ids = []
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def _remove(self, tool_id):
+        entry = self._names.pop(tool_id, None)
+        if entry is None:
+            return
+        key = entry[1]
+        index = bisect.bisect_left(self._keys, key)
+        while index < len(self._keys) and self._keys[index] == key:
+            if self._ids[index] == tool_id:
+                del self._keys[index]
+                del self._ids[index]
+                break
+            index += 1
+
+    def _add(self, tool_id, name, sorted_insert=True):
+        self._remove(tool_id)
+        key = normalize(name)
+        self._names[tool_id] = (name, key)
+        if sorted_insert:
+            index = bisect.bisect_right(self._keys, key)
+            self._keys.insert(index, key)
+            self._ids.insert(index, tool_id)
+
+    def add(self, tool_id, name):
+        """Add a tool's name, replacing the name indexed for it before."""
+        with self._lock:
+            self._add(tool_id, name)
+
+    def add_many(self, tools):
+        """
+        Add (tool_id, name) pairs. A large batch, such as the initial load, is
+        sorted once rather than inserted name by name.
+        """
+        with self._lock:
+            rebuild = len(tools) * 16 > len(self._keys)
+            for tool_id, name in tools:
+                self._add(tool_id, name, sorted_insert=not rebuild)
+            if rebuild:
+                pairs = sorted((key, tool_id) for tool_id, (_, key) in self._names.items())
+                self._keys = [key for key, _ in pairs]
+                self._ids = [tool_id for _, tool_id in pairs]
+
+    def remove(self, tool_id):
+        with self._lock:
+            self._remove(tool_id)
+
+    def suggest(self, prefix, limit=10):
+        """
+        Suggest tool names for what a user has typed so far.
+
+        Args:
+            prefix (str): The text typed so far
+            limit (int): Maximum number of suggestions
+
+        Returns:
+            list: (tool_id, name, match) tuples, prefix matches first, then
+            names starting one edit away from the query, each in name order;
+            match is 'prefix' or 'fuzzy'
+        """
+        query = normalize(prefix)
+        if not query:
+            return []
+        # Built before taking the lock, which other suggestions and updates wait on
+        variants = self._edits(query) if FUZZY_MIN_LENGTH <= len(query) <= FUZZY_MAX_LENGTH else ()
+        with self._lock:
+            results = [(tool_id, self._names[tool_id][0], 'prefix')
+                       for _, tool_id in self._scan(query, limit)]
+            if len(results) < limit and variants:
+                found = {tool_id for tool_id, _, _ in results}
+                fuzzy = {}
+                for variant in variants:
+                    for key, tool_id in self._scan(variant, limit):
+                        if tool_id not in found:
+                            fuzzy[tool_id] = key
+                ranked = sorted(fuzzy, key=lambda tool_id: (fuzzy[tool_id], tool_id))
+                results.extend((tool_id, self._names[tool_id][0], 'fuzzy')
+                               for tool_id in ranked[:limit - len(results)])
+            return results
+
+    def _scan(self, prefix, limit):
+        """Return up to limit (key, tool_id) pairs whose key starts with prefix, in key order."""
+        matches = []
+        index = bisect.bisect_left(self._keys, prefix)
+        while index < len(self._keys) and len(matches) < limit and self._keys[index].startswith(prefix):
+            matches.append((self._keys[index], self._ids[index]))
+            index += 1
+        return matches
+
+    @staticmethod
+    def _edits(query):
+        """Return the strings one edit away from query, replacing and inserting FUZZY_ALPHABET characters."""
+        variants = set()
+        for i in range(len(query)):
+            head, char, tail = query[:i], query[i], query[i + 1:]
+            variants.add(head + tail)
+            if tail:
+                variants.add(head + tail[0] + char + tail[1:])
+            for other in FUZZY_ALPHABET:
+                variants.add(head + other + tail)
+                variants.add(head + other + char + tail)
+        # Appending a character only narrows the exact prefix matches
+        variants.discard(query)
+        return variants
+
+
+class SuggestIndex:
+    """
+    Keeps a NameIndex in step with the tool table.
+
+    Changes made by this process are applied as they are committed, through
+    the tool_changed signal. Changes made by other worker processes are
+    picked up from the change feed (tool.change_seq) at most every
+    refresh_interval seconds, when a suggestion is requested.
+    """
+
+    def __init__(self, names, refresh_interval=5.0, batch_size=10000):
+        self.names = names
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self.last_seq = 0
+        self.synced_at = None
+        self._sync_lock = threading.Lock()
+
+    def sync(self):
+        """Apply the changes committed since the last sync."""
+        tool, archive = Tool.__table__, ArchivedTool.__table__
+        # Changes are read up to the counter's committed value, so the tool and
+        # archive tables are read up to the same point
+        counter = ChangeCounter.__table__
+        up_to = db.session.execute(
+            db.select(counter.c.value).where(counter.c.name == 'tool')
+        ).scalar() or 0
+        # The latest name of each changed tool, or None if it was deleted or
+        # archived; collected first so that the initial load is added to the
+        # index as one batch
+        changed = {}
+        last_seq = self.last_seq
+        while True:
+            rows = db.session.execute(
+                db.select(tool.c.id, tool.c.name, tool.c.change_seq, tool.c.deleted_at)
+                .where(tool.c.change_seq > last_seq, tool.c.change_seq <= up_to)
+                .order_by(tool.c.change_seq)
+                .limit(self.batch_size)
+            ).all()
+            if not rows:
+                break
+            for row in rows:
+                changed[row.id] = row.name if row.deleted_at is None else None
+            last_seq = rows[-1].change_seq
+        if self.synced_at is not None:
+            # Archived tools never come back, so the initial load can skip them
+            for tool_id in db.session.execute(
+                db.select(archive.c.id).where(archive.c.change_seq > self.last_seq, archive.c.change_seq <= up_to)
+            ).scalars():
+                changed[tool_id] = None
+
+        self.names.add_many([(tool_id, name) for tool_id, name in changed.items() if name is not None])
+        for tool_id, name in changed.items():
+            if name is None:
+                self.names.remove(tool_id)
+        self.last_seq = max(last_seq, up_to)
+        self.synced_at = time.monotonic()
+
+    def suggest(self, prefix, limit):
+        # Only one request syncs at a time; the others answer from the index as it is
+        due = self.synced_at is None or time.monotonic() - self.synced_at >= self.refresh_interval
+        if due and self._sync_lock.acquire(blocking=self.synced_at is None):
+            try:
+                self.sync()
+            finally:
+                self._sync_lock.release()
+        return self.names.suggest(prefix, limit)
+
+    def apply(self, tool, action):
+        if self.synced_at is None:
+            return
+        if action in ('deleted', 'archived'):
+            self.names.remove(tool.id)
+        else:
+            self.names.add(tool.id, tool.name)
+
+
+def suggest_postgres(prefix, limit):
+    """
+    Suggest tool names with pg_trgm: prefix matches first, then the names most
+    similar to the query. Both conditions are served by the trigram index on
+    lower(name) created by the migrations.
+
+    Returns:
+        list: (tool_id, name, match) tuples, as NameIndex.suggest
+    """
+    query = normalize(prefix)
+    if not query:
+        return []
+    name = db.func.lower(Tool.name)
+    is_prefix = name.startswith(query, autoescape=True)
+    similar = name.op('%')(query) if len(query) >= FUZZY_MIN_LENGTH else db.false()
+    rows = db.session.execute(
+        db.select(Tool.id, Tool.name, is_prefix.label('is_prefix'))
+        .where(Tool.deleted_at.is_(None), db.or_(is_prefix, similar))
+        .order_by(is_prefix.desc(), db.func.similarity(name, query).desc(), name)
+        .limit(limit)
+    ).all()
+    return [(row.id, row.name, 'prefix' if row.is_prefix else 'fuzzy') for row in rows]
+
+
+def suggest_names(prefix, limit):
+    """
+    Suggest tool names with the backend selected by SUGGEST_BACKEND.
+
+    Returns:
+        list: (tool_id, name, match) tuples
+    """
+    index = current_app.extensions.get('suggest_index')
+    if index is None:
+        return suggest_postgres(prefix, limit)
+    return index.suggest(prefix, limit)
+
+
+@tool_changed.connect
+def update_suggest_index(tool, action):
+    if not has_app_context():
+        return
+    index = current_app.extensions.get('suggest_index')
+    if index is not None:
+        index.apply(tool, action)
+
+
+def init_suggest(app):
+    """
+    Set up autocomplete for SUGGEST_BACKEND: 'memory' keeps a name index in
+    each worker process, loaded on the first request; 'postgres' queries the
+    pg_trgm index instead.
+
+    Settings:
+        SUGGEST_REFRESH_SECONDS: How often the memory index reads the change feed
+    """
+    if app.config.get('SUGGEST_BACKEND', 'memory') == 'postgres':
+        return
+    app.extensions['suggest_index'] = SuggestIndex(NameIndex(), app.config.get('SUGGEST_REFRESH_SECONDS', 5.0))
@@ -92,6 +92,22 @@ class CapstoneTestCase(unittest.TestCase):
         self.assertTrue(data['success'])
         self.assertTrue(len(data['tools']) > 0)
 
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_get_tools_paged(self, mock_verify_jwt):
+        """Test paging through tools with limit and the after cursor"""
+        other = Tool.create_tool("Other Tool", "Another tool.", self.sample_user.id)
+
+        response = self.client.get('/api/tools?limit=1', headers=self.viewer_auth_header)
+        data = json.loads(response.data)
+        self.assertEqual([tool['id'] for tool in data['tools']], [self.sample_tool.id])
+        self.assertTrue(data['has_more'])
+
+        response = self.client.get(f"/api/tools?limit=1&after={data['next_after']}", headers=self.viewer_auth_header)
+        data = json.loads(response.data)
+        self.assertEqual([tool['id'] for tool in data['tools']], [other.id])
+        self.assertFalse(data['has_more'])
+        self.assertIsNone(data['next_after'])
+
     @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
     def test_get_tool(self, mock_verify_jwt):
         """Test getting a specific tool"""
@@ -142,6 +158,66 @@ class CapstoneTestCase(unittest.TestCase):
         self.assertTrue(data['success'])
         self.assertEqual(data['deleted'], self.sample_tool.id)
 
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_get_tool_changes(self, mock_verify_jwt):
+        """Test that the change feed reports creates, updates and deletes in order"""
+        response = self.client.get('/api/tools/changes?since=0', headers=self.viewer_auth_header)
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([change['id'] for change in data['changes']], [self.sample_tool.id])
+        since = data['next_since']
+
+        new_tool = {'name': 'Feed Tool', 'description': 'A feed tool', 'user_id': self.sample_user.id}
+        response = self.client.post('/api/tools', json=new_tool, headers=self.admin_auth_header)
+        new_id = json.loads(response.data)['tool']['id']
+        self.client.patch(f'/api/tools/{self.sample_tool.id}', json={'name': 'Renamed'}, headers=self.admin_auth_header)
+        self.client.delete(f'/api/tools/{new_id}', headers=self.admin_auth_header)
+
+        response = self.client.get(f'/api/tools/changes?since={since}', headers=self.viewer_auth_header)
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([change['id'] for change in data['changes']], [self.sample_tool.id, new_id])
+        self.assertEqual(data['changes'][0]['name'], 'Renamed')
+        self.assertTrue(data['changes'][1]['deleted'])
+        self.assertFalse(data['has_more'])
+
+        # Deleted tools are gone from the regular endpoints
+        response = self.client.get(f'/api/tools/{new_id}', headers=self.viewer_auth_header)
+        self.assertEqual(response.status_code, 404)
+
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_get_tool_changes_paginated(self, mock_verify_jwt):
+        """Test that the change feed pages with next_since"""
+        for i in range(3):
+            db.session.add(Tool(name=f"Tool {i}", description="Paged.", user_id=self.sample_user.id))
+            db.session.commit()
+
+        response = self.client.get('/api/tools/changes?since=0&limit=2', headers=self.viewer_auth_header)
+        first_page = json.loads(response.data)
+        self.assertEqual(len(first_page['changes']), 2)
+        self.assertTrue(first_page['has_more'])
+
+        response = self.client.get(f"/api/tools/changes?since={first_page['next_since']}&limit=2",
+                                   headers=self.viewer_auth_header)
+        second_page = json.loads(response.data)
+        self.assertEqual(len(second_page['changes']), 2)
+        self.assertFalse(second_page['has_more'])
+
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_batch_get_tools(self, mock_verify_jwt):
+        """Test fetching tools by ID list in request order, with missing IDs reported"""
+        other = Tool.create_tool("Other Tool", "Another tool.", self.sample_user.id)
+        ids = [other.id, 9999, self.sample_tool.id, other.id]
+
+        response = self.client.get(f"/api/tools?ids={','.join(map(str, ids))}", headers=self.viewer_auth_header)
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([tool['id'] for tool in data['tools']], [other.id, self.sample_tool.id])
+        self.assertEqual(data['missing'], [9999])
+
+        response = self.client.post('/api/tools/batch-get', json={'ids': ids}, headers=self.viewer_auth_header)
+        self.assertEqual(json.loads(response.data), data)
+
     # Tests for error behavior
     @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
     def test_404_get_nonexistent_tool(self, mock_verify_jwt):
@@ -150,6 +226,16 @@ class CapstoneTestCase(unittest.TestCase):
 
         self.assertEqual(response.status_code, 404)
 
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_400_batch_get_tools_bad_request(self, mock_verify_jwt):
+        """Test that malformed or oversized ID lists are rejected"""
+        response = self.client.get('/api/tools?ids=1,two', headers=self.viewer_auth_header)
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/tools/batch-get', json={'ids': list(range(1, 102))},
+                                    headers=self.viewer_auth_header)
+        self.assertEqual(response.status_code, 400)
+
     @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
     def test_422_create_tool_bad_request(self, mock_verify_jwt):
         """Test creating a tool with bad request data (expects 422 Unprocessable Entity)"""
@@ -0,0 +1,209 @@
+import unittest
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool, ArchivedTool, Job, recount_tools
+from config import SQLiteTestConfig
+
+
+def mock_verify_decode_jwt(token):
+    if token == 'admin':
+        return {'sub': 'admin-user', 'permissions': ['read:tools', 'create:tools', 'update:tools', 'delete:tools']}
+    return {'sub': 'viewer-user', 'permissions': ['read:tools']}
+
+
+class ArchiveConfig(SQLiteTestConfig):
+    ARCHIVE_AFTER_DAYS = 30
+
+
+@patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+class ArchiveTestCase(unittest.TestCase):
+    """
+    Test case for the archive tier of old and retired tools.
+    """
+
+    def setUp(self):
+        self.app = create_app(ArchiveConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(self.sample_user)
+        db.session.commit()
+        self.runner = self.app.extensions['job_runner']
+        self.admin_auth_header = {'Authorization': 'Bearer admin'}
+        self.viewer_auth_header = {'Authorization': 'Bearer viewer'}
+
+        # Tools 0, 2 and 4 are older than the archive policy
+        self.tools = []
+        for i in range(6):
+            tool = Tool.create_tool(f'Tool {i}', 'A tool.', self.sample_user.id, ['scanner'] if i < 2 else ['network'])
+            if i % 2 == 0:
+                tool.created_at = datetime.utcnow() - timedelta(days=90)
+            self.tools.append(tool)
+        db.session.commit()
+        self.tool_ids = [tool.id for tool in self.tools]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def archive(self, params=None):
+        response = self.client.post('/api/jobs', json={'type': 'tool_archive', 'params': params or {}},
+                                    headers=self.admin_auth_header)
+        self.assertEqual(response.status_code, 202)
+        self.runner.run_pending()
+        response = self.client.get(f"/api/jobs/{json.loads(response.data)['job']['id']}",
+                                   headers=self.viewer_auth_header)
+        return json.loads(response.data)['job']
+
+    def list_ids(self, query=''):
+        response = self.client.get(f'/api/tools{query}', headers=self.viewer_auth_header)
+        return [tool['id'] for tool in json.loads(response.data)['tools']]
+
+    def test_old_and_retired_tools_move_in_batches(self, mock_verify_jwt):
+        """Test that the archive job moves old and retired tools out of the tool table"""
+        response = self.client.post(f'/api/tools/{self.tool_ids[1]}/retire', headers=self.admin_auth_header)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.tool_ids[1], self.list_ids())
+
+        job = self.archive({'batch_size': 2})
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['result']['archived'], 4)
+        self.assertEqual(job['progress'], 4)
+
+        archived = [self.tool_ids[i] for i in (0, 1, 2, 4)]
+        self.assertEqual(sorted(tool.id for tool in ArchivedTool.query.all()), archived)
+        self.assertEqual(self.list_ids(), [self.tool_ids[3], self.tool_ids[5]])
+        self.assertEqual(db.session.execute(db.text('SELECT COUNT(*) FROM tool_tag')).scalar(), 2)
+
+        # Nothing left to move, and owners still count their archived tools
+        self.assertEqual(self.archive()['result']['archived'], 0)
+        self.assertEqual(db.session.get(User, self.sample_user.id).tool_count, 6)
+        recount_tools(db.session.connection())
+        self.assertEqual(db.session.get(User, self.sample_user.id).tool_count, 6)
+
+    def test_lookups_fall_through_to_the_archive(self, mock_verify_jwt):
+        """Test that single and batch lookups by ID find archived tools"""
+        self.archive()
+        response = self.client.get(f'/api/tools/{self.tool_ids[0]}', headers=self.viewer_auth_header)
+        self.assertEqual(response.status_code, 200)
+        tool = json.loads(response.data)['tool']
+        self.assertEqual((tool['name'], tool['tags'], tool['archived']), ('Tool 0', ['scanner'], True))
+
+        response = self.client.get(f'/api/tools/{self.tool_ids[1]}', headers=self.viewer_auth_header)
+        self.assertNotIn('archived', json.loads(response.data)['tool'])
+
+        response = self.client.post('/api/tools/batch-get', json={'ids': self.tool_ids + [9999]},
+                                    headers=self.viewer_auth_header)
+        data = json.loads(response.data)
+        self.assertEqual([tool['id'] for tool in data['tools']], self.tool_ids)
+        self.assertEqual(data['missing'], [9999])
+
+        # Archived tools are read-only
+        response = self.client.patch(f'/api/tools/{self.tool_ids[0]}', json={'name': 'Renamed'},
+                                     headers=self.admin_auth_header)
+        self.assertEqual(response.status_code, 404)
+
+    def test_include_archived_listings(self, mock_verify_jwt):
+        """Test that ?include_archived=true merges archived tools into listings in ID order"""
+        self.archive()
+        self.assertEqual(self.list_ids('?include_archived=true'), self.tool_ids)
+
+        pages = []
+        after = ''
+        while True:
+            response = self.client.get(f'/api/tools?include_archived=true&limit=2{after}',
+                                       headers=self.viewer_auth_header)
+            data = json.loads(response.data)
+            pages.append([tool['id'] for tool in data['tools']])
+            if not data['has_more']:
+                break
+            after = f"&after={data['next_after']}"
+        self.assertEqual(pages, [self.tool_ids[0:2], self.tool_ids[2:4], self.tool_ids[4:6]])
+
+        response = self.client.get('/api/tools?tag=scanner&include_archived=true', headers=self.viewer_auth_header)
+        data = json.loads(response.data)
+        self.assertEqual([tool['id'] for tool in data['tools']], self.tool_ids[:2])
+        self.assertEqual(data['facets'], {'scanner': 2})
+
+        response = self.client.get('/api/tools?facets=true', headers=self.viewer_auth_header)
+        self.assertEqual(json.loads(response.data)['facets'], {'network': 2, 'scanner': 1})
+        response = self.client.get('/api/tools?facets=true&include_archived=true', headers=self.viewer_auth_header)
+        self.assertEqual(json.loads(response.data)['facets'], {'network': 4, 'scanner': 2})
+
+    def test_archived_ids_are_not_reused(self, mock_verify_jwt):
+        """Test that a tool created after the newest tool was archived gets a new ID"""
+        last_id = self.tool_ids[-1]
+        self.client.post(f'/api/tools/{last_id}/retire', headers=self.admin_auth_header)
+        self.archive({'older_than_days': 0})
+
+        response = self.client.post('/api/tools', json={
+            'name': 'Nmap', 'description': 'Network scanner.', 'user_id': self.sample_user.id
+        }, headers=self.admin_auth_header)
+        new_id = json.loads(response.data)['tool']['id']
+        self.assertGreater(new_id, last_id)
+
+        response = self.client.get(f'/api/tools/{last_id}', headers=self.viewer_auth_header)
+        self.assertTrue(json.loads(response.data)['tool']['archived'])
+        self.assertEqual(self.list_ids('?include_archived=true'), self.tool_ids + [new_id])
+
+        self.client.post(f'/api/tools/{new_id}/retire', headers=self.admin_auth_header)
+        self.assertEqual(self.archive({'older_than_days': 0})['status'], 'succeeded')
+
+    def test_archive_moves_are_reported_as_changes(self, mock_verify_jwt):
+        """Test that the change feed and the suggest index see archived tools leave"""
+        self.client.get('/api/tools/suggest?prefix=tool', headers=self.viewer_auth_header)
+        since = json.loads(self.client.get('/api/tools/changes?limit=1000', headers=self.viewer_auth_header)
+                           .data)['next_since']
+
+        # The tools archived by this process are removed through the signal
+        self.client.post(f'/api/tools/{self.tool_ids[1]}/retire', headers=self.admin_auth_header)
+        self.archive({'older_than_days': 0})
+        response = self.client.get('/api/tools/suggest?prefix=tool', headers=self.viewer_auth_header)
+        names = [suggestion['name'] for suggestion in json.loads(response.data)['suggestions']]
+        self.assertNotIn('Tool 1', names)
+
+        # The ones archived by another process are removed by the next sync
+        with patch('suggest.SuggestIndex.apply'):
+            self.archive()
+        self.app.extensions['suggest_index'].synced_at -= 3600
+        response = self.client.get('/api/tools/suggest?prefix=tool', headers=self.viewer_auth_header)
+        names = [suggestion['name'] for suggestion in json.loads(response.data)['suggestions']]
+        self.assertEqual(names, ['Tool 3', 'Tool 5'])
+
+        response = self.client.get(f'/api/tools/changes?since={since}', headers=self.viewer_auth_header)
+        changes = [change for change in json.loads(response.data)['changes'] if change.get('archived')]
+        self.assertEqual([change['id'] for change in changes], [self.tool_ids[i] for i in (1, 0, 2, 4)])
+        self.assertTrue(all(change['change_seq'] > since for change in changes))
+
+    def test_invalid_params_are_rejected(self, mock_verify_jwt):
+        """Test that archive jobs with out-of-range or non-integer params are not queued"""
+        for params in ({'older_than_days': -1}, {'older_than_days': '30'}, {'older_than_days': True},
+                       {'batch_size': 0}, {'batch_size': -5}, {'batch_size': 1.5}):
+            with self.subTest(params=params):
+                response = self.client.post('/api/jobs', json={'type': 'tool_archive', 'params': params},
+                                            headers=self.admin_auth_header)
+                self.assertEqual(response.status_code, 422)
+        self.assertEqual(Job.query.count(), 0)
+
+        # A job stored before the check existed fails instead of archiving the live catalog
+        Job.create_job('tool_archive', {'older_than_days': -1}, created_by='cli')
+        self.runner.run_pending()
+        self.assertEqual(Job.query.one().status, 'failed')
+        self.assertEqual(ArchivedTool.query.count(), 0)
+
+    def test_retire_requires_update_permission(self, mock_verify_jwt):
+        """Test that retiring a tool needs update:tools and an existing tool"""
+        response = self.client.post(f'/api/tools/{self.tool_ids[0]}/retire', headers=self.viewer_auth_header)
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post('/api/tools/9999/retire', headers=self.admin_auth_header)
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
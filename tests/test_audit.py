@@ -0,0 +1,133 @@
+import unittest
+import json
+from unittest.mock import patch
+from app import create_app
+from models import db, User, AuditEntry, Job
+from config import SQLiteTestConfig
+from audit import AuditLog
+
+
+def mock_verify_decode_jwt(token):
+    if token == 'auditor':
+        return {'sub': 'auditor-user', 'permissions': ['read:tools', 'read:audit']}
+    return {'sub': 'admin-user', 'permissions': ['read:tools', 'create:tools', 'update:tools', 'delete:tools']}
+
+
+class AuditConfig(SQLiteTestConfig):
+    AUDIT_ENABLED = True
+    # Keep the background writer idle; the tests flush explicitly
+    AUDIT_FLUSH_INTERVAL = 3600
+    AUDIT_BATCH_SIZE = 1000
+
+
+@patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+class AuditLogTestCase(unittest.TestCase):
+    """
+    Test case for the write-behind audit log.
+    """
+
+    def setUp(self):
+        self.app = create_app(AuditConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(self.sample_user)
+        db.session.commit()
+        self.audit_log = self.app.extensions['audit_log']
+        self.admin_auth_header = {'Authorization': 'Bearer admin'}
+        self.auditor_auth_header = {'Authorization': 'Bearer auditor'}
+
+    def tearDown(self):
+        self.audit_log.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_writes_are_audited_after_flush(self, mock_verify_jwt):
+        """Test that tool changes are buffered, then written with the caller's subject"""
+        response = self.client.post('/api/tools', json={
+            'name': 'Nmap', 'description': 'Network scanner.', 'user_id': self.sample_user.id
+        }, headers=self.admin_auth_header)
+        tool_id = json.loads(response.data)['tool']['id']
+        self.client.patch(f'/api/tools/{tool_id}', json={'name': 'Nmap 7'}, headers=self.admin_auth_header)
+        self.client.delete(f'/api/tools/{tool_id}', headers=self.admin_auth_header)
+
+        # Nothing is written synchronously
+        self.assertEqual(AuditEntry.query.count(), 0)
+        self.assertEqual(self.audit_log.flush(), 3)
+
+        response = self.client.get('/api/audit', headers=self.auditor_auth_header)
+        entries = json.loads(response.data)['entries']
+        self.assertEqual([entry['action'] for entry in entries], ['tool.deleted', 'tool.updated', 'tool.created'])
+        self.assertTrue(all(entry['actor'] == 'admin-user' and entry['resource_id'] == tool_id for entry in entries))
+
+    def test_keyset_pagination_and_filters(self, mock_verify_jwt):
+        """Test that the audit log pages with next_before and filters by actor"""
+        for i in range(5):
+            self.audit_log.record('tool.created', 'tool', i, actor='alice' if i % 2 else 'bob')
+        self.audit_log.flush()
+
+        response = self.client.get('/api/audit?limit=2', headers=self.auditor_auth_header)
+        first_page = json.loads(response.data)
+        self.assertEqual([entry['resource_id'] for entry in first_page['entries']], [4, 3])
+        self.assertTrue(first_page['has_more'])
+
+        response = self.client.get(f"/api/audit?limit=2&before={first_page['next_before']}",
+                                   headers=self.auditor_auth_header)
+        self.assertEqual([entry['resource_id'] for entry in json.loads(response.data)['entries']], [2, 1])
+
+        response = self.client.get('/api/audit?actor=alice', headers=self.auditor_auth_header)
+        data = json.loads(response.data)
+        self.assertEqual([entry['resource_id'] for entry in data['entries']], [3, 1])
+        self.assertFalse(data['has_more'])
+
+    def test_requires_read_audit_permission(self, mock_verify_jwt):
+        """Test that reading the audit log needs read:audit"""
+        response = self.client.get('/api/audit', headers=self.admin_auth_header)
+        self.assertEqual(response.status_code, 403)
+
+    def test_job_changes_are_attributed_to_job_creator(self, mock_verify_jwt):
+        """Test that tools imported by a background job are audited as the job's creator"""
+        Job.create_job('tool_import', {'tools': [{'name': 'Imported', 'user_id': self.sample_user.id}]},
+                       created_by='importer')
+        self.app.extensions['job_runner'].run_pending()
+        self.audit_log.flush()
+
+        entry = AuditEntry.query.one()
+        self.assertEqual((entry.action, entry.actor), ('tool.created', 'importer'))
+
+    def test_overflow_drops_entries(self, mock_verify_jwt):
+        """Test that a full queue drops entries instead of blocking with the drop policy"""
+        audit_log = AuditLog(self.app, max_queue=2, overflow_policy='drop', flush_interval=3600)
+        results = [audit_log.record('tool.created', 'tool', i) for i in range(3)]
+
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(audit_log.metrics['dropped'], 1)
+        audit_log.stop()
+        self.assertEqual(AuditEntry.query.count(), 2)
+
+    def test_failed_flush_keeps_entries(self, mock_verify_jwt):
+        """Test that a failed batch is written by the next flush, while new entries wait in the queue"""
+        audit_log = AuditLog(self.app, max_queue=2, batch_size=2, overflow_policy='drop', flush_interval=3600)
+        for i in range(2):
+            audit_log.record('tool.created', 'tool', i)
+        with patch('audit.db.insert', side_effect=RuntimeError('database unavailable')):
+            with self.assertRaises(RuntimeError):
+                audit_log.flush()
+            results = [audit_log.record('tool.created', 'tool', i) for i in range(2, 5)]
+            with self.assertRaises(RuntimeError):
+                audit_log.flush()
+
+        # The queue overflowed while the database was down; the failed batch did not
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(audit_log.metrics['dropped'], 1)
+        self.assertEqual(audit_log.flush(), 4)
+        self.assertEqual(sorted(entry.resource_id for entry in AuditEntry.query.all()), [0, 1, 2, 3])
+        self.assertEqual(audit_log.metrics['flush_errors'], 2)
+        audit_log.stop()
+
+if __name__ == '__main__':
+    unittest.main()
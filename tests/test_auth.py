@@ -0,0 +1,69 @@
+import unittest
+import json
+import io
+from unittest.mock import patch
+import auth
+from config import Config
+
+JWKS = {'keys': [{'kty': 'RSA', 'kid': 'test-kid', 'use': 'sig', 'n': 'abc', 'e': 'AQAB'}]}
+
+
+def mock_urlopen(url, timeout=None):
+    return io.BytesIO(json.dumps(JWKS).encode('utf-8'))
+
+
+class JWKSCacheTestCase(unittest.TestCase):
+    """
+    Test case for the JWKS cache in auth.py.
+    """
+
+    def setUp(self):
+        auth._jwks_cache['jwks'] = None
+        auth._jwks_cache['fetched_at'] = 0.0
+
+    def tearDown(self):
+        auth._jwks_cache['jwks'] = None
+        auth._jwks_cache['fetched_at'] = 0.0
+
+    @patch('auth.urlopen', side_effect=mock_urlopen)
+    def test_jwks_fetched_once(self, mock_open):
+        """Test that repeated lookups are served from the cache"""
+        self.assertEqual(auth.get_jwks(), JWKS)
+        self.assertEqual(auth.get_jwks(), JWKS)
+        self.assertEqual(mock_open.call_count, 1)
+
+    @patch('auth.urlopen', side_effect=mock_urlopen)
+    def test_jwks_max_age_zero_refetches(self, mock_open):
+        """Test that max_age=0 bypasses the cache"""
+        auth.get_jwks()
+        auth.get_jwks(max_age=0)
+        self.assertEqual(mock_open.call_count, 2)
+
+    @patch('auth.urlopen', side_effect=mock_urlopen)
+    def test_warm_jwks(self, mock_open):
+        """Test that warming fills the cache"""
+        self.assertTrue(auth.warm_jwks())
+        auth.get_jwks()
+        self.assertEqual(mock_open.call_count, 1)
+
+    @patch('auth.urlopen', side_effect=OSError('network unreachable'))
+    def test_warm_jwks_failure(self, mock_open):
+        """Test that a failed warm-up does not raise"""
+        self.assertFalse(auth.warm_jwks())
+
+
+class ConfigValidationTestCase(unittest.TestCase):
+    """
+    Test case for deferred configuration validation.
+    """
+
+    def test_missing_setting_raises(self):
+        """Test that validate() reports a missing required setting"""
+        class MissingSecretConfig(Config):
+            SECRET_KEY = None
+
+        with self.assertRaises(ValueError):
+            MissingSecretConfig.validate()
+
+if __name__ == '__main__':
+    unittest.main()
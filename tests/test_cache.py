@@ -0,0 +1,109 @@
+import unittest
+import json
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool
+from config import SQLiteTestConfig
+from cache import TTLCache
+
+
+def mock_verify_decode_jwt(token):
+    return {'sub': 'admin-user', 'permissions': ['read:tools', 'create:tools', 'update:tools', 'delete:tools']}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TTLCacheTestCase(unittest.TestCase):
+    """
+    Test case for the TTL cache.
+    """
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        clock.now = 5
+        self.assertIsNone(cache.get('a'))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+
+
+class UserCacheConfig(SQLiteTestConfig):
+    USER_CACHE_TTL = 60
+    MAX_TOOLS_PER_USER = 2
+
+
+@patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+class UserCacheTestCase(unittest.TestCase):
+    """
+    Test case for the cached user lookups and tool counts on the create path.
+    """
+
+    def setUp(self):
+        self.app = create_app(UserCacheConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(self.sample_user)
+        db.session.commit()
+        self.cache = self.app.extensions['user_cache']
+        self.auth_header = {'Authorization': 'Bearer admin'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def create(self, name):
+        return self.client.post('/api/tools', json={
+            'name': name, 'description': 'A tool.', 'user_id': self.sample_user.id
+        }, headers=self.auth_header)
+
+    def test_user_lookup_is_cached(self, mock_verify_jwt):
+        """Test that repeated creates for one owner look the owner up once"""
+        with patch('cache.User.get_user', wraps=User.get_user) as get_user:
+            self.create('First')
+            self.create('Second')
+        self.assertEqual(get_user.call_count, 1)
+        self.assertEqual(self.cache.metrics['hits'], 1)
+
+    def test_user_changes_invalidate_cache(self, mock_verify_jwt):
+        """Test that updating a user drops its cache entry"""
+        self.create('First')
+        self.sample_user.username = 'Renamed User'
+        db.session.commit()
+        self.assertIsNone(self.cache.get(self.sample_user.id))
+
+    def test_tool_count_and_quota(self, mock_verify_jwt):
+        """Test that the tool count follows creates and deletes and enforces the quota"""
+        tool_id = json.loads(self.create('First').data)['tool']['id']
+        self.create('Second')
+        self.assertEqual(db.session.get(User, self.sample_user.id).tool_count, 2)
+
+        response = self.create('Third')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Tool.query.count(), 2)
+
+        self.client.delete(f'/api/tools/{tool_id}', headers=self.auth_header)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(User, self.sample_user.id).tool_count, 1)
+        self.assertEqual(self.create('Third').status_code, 201)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,312 @@
+import unittest
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import unquote
+from werkzeug.serving import DechunkedInput
+from app import create_app
+from auth import AuthError
+from models import db, User, Tool
+from config import SQLiteTestConfig
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'client'))
+
+from cybertools_client import ApiError, AsyncToolsClient, AuthenticationError, ClientCredentials, ToolsClient  # noqa: E402
+
+PERMISSIONS = ['read:tools', 'create:tools', 'update:tools', 'delete:tools']
+
+
+class TokenServer:
+    """
+    A stand-in for the Auth0 token endpoint, issuing token-1, token-2, ... for the test client's credentials.
+    """
+
+    def __init__(self, expires_in=3600):
+        server = self
+        self.expires_in = expires_in
+        self.issued = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                if body.get('client_secret') != 'secret' or body.get('grant_type') != 'client_credentials':
+                    self.send_response(401)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                server.issued.append(f'token-{len(server.issued) + 1}')
+                data = json.dumps({'access_token': server.issued[-1], 'expires_in': server.expires_in,
+                                   'token_type': 'Bearer'}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/oauth/token'
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class WSGIServer(ThreadingHTTPServer):
+    """
+    Serves a WSGI app over keep-alive HTTP/1.1 connections, which the Werkzeug
+    development server does not support, so that connection reuse can be tested.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, app):
+        self.app = app
+        super().__init__(('127.0.0.1', 0), WSGIHandler)
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server_address[1]}'
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class WSGIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+
+    def run_wsgi(self):
+        path, _, query = self.path.partition('?')
+        chunked = self.headers.get('Transfer-Encoding', '').lower() == 'chunked'
+        length = int(self.headers.get('Content-Length') or 0)
+        environ = {
+            'REQUEST_METHOD': self.command,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote(path),
+            'QUERY_STRING': query,
+            'SERVER_NAME': '127.0.0.1',
+            'SERVER_PORT': str(self.server.server_address[1]),
+            'SERVER_PROTOCOL': self.request_version,
+            'REMOTE_ADDR': self.client_address[0],
+            'CONTENT_TYPE': self.headers.get('Content-Type', ''),
+            'CONTENT_LENGTH': self.headers.get('Content-Length', ''),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': DechunkedInput(self.rfile) if chunked else io.BytesIO(self.rfile.read(length)),
+            'wsgi.input_terminated': chunked,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for key, value in self.headers.items():
+            key = 'HTTP_' + key.upper().replace('-', '_')
+            if key not in ('HTTP_CONTENT_TYPE', 'HTTP_CONTENT_LENGTH'):
+                environ[key] = value
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'], response['headers'] = status, headers
+
+        result = self.server.app(environ, start_response)
+        try:
+            stream = not any(key.lower() == 'content-length' for key, _ in response['headers'])
+            code, _, reason = response['status'].partition(' ')
+            self.send_response(int(code), reason)
+            for key, value in response['headers']:
+                self.send_header(key, value)
+            if stream:
+                self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for data in result:
+                if data and stream:
+                    data = b'%x\r\n%s\r\n' % (len(data), data)
+                self.wfile.write(data)
+                self.wfile.flush()
+            if stream:
+                self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    do_GET = do_POST = do_PATCH = do_DELETE = run_wsgi
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ClientConfig(SQLiteTestConfig):
+    EVENTS_HEARTBEAT_INTERVAL = 0.2
+    IDEMPOTENCY_ENABLED = True
+
+
+class ClientCredentialsTestCase(unittest.TestCase):
+    """
+    Test case for the client's token cache.
+    """
+
+    def setUp(self):
+        self.tokens = TokenServer(expires_in=600)
+        self.now = 1000.0
+
+    def tearDown(self):
+        self.tokens.stop()
+
+    def credentials(self, secret='secret'):
+        return ClientCredentials('example.auth0.com', 'client', secret, 'aud', token_url=self.tokens.url,
+                                 refresh_margin=60, clock=lambda: self.now)
+
+    def test_token_is_reused_until_shortly_before_expiry(self):
+        credentials = self.credentials()
+        self.assertEqual(credentials.get_token(), 'token-1')
+        self.now += 500
+        self.assertEqual(credentials.get_token(), 'token-1')
+        self.now += 50
+        self.assertEqual(credentials.get_token(), 'token-2')
+        self.assertEqual(credentials.fetches, 2)
+
+    def test_concurrent_callers_share_one_fetch(self):
+        credentials = self.credentials()
+        threads = [threading.Thread(target=credentials.get_token) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.tokens.issued, ['token-1'])
+
+    def test_rejected_credentials(self):
+        with self.assertRaises(AuthenticationError) as context:
+            self.credentials(secret='wrong').get_token()
+        self.assertEqual(context.exception.status, 401)
+
+
+class ToolsClientTestCase(unittest.TestCase):
+    """
+    Test case for the client library against the API served over HTTP.
+    """
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        config = type('FileConfig', (ClientConfig,), {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.db_path}'})
+        self.app = create_app(config)
+        with self.app.app_context():
+            db.create_all()
+            user = User(username="Test User", email="testuser@example.com")
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+            self.tool_ids = [Tool.create_tool(f'Tool {i}', 'A tool.', user.id, ['scanner'] if i % 2 else []).id
+                             for i in range(5)]
+
+        # Tokens issued by the stand-in token server are valid unless revoked
+        self.revoked = set()
+        self.verify_patcher = patch('auth.verify_decode_jwt', side_effect=self.verify)
+        self.verify_patcher.start()
+
+        self.server = WSGIServer(self.app)
+        self.tokens = TokenServer()
+        auth = ClientCredentials('example.auth0.com', 'client', 'secret', 'aud', token_url=self.tokens.url)
+        self.client = ToolsClient(self.server.url, auth, page_size=2)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+        self.tokens.stop()
+        self.verify_patcher.stop()
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        os.remove(self.db_path)
+
+    def verify(self, token):
+        if not token.startswith('token-') or token in self.revoked:
+            raise AuthError({'code': 'invalid_token', 'description': 'Token revoked.'}, 401)
+        return {'sub': 'client@clients', 'permissions': PERMISSIONS}
+
+    def test_requests_share_a_token_and_a_connection(self):
+        """Test that consecutive requests reuse one kept-alive connection and one token"""
+        for tool_id in self.tool_ids:
+            self.assertEqual(self.client.get_tool(tool_id)['id'], tool_id)
+        self.assertEqual(self.client.pool.metrics['created'], 1)
+        self.assertEqual(self.client.pool.metrics['reused'], len(self.tool_ids) - 1)
+        self.assertEqual(self.tokens.issued, ['token-1'])
+
+    def test_listings_are_paged_transparently(self):
+        """Test that list_tools follows next_after across pages"""
+        self.assertEqual([tool['id'] for tool in self.client.list_tools()], self.tool_ids)
+        self.assertEqual([tool['name'] for tool in self.client.list_tools(tags=['scanner'])], ['Tool 1', 'Tool 3'])
+        self.assertEqual(len(list(self.client.iter_changes())), len(self.tool_ids))
+
+    def test_writes_and_batch_lookups(self):
+        """Test creating, updating, deleting and looking tools up in batches"""
+        tool = self.client.create_tool('Nmap', 'Network scanner.', self.user_id, tags=['Network'],
+                                       idempotency_key='create-nmap')
+        self.assertEqual(tool['tags'], ['network'])
+        # A retry with the same key returns the same tool
+        self.assertEqual(self.client.create_tool('Nmap', 'Network scanner.', self.user_id, tags=['Network'],
+                                                 idempotency_key='create-nmap'), tool)
+        self.assertEqual(self.client.update_tool(tool['id'], name='Zenmap')['name'], 'Zenmap')
+
+        found = self.client.get_tools(self.tool_ids + [tool['id'], 999999] + list(range(1000, 1150)))
+        self.assertEqual(sorted(found), sorted(self.tool_ids + [tool['id']]))
+
+        self.assertEqual(self.client.delete_tool(tool['id']), tool['id'])
+        with self.assertRaises(ApiError) as context:
+            self.client.get_tool(tool['id'])
+        self.assertEqual(context.exception.status, 404)
+
+    def test_revoked_token_is_replaced(self):
+        """Test that a 401 fetches a new token and retries once"""
+        self.client.get_tool(self.tool_ids[0])
+        self.revoked.add('token-1')
+        self.assertEqual(self.client.get_tool(self.tool_ids[0])['id'], self.tool_ids[0])
+        self.assertEqual(self.tokens.issued, ['token-1', 'token-2'])
+
+    def test_streaming_export_and_import(self):
+        """Test that export and import stream their bodies"""
+        self.assertEqual([tool['name'] for tool in self.client.export_tools()], [f'Tool {i}' for i in range(5)])
+        rows = ({'name': f'Imported {i}', 'description': 'A tool.', 'user_id': self.user_id} for i in range(3))
+        summary = self.client.import_tools(rows)
+        self.assertEqual(summary['imported'], 3)
+        self.assertEqual(len(list(self.client.list_tools())), 8)
+        self.assertEqual(self.client.pool.metrics['created'], 1)
+
+    def test_event_stream(self):
+        """Test that Server-Sent Events are parsed, and that leaving a stream releases its connection"""
+        events = self.client.stream_events(last_event_id=0)
+        first, second = next(events), next(events)
+        self.assertEqual((first['event'], first['data']['name']), ('tool.changed', 'Tool 0'))
+        self.assertGreater(second['id'], first['id'])
+        events.close()
+        self.assertEqual(self.client.pool.metrics['discarded'], 1)
+
+    def test_async_client(self):
+        """Test that the async client runs requests concurrently over the pool"""
+        async def run():
+            async with AsyncToolsClient(self.server.url, self.client.auth,
+                                        pool_size=4, page_size=2) as client:
+                tools = await asyncio.gather(*(client.get_tool(tool_id) for tool_id in self.tool_ids))
+                listed = [tool['id'] async for tool in client.list_tools()]
+                return [tool['id'] for tool in tools], listed, dict(client.client.pool.metrics)
+
+        fetched, listed, connections = asyncio.run(run())
+        self.assertEqual(fetched, self.tool_ids)
+        self.assertEqual(listed, self.tool_ids)
+        self.assertLessEqual(connections['created'], 4, connections)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+import json
+import threading
+import time
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool
+from config import SQLiteTestConfig
+from coalesce import SingleFlight, coalesce_requests
+
+
+def mock_verify_decode_jwt(token):
+    return {'sub': 'test-user-id', 'permissions': ['read:tools']}
+
+
+class CoalesceConfig(SQLiteTestConfig):
+    COALESCE_ENABLED = True
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    """
+    Test case for the single-flight coalescing primitive.
+    """
+
+    def wait_for_waiters(self, flight, key, count):
+        deadline = time.monotonic() + 5
+        while flight.waiters(key) < count and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    def test_concurrent_calls_share_one_computation(self):
+        """Test that overlapping calls with the same key run the function once"""
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return 'body'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('k', compute, 5)))
+        leader.start()
+        while not calls:
+            time.sleep(0.001)
+
+        followers = [threading.Thread(target=lambda: results.append(flight.do('k', compute, 5)))
+                     for _ in range(3)]
+        for follower in followers:
+            follower.start()
+        self.wait_for_waiters(flight, 'k', 3)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [('body', False)] + [('body', True)] * 3)
+        self.assertEqual(flight.metrics['coalesced'], 3)
+
+    def test_follower_stops_waiting_after_timeout(self):
+        """Test that waiting is bounded and the follower computes on its own"""
+        flight = SingleFlight()
+        release = threading.Event()
+        leader = threading.Thread(target=lambda: flight.do('k', lambda: release.wait(5), 5))
+        leader.start()
+        while not flight._calls:
+            time.sleep(0.001)
+
+        result, shared = flight.do('k', lambda: 'own', 0.01)
+        release.set()
+        leader.join()
+
+        self.assertEqual((result, shared), ('own', False))
+        self.assertEqual(flight.metrics['wait_timeouts'], 1)
+
+
+class CoalescedRouteTestCase(unittest.TestCase):
+    """
+    Test case for coalescing on the listing routes.
+    """
+
+    def setUp(self):
+        self.app = create_app(CoalesceConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(sample_user)
+        db.session.commit()
+        db.session.add(Tool(name="Test Tool", description="A test tool.", user_id=sample_user.id))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_get_tools_through_coalescer(self, mock_verify_jwt):
+        """Test that a coalesced route still returns the normal response"""
+        response = self.client.get('/api/tools', headers={'Authorization': 'Bearer token'})
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(len(data['tools']), 1)
+        self.assertNotIn('X-Coalesced', response.headers)
+        self.assertEqual(self.app.extensions['request_coalescer'].metrics['leaders'], 1)
+
+    def test_view_headers_are_kept(self):
+        """Test that headers set by the view are passed through, to the leader and to followers"""
+        release = threading.Event()
+
+        @self.app.route('/cached')
+        @coalesce_requests
+        def cached():
+            release.wait(5)
+            return '{"cached": true}', 200, {'Content-Type': 'application/json', 'Cache-Control': 'max-age=60'}
+
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(self.app.test_client().get('/cached')))
+                   for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        coalescer = self.app.extensions['request_coalescer']
+        deadline = time.monotonic() + 5
+        while coalescer.waiters(('cached', (), (), ())) == 0 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted('X-Coalesced' in response.headers for response in responses), [False, True])
+        for response in responses:
+            self.assertEqual(response.headers['Cache-Control'], 'max-age=60')
+            self.assertEqual(response.mimetype, 'application/json')
+            self.assertEqual(response.content_length, len(response.data))
+
+if __name__ == '__main__':
+    unittest.main()
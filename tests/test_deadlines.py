@@ -0,0 +1,190 @@
+import unittest
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from unittest.mock import patch
+from flask import g
+from werkzeug.exceptions import GatewayTimeout
+import auth
+from app import create_app
+from models import db, User, Tool
+from config import SQLiteTestConfig
+from deadlines import clear_progress_handler
+
+# Never finishes on its own: counts upwards forever
+ENDLESS_QUERY = db.text('WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c')
+
+# Runs well over SQLITE_PROGRESS_STEPS instructions
+COUNTING_QUERY = db.text('WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 10000) '
+                         'SELECT count(*) FROM c')
+
+
+def mock_verify_decode_jwt(token):
+    return {'sub': 'admin-user', 'permissions': ['read:tools', 'create:tools', 'update:tools', 'delete:tools']}
+
+
+def endless_query(*args, **kwargs):
+    db.session.execute(ENDLESS_QUERY).scalar()
+    return []
+
+
+class DeadlineConfig(SQLiteTestConfig):
+    REQUEST_TIMEOUT = 10
+    REQUEST_TIMEOUT_ROUTES = {'api.get_tools': 0.2}
+
+
+@patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+class DeadlinesTestCase(unittest.TestCase):
+    """
+    Test case for request deadlines and the database statements they bound.
+    """
+
+    def setUp(self):
+        self.app = create_app(DeadlineConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(self.sample_user)
+        db.session.commit()
+        self.tool = Tool.create_tool('Nmap', 'Network scanner.', self.sample_user.id)
+        self.auth_header = {'Authorization': 'Bearer admin'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_slow_query_is_interrupted_at_the_route_deadline(self, mock_verify_jwt):
+        """Test that a statement running past the deadline is stopped and answered with 504"""
+        started = time.monotonic()
+        with patch.object(Tool, 'get_all_tools', side_effect=endless_query):
+            response = self.client.get('/api/tools', headers=self.auth_header)
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(json.loads(response.data)['message'], 'Gateway Timeout')
+        self.assertLess(time.monotonic() - started, 2)
+
+        # The connection is usable again once the request is over
+        response = self.client.get('/api/tools', headers=self.auth_header)
+        self.assertEqual(response.status_code, 200)
+
+    def test_client_deadline_shortens_the_route_deadline(self, mock_verify_jwt):
+        """Test that X-Request-Timeout bounds a request whose route has a longer budget"""
+        started = time.monotonic()
+        with patch.object(Tool, 'get_tool', side_effect=endless_query):
+            response = self.client.get(f'/api/tools/{self.tool.id}',
+                                       headers={**self.auth_header, 'X-Request-Timeout': '0.2'})
+        self.assertEqual(response.status_code, 504)
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_write_past_the_deadline_is_not_unprocessable(self, mock_verify_jwt):
+        """Test that a write stopped by the deadline returns 504 rather than 422"""
+        with patch.object(Tool, 'update', side_effect=endless_query):
+            response = self.client.patch(f'/api/tools/{self.tool.id}', json={'name': 'Zenmap'},
+                                         headers={**self.auth_header, 'X-Request-Timeout': '0.2'})
+        self.assertEqual(response.status_code, 504)
+
+    def test_handler_is_removed_when_the_connection_is_returned(self, mock_verify_jwt):
+        """Test that a connection returned to the pool mid-request no longer carries the request's deadline"""
+        with self.app.test_request_context():
+            g.deadline = time.monotonic() + 0.1
+            with db.engine.connect() as connection:
+                connection.execute(db.text('SELECT 1'))
+            time.sleep(0.2)
+            # Work outside the request's deadline on the same pooled connection is not interrupted
+            g.pop('deadline')
+            with db.engine.connect() as connection:
+                self.assertEqual(connection.execute(COUNTING_QUERY).scalar(), 10000)
+
+        # Overflow connections are closed when checked in; clearing them must not fail
+        closed = sqlite3.connect(':memory:')
+        closed.close()
+        clear_progress_handler(closed, None)
+
+    def test_invalid_client_deadline(self, mock_verify_jwt):
+        """Test that a malformed, zero or negative X-Request-Timeout is rejected"""
+        for value in ['soon', '0', '-1', 'nan']:
+            response = self.client.get('/api/tools', headers={**self.auth_header, 'X-Request-Timeout': value})
+            self.assertEqual(response.status_code, 400)
+
+
+@patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+class ShardDeadlinesTestCase(unittest.TestCase):
+    """
+    Test case for request deadlines on the shard queries of a fan-out.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        config = type('Config', (DeadlineConfig,), {
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.directory, 'directory.db')}",
+            'SHARD_DATABASE_URLS': [f"sqlite:///{os.path.join(self.directory, f'shard{i}.db')}" for i in range(2)],
+        })
+        self.app = create_app(config)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.router = self.app.extensions['shard_router']
+        self.router.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.router.dispose()
+        self.app_context.pop()
+        shutil.rmtree(self.directory)
+
+    def test_fan_out_query_is_interrupted_at_the_deadline(self, mock_verify_jwt):
+        """Test that shard queries run by the fan-out threads are stopped at the request's deadline"""
+        def endless_shard_query(session, *criteria):
+            session.execute(ENDLESS_QUERY).scalar()
+            return []
+
+        started = time.monotonic()
+        with patch('sharding._live_tools', side_effect=endless_shard_query):
+            response = self.client.get('/api/tools?ids=1,2', headers={'Authorization': 'Bearer admin'})
+        self.assertEqual(response.status_code, 504)
+        self.assertLess(time.monotonic() - started, 2)
+
+
+class JWKSDeadlineTestCase(unittest.TestCase):
+    """
+    Test case for bounding the JWKS fetch by the request deadline.
+    """
+
+    def setUp(self):
+        self.app = create_app(DeadlineConfig)
+        auth._jwks_cache['jwks'] = None
+        auth._jwks_cache['fetched_at'] = 0.0
+
+    def tearDown(self):
+        auth._jwks_cache['jwks'] = None
+        auth._jwks_cache['fetched_at'] = 0.0
+
+    @patch('auth.urlopen', return_value=io.BytesIO(b'{"keys": []}'))
+    def test_fetch_timeout_is_the_remaining_budget(self, mock_open):
+        """Test that the key set fetch times out no later than the request"""
+        with self.app.test_request_context():
+            g.deadline = time.monotonic() + 0.5
+            auth.get_jwks()
+        self.assertLessEqual(mock_open.call_args.kwargs['timeout'], 0.5)
+
+    @patch('auth.urlopen')
+    def test_no_fetch_past_the_deadline(self, mock_open):
+        """Test that no fetch starts once the deadline has passed"""
+        with self.app.test_request_context():
+            g.deadline = time.monotonic() - 1
+            with self.assertRaises(GatewayTimeout):
+                auth.get_jwks()
+        mock_open.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool, tool_changed
+from config import SQLiteTestConfig
+from events import InProcessBroker
+
+
+def mock_verify_decode_jwt(token):
+    return {'sub': 'test-user-id', 'permissions': ['read:tools', 'update:tools']}
+
+
+class StreamConfig(SQLiteTestConfig):
+    EVENTS_HEARTBEAT_INTERVAL = 0.01
+    EVENTS_STREAM_MAX_SECONDS = 5
+
+
+class BrokerTestCase(unittest.TestCase):
+    """
+    Test case for the in-process event broker.
+    """
+
+    def test_fan_out_to_all_subscribers(self):
+        """Test that every subscriber receives a published event"""
+        broker = InProcessBroker()
+        first, second = broker.subscribe(), broker.subscribe()
+        broker.publish({'id': 1})
+        self.assertEqual(first.queue.get_nowait(), {'id': 1})
+        self.assertEqual(second.queue.get_nowait(), {'id': 1})
+
+    def test_full_queue_marks_overflow(self):
+        """Test that a slow subscriber is marked overflowed instead of blocking"""
+        broker = InProcessBroker(queue_size=1)
+        subscription = broker.subscribe()
+        broker.publish({'id': 1})
+        broker.publish({'id': 2})
+        self.assertTrue(subscription.overflowed)
+
+    def test_unsubscribe(self):
+        """Test that unsubscribed queues receive nothing"""
+        broker = InProcessBroker()
+        subscription = broker.subscribe()
+        broker.unsubscribe(subscription)
+        broker.publish({'id': 1})
+        self.assertTrue(subscription.queue.empty())
+
+
+class ToolStreamTestCase(unittest.TestCase):
+    """
+    Test case for GET /api/tools/stream.
+    """
+
+    def setUp(self):
+        self.app = create_app(StreamConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(self.sample_user)
+        db.session.commit()
+        self.sample_tool = Tool.create_tool("Test Tool", "A test tool.", self.sample_user.id)
+        self.sample_tool_seq = self.sample_tool.change_seq
+        self.headers = {'Authorization': 'Bearer token'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def read_chunks(self, response, count):
+        chunks = []
+        for chunk in response.response:
+            chunks.append(chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk)
+            if len(chunks) == count:
+                break
+        response.close()
+        return chunks
+
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_resume_from_last_event_id(self, mock_verify_jwt):
+        """Test that changes after Last-Event-ID are replayed first"""
+        headers = dict(self.headers, **{'Last-Event-ID': '0'})
+        response = self.client.get('/api/tools/stream', headers=headers, buffered=False)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        retry, replayed = self.read_chunks(response, 2)
+        self.assertTrue(retry.startswith('retry:'))
+        self.assertIn(f'id: {self.sample_tool_seq}', replayed)
+        self.assertIn('"Test Tool"', replayed)
+
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_heartbeat_and_live_event(self, mock_verify_jwt):
+        """Test that idle streams send heartbeats and live changes are pushed"""
+        response = self.client.get('/api/tools/stream', headers=self.headers, buffered=False)
+        chunks = iter(response.response)
+        next(chunks)  # retry hint
+        self.assertEqual(next(chunks), b': heartbeat\n\n')
+
+        Tool.get_tool(self.sample_tool.id).update({'name': 'Renamed Tool'})
+        while True:
+            chunk = next(chunks)
+            if chunk != b': heartbeat\n\n':
+                break
+        response.close()
+
+        self.assertIn(b'event: tool.updated', chunk)
+        self.assertIn(b'"Renamed Tool"', chunk)
+        self.assertEqual(Tool.get_tool(self.sample_tool.id).name, 'Renamed Tool')
+
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_failing_receiver_does_not_fail_the_request(self, mock_verify_jwt):
+        """Test that a tool_changed receiver error is logged after the commit, not returned to the client"""
+        received = []
+
+        def failing(tool, action):
+            raise RuntimeError('receiver failed')
+
+        def recording(tool, action):
+            received.append((tool.id, action))
+
+        tool_changed.connect(failing)
+        tool_changed.connect(recording)
+        try:
+            with self.assertLogs('models', level='ERROR'):
+                response = self.client.patch(f'/api/tools/{self.sample_tool.id}', json={'name': 'Renamed Tool'},
+                                             headers=self.headers)
+        finally:
+            tool_changed.disconnect(failing)
+            tool_changed.disconnect(recording)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(received, [(self.sample_tool.id, 'updated')])
+        db.session.expire_all()
+        self.assertEqual(Tool.get_tool(self.sample_tool.id).name, 'Renamed Tool')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import json
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool
+from config import SQLiteTestConfig
+from fragments import FragmentCache, ENTRY_OVERHEAD
+
+
+def mock_verify_decode_jwt(token):
+    return {'sub': 'admin-user', 'permissions': ['read:tools', 'create:tools', 'update:tools', 'delete:tools']}
+
+
+class FragmentCacheTestCase(unittest.TestCase):
+    """
+    Test case for the size-bounded fragment cache.
+    """
+
+    def test_fragments_match_their_row_version(self):
+        cache = FragmentCache()
+        cache.set(1, 7, b'{"id":1}')
+        self.assertEqual(cache.get(1, 7), b'{"id":1}')
+        self.assertIsNone(cache.get(1, 8))
+
+    def test_least_recently_used_fragments_are_evicted_by_size(self):
+        cache = FragmentCache(max_bytes=3 * (10 + ENTRY_OVERHEAD))
+        for tool_id in range(3):
+            cache.set(tool_id, 1, b'x' * 10)
+        cache.get(0, 1)
+        cache.set(3, 1, b'x' * 10)
+        self.assertIsNone(cache.get(1, 1))
+        self.assertIsNotNone(cache.get(0, 1))
+        self.assertEqual(cache.size, 3 * (10 + ENTRY_OVERHEAD))
+        self.assertEqual(cache.metrics['evictions'], 1)
+
+
+class FragmentConfig(SQLiteTestConfig):
+    FRAGMENT_CACHE_MAX_BYTES = 1024 * 1024
+
+
+@patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+class FragmentResponsesTestCase(unittest.TestCase):
+    """
+    Test case for list responses assembled from cached fragments.
+    """
+
+    def setUp(self):
+        self.app = create_app(FragmentConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(self.sample_user)
+        db.session.commit()
+        self.nmap = Tool.create_tool('Nmap', 'Network scanner.', self.sample_user.id, ['scanner'])
+        self.zap = Tool.create_tool('ZAP', 'Web proxy "zed".', self.sample_user.id, ['proxy', 'scanner'])
+        self.cache = self.app.extensions['fragment_cache']
+        self.auth_header = {'Authorization': 'Bearer admin'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def get(self, url, **kwargs):
+        response = self.client.get(url, headers=self.auth_header, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)
+
+    def test_responses_match_serialize(self, mock_verify_jwt):
+        """Test that assembled responses hold the same tools as Tool.serialize"""
+        expected = [self.nmap.serialize(), self.zap.serialize()]
+        self.assertEqual(self.get('/api/tools')['tools'], expected)
+        # The second time from the cache
+        self.assertEqual(self.get('/api/tools')['tools'], expected)
+        self.assertEqual(self.cache.metrics['hits'], 2)
+
+        data = self.get('/api/tools', query_string={'limit': 1, 'tag': 'scanner'})
+        self.assertEqual(data['tools'], expected[:1])
+        self.assertEqual(data['next_after'], self.nmap.id)
+        self.assertEqual(data['facets'], {'proxy': 1, 'scanner': 2})
+
+        data = self.get('/api/tools', query_string={'ids': f'{self.zap.id},999'})
+        self.assertEqual(data, {'success': True, 'tools': expected[1:], 'missing': [999]})
+
+    def test_writes_replace_fragments(self, mock_verify_jwt):
+        """Test that updates, tag changes and deletes are never answered from a stale fragment"""
+        self.get('/api/tools')
+        self.nmap.update({'name': 'Zenmap'})
+        self.assertEqual(self.cache.metrics['invalidations'], 1)
+        self.assertEqual(self.get('/api/tools')['tools'][0]['name'], 'Zenmap')
+
+        self.nmap.update({'tags': ['gui']})
+        self.assertEqual(self.get('/api/tools')['tools'][0]['tags'], ['gui'])
+
+        self.zap.delete()
+        self.assertEqual([tool['name'] for tool in self.get('/api/tools')['tools']], ['Zenmap'])
+
+
+if __name__ == '__main__':
+    unittest.main()
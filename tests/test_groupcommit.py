@@ -0,0 +1,121 @@
+import unittest
+import json
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool
+from config import SQLiteTestConfig
+from groupcommit import GroupCommitter
+
+
+def mock_verify_decode_jwt(token):
+    return {'sub': 'admin-user', 'permissions': ['read:tools', 'create:tools', 'update:tools', 'delete:tools']}
+
+
+class GroupCommitConfig(SQLiteTestConfig):
+    GROUP_COMMIT_ENABLED = True
+
+
+@patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+class GroupCommitTestCase(unittest.TestCase):
+    """
+    Test case for group commit of concurrent tool creations.
+    """
+
+    def setUp(self):
+        # Concurrent requests need a database that several connections can share
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        config = type('Config', (GroupCommitConfig,), {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.db_path}'})
+        self.app = create_app(config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(self.sample_user)
+        db.session.commit()
+        self.user_id = self.sample_user.id
+        # init_group_commit leaves group commit off on SQLite, so the batching
+        # itself is tested with a committer installed directly. A long window
+        # makes every concurrent request join the first batch.
+        self.committer = self.app.extensions['group_committer'] = GroupCommitter(window=0.5, max_batch=4)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        os.close(self.db_fd)
+        os.remove(self.db_path)
+
+    def create_concurrently(self, payloads):
+        responses = [None] * len(payloads)
+
+        def post(index):
+            client = self.app.test_client()
+            responses[index] = client.post('/api/tools', json=payloads[index],
+                                           headers={'Authorization': 'Bearer admin'})
+
+        threads = [threading.Thread(target=post, args=(i,)) for i in range(len(payloads))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_concurrent_creates_share_one_commit(self, mock_verify_jwt):
+        """Test that concurrent creates are committed as one batch and each gets its own tool"""
+        payloads = [{'name': f'Tool {i}', 'description': 'Batched.', 'user_id': self.user_id} for i in range(4)]
+        responses = self.create_concurrently(payloads)
+
+        self.assertEqual([response.status_code for response in responses], [201] * 4)
+        tools = [json.loads(response.data)['tool'] for response in responses]
+        self.assertEqual([tool['name'] for tool in tools], [payload['name'] for payload in payloads])
+        self.assertEqual(len({tool['id'] for tool in tools}), 4)
+        self.assertEqual(self.committer.metrics['batches'], 1)
+        self.assertEqual(self.committer.metrics['rows'], 4)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(User, self.user_id).tool_count, 4)
+
+    def test_failing_row_only_fails_its_caller(self, mock_verify_jwt):
+        """Test that a batch with a failing row is retried row by row"""
+        self.app.config['MAX_TOOLS_PER_USER'] = 2
+        payloads = [{'name': f'Tool {i}', 'description': 'Batched.', 'user_id': self.user_id} for i in range(3)]
+        responses = self.create_concurrently(payloads)
+
+        self.assertEqual(sorted(response.status_code for response in responses), [201, 201, 403])
+        self.assertEqual(self.committer.metrics['retried_batches'], 1)
+        self.assertEqual(Tool.query.count(), 2)
+
+    def test_followers_wait_for_a_slow_batch(self, mock_verify_jwt):
+        """Test that a request waits for its batch however long it takes, rather than failing while it commits"""
+        insert = self.committer._insert
+
+        def slow_insert(entries):
+            threading.Event().wait(0.3)
+            insert(entries)
+
+        payloads = [{'name': f'Tool {i}', 'description': 'Batched.', 'user_id': self.user_id} for i in range(4)]
+        with patch.object(self.committer, '_insert', side_effect=slow_insert):
+            responses = self.create_concurrently(payloads)
+        self.assertEqual([response.status_code for response in responses], [201] * 4)
+        self.assertEqual(Tool.query.count(), 4)
+
+    def test_batch_leaves_the_leader_session_alone(self, mock_verify_jwt):
+        """Test that the batch is committed apart from the leader's pending work"""
+        db.session.add(User(username="Pending User", email="pending@example.com"))
+        tool = self.committer.submit({'name': 'Solo', 'description': 'Batched.', 'user_id': self.user_id})
+        db.session.rollback()
+
+        self.assertIsNone(User.query.filter_by(username="Pending User").first())
+        self.assertEqual([t.name for t in Tool.query.all()], ['Solo'])
+        self.assertEqual(tool.serialize()['name'], 'Solo')
+
+    def test_not_enabled_on_sqlite(self, mock_verify_jwt):
+        """Test that GROUP_COMMIT_ENABLED is ignored on SQLite"""
+        self.assertNotIn('group_committer', create_app(GroupCommitConfig).extensions)
+
+
+if __name__ == '__main__':
+    unittest.main()
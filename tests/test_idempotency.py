@@ -0,0 +1,197 @@
+import unittest
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool
+from config import SQLiteTestConfig
+from idempotency import MemoryStore, SQLiteStore, STORED, OWNER, BUSY
+
+
+def mock_verify_decode_jwt(token):
+    return {'sub': f'{token}-user', 'permissions': ['read:tools', 'create:tools', 'update:tools', 'delete:tools']}
+
+
+class IdempotencyConfig(SQLiteTestConfig):
+    IDEMPOTENCY_ENABLED = True
+    IDEMPOTENCY_MAX_WAIT = 5
+
+
+def response_entry(body=b'{}'):
+    return {'fingerprint': 'f', 'status': 201, 'headers': [('Content-Type', 'application/json')], 'body': body}
+
+
+class MemoryStoreTestCase(unittest.TestCase):
+    """
+    Test case for the in-memory idempotency store.
+    """
+
+    def test_retry_waits_for_the_running_request(self):
+        """Test that a duplicate waits for the first request and gets its response"""
+        store = MemoryStore()
+        self.assertEqual(store.begin('k', 1), (OWNER, None))
+
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(store.begin('k', 5)))
+        waiter.start()
+        time.sleep(0.05)
+        self.assertEqual(results, [])
+        store.finish('k', response_entry())
+        waiter.join()
+
+        self.assertEqual(results, [(STORED, response_entry())])
+
+    def test_key_is_released_when_nothing_was_stored(self):
+        """Test that a failed request lets a waiting retry run it again"""
+        store = MemoryStore()
+        store.begin('k', 1)
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(store.begin('k', 5)))
+        waiter.start()
+        time.sleep(0.05)
+        store.finish('k')
+        waiter.join()
+
+        self.assertEqual(results, [(OWNER, None)])
+        self.assertEqual(store.begin('k', 0.01), (BUSY, None))
+
+    def test_entries_expire_and_are_bounded(self):
+        """Test that stored responses expire after the TTL and the oldest are evicted"""
+        now = [0.0]
+        store = MemoryStore(maxsize=2, ttl=10, clock=lambda: now[0])
+        for key in ('a', 'b', 'c'):
+            store.begin(key, 0)
+            store.finish(key, response_entry(key.encode()))
+
+        self.assertEqual(store.begin('a', 0), (OWNER, None))
+        self.assertEqual(store.begin('c', 0)[0], STORED)
+        now[0] = 11
+        self.assertEqual(store.begin('c', 0), (OWNER, None))
+
+
+class SQLiteStoreTestCase(unittest.TestCase):
+    """
+    Test case for the idempotency store shared between worker processes.
+    """
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.now = 1000.0
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def store(self, **options):
+        return SQLiteStore(self.path, clock=lambda: self.now, poll_interval=0.001, **options)
+
+    def test_stored_response_is_shared(self):
+        """Test that a response stored by one store is replayed by another on the same file"""
+        first, second = self.store(), self.store()
+        self.assertEqual(first.begin('k', 1), (OWNER, None))
+        self.assertEqual(second.begin('k', 0), (BUSY, None))
+        first.finish('k', response_entry(b'{"id": 1}'))
+
+        outcome, entry = second.begin('k', 0)
+        self.assertEqual(outcome, STORED)
+        self.assertEqual((entry['status'], entry['body']), (201, b'{"id": 1}'))
+        self.assertEqual(entry['headers'], [['Content-Type', 'application/json']])
+
+    def test_abandoned_claim_expires(self):
+        """Test that a claim left by a crashed worker can be taken over after its lease"""
+        store = self.store(lease=30)
+        store.begin('k', 0)
+        self.now += 31
+        self.assertEqual(store.begin('k', 0), (OWNER, None))
+
+    def test_prune_keeps_the_newest_entries(self):
+        """Test that pruning removes expired responses and the oldest beyond maxsize"""
+        store = self.store(maxsize=50, ttl=100)
+        for i in range(100):
+            self.now += 1
+            store.begin(str(i), 0)
+            store.finish(str(i), response_entry())
+
+        self.assertEqual(store.begin('49', 0), (OWNER, None))
+        self.assertEqual(store.begin('50', 0)[0], STORED)
+
+
+@patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+class IdempotentRouteTestCase(unittest.TestCase):
+    """
+    Test case for Idempotency-Key handling on the write routes.
+    """
+
+    def setUp(self):
+        self.app = create_app(IdempotencyConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(self.sample_user)
+        db.session.commit()
+        self.new_tool = {'name': 'Nmap', 'description': 'Network scanner.', 'user_id': self.sample_user.id}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def post_tool(self, key, token='admin', body=None):
+        headers = {'Authorization': f'Bearer {token}'}
+        if key is not None:
+            headers['Idempotency-Key'] = key
+        return self.client.post('/api/tools', json=body or self.new_tool, headers=headers)
+
+    def test_retry_is_answered_from_the_store(self, mock_verify_jwt):
+        """Test that a retried create returns the first response without inserting again"""
+        first = self.post_tool('create-1')
+        with patch('routes.insert_tool') as insert_tool:
+            retry = self.post_tool('create-1')
+            insert_tool.assert_not_called()
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry.headers['Idempotent-Replayed'], 'true')
+        self.assertNotIn('Idempotent-Replayed', first.headers)
+        self.assertEqual(Tool.query.count(), 1)
+
+    def test_keys_are_scoped_and_optional(self, mock_verify_jwt):
+        """Test that keys belong to one caller and requests without a key always run"""
+        self.post_tool('create-1')
+        self.post_tool('create-1', token='other')
+        self.post_tool(None)
+        self.post_tool(None)
+        self.assertEqual(Tool.query.count(), 4)
+
+    def test_key_reused_for_another_request(self, mock_verify_jwt):
+        """Test that a key sent with a different body is rejected"""
+        self.post_tool('create-1')
+        response = self.post_tool('create-1', body=dict(self.new_tool, name='Zenmap'))
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.post_tool('x' * 256).status_code, 400)
+
+    def test_delete_retry_repeats_the_success(self, mock_verify_jwt):
+        """Test that retrying a delete returns the first 200 rather than 404"""
+        tool_id = json.loads(self.post_tool(None).data)['tool']['id']
+        headers = {'Authorization': 'Bearer admin', 'Idempotency-Key': 'delete-1'}
+        self.assertEqual(self.client.delete(f'/api/tools/{tool_id}', headers=headers).status_code, 200)
+        self.assertEqual(self.client.delete(f'/api/tools/{tool_id}', headers=headers).status_code, 200)
+        self.assertEqual(self.client.delete(f'/api/tools/{tool_id}',
+                                            headers={'Authorization': 'Bearer admin'}).status_code, 404)
+
+    def test_failed_request_is_not_stored(self, mock_verify_jwt):
+        """Test that a request that failed is not replayed, so the retry runs again"""
+        with patch('routes.insert_tool', side_effect=RuntimeError('database unavailable')):
+            self.assertEqual(self.post_tool('create-1').status_code, 422)
+        self.assertEqual(self.post_tool('create-1').status_code, 201)
+        self.assertEqual(Tool.query.count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+import unittest
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool, Job
+from config import SQLiteTestConfig
+from jobs import JOB_TYPES
+
+
+def mock_verify_decode_jwt(token):
+    if token == 'admin':
+        return {'sub': 'admin-user', 'permissions': ['read:tools', 'create:tools', 'update:tools', 'delete:tools']}
+    return {'sub': 'viewer-user', 'permissions': ['read:tools']}
+
+
+class JobsConfig(SQLiteTestConfig):
+    JOBS_RESULT_DIR = tempfile.mkdtemp(prefix='test-jobs-')
+
+
+class JobsTestCase(unittest.TestCase):
+    """
+    Test case for the background job subsystem.
+    """
+
+    def setUp(self):
+        self.app = create_app(JobsConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(self.sample_user)
+        db.session.commit()
+        self.runner = self.app.extensions['job_runner']
+        self.admin_auth_header = {'Authorization': 'Bearer admin'}
+        self.viewer_auth_header = {'Authorization': 'Bearer viewer'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def post_job(self, job_type, params, headers):
+        return self.client.post('/api/jobs', json={'type': job_type, 'params': params}, headers=headers)
+
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_import_job(self, mock_verify_jwt):
+        """Test that an import job inserts valid rows and reports skipped ones"""
+        rows = [{'name': f'Imported {i}', 'description': 'Imported tool.', 'user_id': self.sample_user.id}
+                for i in range(5)]
+        rows.append({'name': 'Orphan', 'user_id': 9999})
+        response = self.post_job('tool_import', {'tools': rows, 'chunk_size': 2}, self.admin_auth_header)
+        self.assertEqual(response.status_code, 202)
+        job_id = json.loads(response.data)['job']['id']
+
+        self.runner.run_pending()
+
+        response = self.client.get(f'/api/jobs/{job_id}', headers=self.viewer_auth_header)
+        job = json.loads(response.data)['job']
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['progress'], 6)
+        self.assertEqual(job['result']['imported'], 5)
+        self.assertEqual(job['result']['skipped'], 1)
+        self.assertEqual(Tool.query.count(), 5)
+
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_import_requires_create_permission(self, mock_verify_jwt):
+        """Test that queuing an import needs create:tools"""
+        response = self.post_job('tool_import', {'tools': []}, self.viewer_auth_header)
+        self.assertEqual(response.status_code, 403)
+
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_unknown_job_type(self, mock_verify_jwt):
+        """Test that an unknown job type is rejected"""
+        response = self.post_job('reticulate_splines', {}, self.admin_auth_header)
+        self.assertEqual(response.status_code, 422)
+
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_invalid_chunk_size(self, mock_verify_jwt):
+        """Test that import and export jobs with an invalid chunk_size or tools list are not queued"""
+        for job_type, params in (('tool_import', {'tools': [], 'chunk_size': -1}),
+                                 ('tool_import', {'tools': [], 'chunk_size': '100'}),
+                                 ('tool_import', {'tools': [], 'chunk_size': 10001}),
+                                 ('tool_import', {'tools': 'Nmap'}),
+                                 ('tool_export', {'chunk_size': 0})):
+            with self.subTest(job_type=job_type, params=params):
+                self.assertEqual(self.post_job(job_type, params, self.admin_auth_header).status_code, 422)
+        self.assertEqual(Job.query.count(), 0)
+
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_export_job_and_download(self, mock_verify_jwt):
+        """Test that an export job writes the catalog and it can be downloaded"""
+        for i in range(3):
+            Tool.create_tool(f'Tool {i}', 'Exported tool.', self.sample_user.id)
+
+        response = self.post_job('tool_export', {'chunk_size': 2}, self.viewer_auth_header)
+        job_id = json.loads(response.data)['job']['id']
+        self.runner.run_pending()
+
+        response = self.client.get(f'/api/jobs/{job_id}/download', headers=self.viewer_auth_header)
+        lines = response.data.decode('utf-8').splitlines()
+        response.close()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([json.loads(line)['name'] for line in lines], ['Tool 0', 'Tool 1', 'Tool 2'])
+
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_cancel_queued_job(self, mock_verify_jwt):
+        """Test that a queued job can be cancelled and never runs"""
+        response = self.post_job('tool_export', {}, self.viewer_auth_header)
+        job_id = json.loads(response.data)['job']['id']
+
+        response = self.client.post(f'/api/jobs/{job_id}/cancel', headers=self.viewer_auth_header)
+        self.assertEqual(json.loads(response.data)['job']['status'], 'cancelled')
+        self.runner.run_pending()
+        self.assertIsNone(Job.get_job(job_id).started_at)
+
+    def test_cancel_running_job(self):
+        """Test that a running job stops at its next progress report"""
+        def cancel_midway(context, params):
+            Job.get_job(context.job_id).cancel()
+            db.session.add(Tool(name='Never committed', description='', user_id=self.sample_user.id))
+            context.report(1)
+            return {}
+
+        with patch.dict(JOB_TYPES, {'cancel_midway': {'permission': 'read:tools', 'handler': cancel_midway}}):
+            job_id = Job.create_job('cancel_midway', {}).id
+            self.runner.run_pending()
+
+        job = Job.get_job(job_id)
+        self.assertEqual(job.status, 'cancelled')
+        self.assertIsNotNone(job.finished_at)
+
+    def test_stale_running_job_is_requeued_and_resumed(self):
+        """Test that a job abandoned by a dead runner resumes from its last committed chunk"""
+        rows = [{'name': f'Tool {i}', 'user_id': self.sample_user.id} for i in range(4)]
+        job = Job.create_job('tool_import', {'tools': rows, 'chunk_size': 2})
+        job_id = job.id
+        # Simulate a runner that committed the first chunk, then died
+        Tool.create_tool('Tool 0', '', self.sample_user.id)
+        Tool.create_tool('Tool 1', '', self.sample_user.id)
+        job.status = 'running'
+        job.progress = 2
+        job.result = json.dumps({'imported': 2, 'skipped': 0, 'errors': []})
+        job.heartbeat_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+
+        self.assertEqual(self.runner.requeue_stale_jobs(), 1)
+        self.runner.run_pending()
+
+        job = Job.get_job(job_id)
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(json.loads(job.result)['imported'], 4)
+        self.assertEqual(Tool.query.count(), 4)
+
+
+class JobHeartbeatTestCase(unittest.TestCase):
+    """
+    Test case for the heartbeats of running jobs.
+    """
+
+    def setUp(self):
+        # The heartbeat thread needs a database that several connections can share
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        config = type('Config', (JobsConfig,), {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.db_path}',
+                                                'JOBS_STALE_AFTER': 0.2})
+        self.app = create_app(config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.runner = self.app.extensions['job_runner']
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        os.close(self.db_fd)
+        os.remove(self.db_path)
+
+    def test_long_running_job_is_not_requeued(self):
+        """Test that a job stays claimed while one of its steps runs longer than JOBS_STALE_AFTER"""
+        def slow_step(context, params):
+            time.sleep(1.0)
+            return {'requeued': self.runner.requeue_stale_jobs()}
+
+        with patch.dict(JOB_TYPES, {'slow_step': {'permission': 'read:tools', 'handler': slow_step}}):
+            job_id = Job.create_job('slow_step', {}).id
+            self.runner.run_pending()
+
+        job = Job.get_job(job_id)
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(json.loads(job.result), {'requeued': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import json
+import tempfile
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool
+from config import SQLiteTestConfig
+
+
+def mock_verify_decode_jwt(token):
+    if token == 'profiler':
+        return {'sub': 'ops-user', 'permissions': ['read:tools', 'profile:requests']}
+    return {'sub': 'viewer-user', 'permissions': ['read:tools']}
+
+
+class ProfilingConfig(SQLiteTestConfig):
+    PROFILE_ENABLED = True
+    PROFILE_DIR = tempfile.mkdtemp(prefix='test-profiles-')
+    PROFILE_KEEP = 3
+
+
+@patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+class ProfilingTestCase(unittest.TestCase):
+    """
+    Test case for on-demand request profiling.
+    """
+
+    def setUp(self):
+        self.app = create_app(ProfilingConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        user = User(username="Test User", email="testuser@example.com")
+        db.session.add(user)
+        db.session.commit()
+        Tool.create_tool('Nmap', 'Network scanner.', user.id)
+        self.profiler_auth_header = {'Authorization': 'Bearer profiler'}
+        self.viewer_auth_header = {'Authorization': 'Bearer viewer'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_cpu_profile(self, mock_verify_jwt):
+        """Test that a CPU profile is stored and can be read back as a report"""
+        response = self.client.get('/api/tools', headers=dict(self.profiler_auth_header, **{'X-Profile': 'cpu'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(json.loads(response.data)['success'])
+        profile_id = response.headers['X-Profile-Id']
+
+        response = self.client.get('/api/admin/profiles', headers=self.profiler_auth_header)
+        self.assertIn(profile_id, json.loads(response.data)['profiles'])
+
+        response = self.client.get(f'/api/admin/profiles/{profile_id}', headers=self.profiler_auth_header)
+        self.assertEqual(response.mimetype, 'text/plain')
+        self.assertIn('get_tools', response.get_data(as_text=True))
+
+    def test_memory_profile_records_endpoint_peak(self, mock_verify_jwt):
+        """Test that memory mode records the allocation peak of the endpoint"""
+        response = self.client.get('/api/tools', headers=dict(self.profiler_auth_header, **{'X-Profile': 'memory'}))
+        report = self.client.get(f"/api/admin/profiles/{response.headers['X-Profile-Id']}",
+                                 headers=self.profiler_auth_header).get_data(as_text=True)
+        self.assertIn('Allocation peak', report)
+
+        response = self.client.get('/api/admin/memory', headers=self.profiler_auth_header)
+        peaks = json.loads(response.data)['endpoints']['api.get_tools']
+        self.assertEqual(peaks['requests'], 1)
+        self.assertGreater(peaks['max_peak_bytes'], 0)
+
+    def test_header_ignored_without_permission(self, mock_verify_jwt):
+        """Test that callers without profile:requests are never profiled"""
+        response = self.client.get('/api/tools', headers=dict(self.viewer_auth_header, **{'X-Profile': 'cpu'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response.headers)
+
+        response = self.client.get('/api/admin/profiles', headers=self.viewer_auth_header)
+        self.assertEqual(response.status_code, 403)
+
+    def test_old_profiles_are_pruned(self, mock_verify_jwt):
+        """Test that only the most recent PROFILE_KEEP profiles are kept"""
+        for _ in range(5):
+            self.client.get('/api/tools', headers=dict(self.profiler_auth_header, **{'X-Profile': 'cpu'}))
+        self.assertEqual(len(self.app.extensions['request_profiler'].store.list()), 3)
+
+    def test_invalid_profile_id(self, mock_verify_jwt):
+        """Test that profile IDs that could escape the profile directory are rejected"""
+        response = self.client.get('/api/admin/profiles/..%2F..%2Fetc%2Fpasswd', headers=self.profiler_auth_header)
+        self.assertEqual(response.status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,260 @@
+import unittest
+import os
+import random
+import re
+import sqlite3
+from unittest.mock import patch
+from sqlalchemy import event
+from app import create_app
+from datetime import datetime, timedelta
+from models import db, User, Tool, Tag, AuditEntry, Job, ToolUsage, tool_tags, next_change_seq, recount_tools
+from config import SQLiteTestConfig
+
+# Set UPDATE_QUERY_PLANS=1 to rewrite the snapshot after an intended plan change
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), 'query_plans', 'sqlite.txt')
+
+# Tables that grow with use: a full scan of one of them is only acceptable
+# where an endpoint lists it in ENDPOINTS
+WATCHED_TABLES = {'tool', 'user', 'tool_tag', 'tool_archive', 'tool_archive_tag', 'audit_log', 'job', 'tool_usage'}
+
+# Seeded data, large enough that every query shape matters
+USER_COUNT = 200
+TOOL_COUNT = 5000
+TAG_COUNT = 60
+AUDIT_ENTRY_COUNT = 2000
+# Hourly usage buckets, 20 tools read in each
+USAGE_HOURS = 24 * 30
+
+# (name, method, url, JSON body, tables the endpoint may scan in full). Reads
+# come first, since the writes change the seeded rows.
+ENDPOINTS = [
+    ('get_tool', 'GET', '/api/tools/{tool_id}', None, ()),
+    # Every live tool is returned
+    ('list_tools', 'GET', '/api/tools', None, ('tool',)),
+    # Walks the primary key from the start and stops after limit + 1 rows
+    ('list_tools_first_page', 'GET', '/api/tools?limit=50', None, ('tool',)),
+    ('list_tools_page', 'GET', '/api/tools?limit=50&after={tool_id}', None, ()),
+    ('list_tools_by_tag', 'GET', '/api/tools?tag=tag-1&tag=tag-2&limit=50', None, ()),
+    ('list_tools_page_with_archive', 'GET', '/api/tools?limit=50&after={tool_id}&include_archived=true', None, ()),
+    # Counts the tags of every live tool
+    ('list_tools_with_facets', 'GET', '/api/tools?limit=50&after={tool_id}&facets=true', None, ('tool_tag',)),
+    ('popular_tools', 'GET', '/api/tools/popular?window=7d', None, ()),
+    ('get_tools_by_ids', 'GET', '/api/tools?ids={tool_id},{other_tool_id}', None, ()),
+    ('batch_get_tools', 'POST', '/api/tools/batch-get', {'ids': ['{tool_id}', '{other_tool_id}']}, ()),
+    ('get_tool_changes', 'GET', '/api/tools/changes?since={recent_seq}', None, ()),
+    ('suggest_tools', 'GET', '/api/tools/suggest?prefix=tool 1', None, ()),
+    # Streams every live tool
+    ('export_tools', 'GET', '/api/tools/export', None, ('tool',)),
+    ('list_users', 'GET', '/api/users', None, ('user',)),
+    ('get_audit_log', 'GET', '/api/audit?before={audit_id}', None, ()),
+    ('get_audit_log_by_actor', 'GET', '/api/audit?actor=actor-3', None, ()),
+    ('get_audit_log_by_resource', 'GET', '/api/audit?resource_type=tool&resource_id={tool_id}', None, ()),
+    ('get_job', 'GET', '/api/jobs/1', None, ()),
+    ('create_tool', 'POST', '/api/tools', {'name': 'Nmap', 'description': 'Scanner.', 'user_id': '{user_id}',
+                                           'tags': ['tag-1', 'new-tag']}, ()),
+    ('update_tool', 'PATCH', '/api/tools/{tool_id}', {'name': 'Zenmap', 'tags': ['tag-3']}, ()),
+    ('retire_tool', 'POST', '/api/tools/{tool_id}/retire', None, ()),
+    ('delete_tool', 'DELETE', '/api/tools/{other_tool_id}', None, ()),
+]
+
+
+class QueryPlanConfig(SQLiteTestConfig):
+    USAGE_ENABLED = True
+    # Keep the usage writer idle; the counts taken by the reads are never flushed
+    USAGE_FLUSH_INTERVAL = 3600
+
+
+def mock_verify_decode_jwt(token):
+    return {'sub': 'admin-user',
+            'permissions': ['read:tools', 'create:tools', 'update:tools', 'delete:tools', 'read:audit']}
+
+
+def fill(value, fixtures):
+    """Substitute fixture IDs into a URL or JSON body; '{name}' strings in a body become integers."""
+    if isinstance(value, str):
+        if re.fullmatch(r'\{\w+\}', value):
+            return fixtures[value[1:-1]]
+        return value.format(**fixtures)
+    if isinstance(value, list):
+        return [fill(item, fixtures) for item in value]
+    if isinstance(value, dict):
+        return {key: fill(item, fixtures) for key, item in value.items()}
+    return value
+
+
+def shorten(statement):
+    """Collapse whitespace, the first select list and lists of parameters, so statements read as one line."""
+    statement = ' '.join(statement.split())
+    statement = re.sub(r'\(\?(?:, \?)+\)', '(?, ...)', statement)
+    return re.sub(r'^SELECT .+? FROM ', 'SELECT ... FROM ', statement, count=1)
+
+
+def explain(connection, statement, parameters):
+    """
+    Run EXPLAIN QUERY PLAN for a statement.
+
+    Returns:
+        list: The plan's lines, indented by their depth in the plan tree
+    """
+    depths = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters):
+        depths[node_id] = depths.get(parent, -1) + 1
+        lines.append('  ' * depths[node_id] + detail)
+    return lines
+
+
+def full_scans(plan):
+    """Return the tables a plan reads in full: SCAN lines, with query aliases such as tool_1 resolved."""
+    tables = set()
+    for line in plan:
+        match = re.match(r'\s*SCAN (\w+)', line)
+        if match:
+            tables.add(re.sub(r'_\d+$', '', match.group(1)))
+    return tables
+
+
+def format_plans(plans):
+    """Render the captured plans of every endpoint as the snapshot text."""
+    lines = [f'# SQLite {sqlite3.sqlite_version}']
+    for name, statements in plans.items():
+        lines.append('')
+        lines.append(f'## {name}')
+        for statement, plan in statements:
+            lines.append(statement)
+            lines.extend('    ' + line for line in plan)
+    return '\n'.join(lines) + '\n'
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    """
+    Query-plan regression tests.
+
+    Every endpoint in ENDPOINTS is called against a seeded in-memory SQLite
+    database; each distinct statement it issues is explained, and the plans
+    are checked for full scans of growing tables and compared with the
+    snapshot in tests/query_plans/sqlite.txt, so a changed plan shows up as a
+    readable diff. Streaming, import and job creation routes are not covered:
+    they are bulk operations or run in the background.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app(QueryPlanConfig)
+        with cls.app.app_context():
+            db.create_all()
+            cls.fixtures = cls.seed()
+        with patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt):
+            cls.plans = {name: cls.capture(method, url, body) for name, method, url, body, _ in ENDPOINTS}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.app.extensions['usage_counter'].flush()
+        with cls.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    @classmethod
+    def seed(cls):
+        # Bulk inserts, bypassing the ORM hooks, which would take most of the run
+        rng = random.Random(42)
+        db.session.execute(db.insert(User), [
+            {'id': i, 'username': f'user-{i}', 'email': f'user-{i}@example.com'} for i in range(1, USER_COUNT + 1)
+        ])
+        db.session.execute(db.insert(Tag), [{'id': i, 'name': f'tag-{i}'} for i in range(1, TAG_COUNT + 1)])
+        db.session.execute(db.insert(Tool), [
+            {'id': i, 'name': f'Tool {i}', 'description': 'A tool.', 'user_id': rng.randint(1, USER_COUNT),
+             'change_seq': i} for i in range(1, TOOL_COUNT + 1)
+        ])
+        db.session.execute(tool_tags.insert(), [
+            {'tool_id': tool_id, 'tag_id': tag_id}
+            for tool_id in range(1, TOOL_COUNT + 1)
+            for tag_id in rng.sample(range(1, TAG_COUNT + 1), rng.randint(1, 4))
+        ])
+        db.session.execute(db.insert(AuditEntry), [
+            {'actor': f'actor-{i % 20}', 'action': 'update', 'resource_type': 'tool', 'resource_id': i % TOOL_COUNT + 1}
+            for i in range(AUDIT_ENTRY_COUNT)
+        ])
+        now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        db.session.execute(db.insert(ToolUsage), [
+            {'bucket_start': now - timedelta(hours=hour), 'tool_id': tool_id, 'hits': rng.randint(1, 50)}
+            for hour in range(USAGE_HOURS)
+            for tool_id in rng.sample(range(1, TOOL_COUNT + 1), 20)
+        ])
+        db.session.add(Job(type='export', params='{}', created_by='admin-user'))
+        next_change_seq(db.session.connection(), 'tool', TOOL_COUNT)
+        recount_tools(db.session.connection())
+        db.session.commit()
+
+        return {
+            'user_id': 1,
+            'tool_id': TOOL_COUNT // 2,
+            'other_tool_id': TOOL_COUNT // 3,
+            'recent_seq': TOOL_COUNT - 10,
+            'audit_id': AUDIT_ENTRY_COUNT // 2,
+        }
+
+    @classmethod
+    def capture(cls, method, url, body):
+        """
+        Call an endpoint and explain the statements it issued.
+
+        Returns:
+            list: (statement, plan lines) pairs, each distinct statement once, in order
+        """
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE')):
+                statements.append((statement, parameters[0] if executemany else parameters))
+
+        with cls.app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            response = cls.app.test_client().open(
+                fill(url, cls.fixtures), method=method, json=fill(body, cls.fixtures),
+                headers={'Authorization': 'Bearer admin'}
+            )
+            response.get_data()
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        assert response.status_code < 300, f'{method} {url}: {response.status_code}'
+
+        plans = []
+        with cls.app.app_context(), db.engine.connect() as connection:
+            for statement, parameters in statements:
+                entry = (shorten(statement), explain(connection, statement, parameters))
+                if entry not in plans:
+                    plans.append(entry)
+        return plans
+
+    def test_no_unexpected_full_scans(self):
+        """Test that no endpoint reads a growing table in full unless it is expected to"""
+        for name, method, url, _, allowed in ENDPOINTS:
+            with self.subTest(endpoint=name):
+                self.assertTrue(self.plans[name], f'{method} {url} issued no statements')
+                for statement, plan in self.plans[name]:
+                    scanned = (full_scans(plan) & WATCHED_TABLES) - set(allowed)
+                    self.assertFalse(scanned, '{} {} scans {}:\n{}\n{}'.format(
+                        method, fill(url, self.fixtures), ', '.join(sorted(scanned)), statement, '\n'.join(plan)))
+
+    def test_plans_match_snapshot(self):
+        """Test that the plans are unchanged; run with UPDATE_QUERY_PLANS=1 to accept a change"""
+        current = format_plans(self.plans)
+        if os.environ.get('UPDATE_QUERY_PLANS') == '1':
+            os.makedirs(os.path.dirname(SNAPSHOT_PATH), exist_ok=True)
+            with open(SNAPSHOT_PATH, 'w') as f:
+                f.write(current)
+            return
+
+        with open(SNAPSHOT_PATH) as f:
+            expected = f.read()
+        if expected.splitlines()[0] != current.splitlines()[0]:
+            self.skipTest(f'snapshot taken with {expected.splitlines()[0][2:]}; plans differ between SQLite versions')
+        self.maxDiff = None
+        self.assertMultiLineEqual(expected, current)
+
+
+if __name__ == '__main__':
+    unittest.main()
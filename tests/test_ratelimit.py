@@ -0,0 +1,156 @@
+import unittest
+import json
+import os
+import tempfile
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool
+from config import SQLiteTestConfig
+from ratelimit import MemoryBackend, SQLiteBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def mock_verify_decode_jwt(token):
+    return {'sub': token, 'permissions': ['read:tools']}
+
+
+class RateLimitConfig(SQLiteTestConfig):
+    RATELIMIT_ENABLED = True
+    RATELIMIT_RATE = 1.0
+    RATELIMIT_BURST = 2
+
+
+class AdmissionConfig(SQLiteTestConfig):
+    MAX_IN_FLIGHT_REQUESTS = 1
+
+
+class TokenBucketTestCase(unittest.TestCase):
+    """
+    Test case for the token-bucket backends.
+    """
+
+    def test_memory_bucket_allows_burst_then_limits(self):
+        """Test that a bucket allows a burst, then asks the caller to wait"""
+        clock = FakeClock()
+        backend = MemoryBackend(clock=clock)
+        self.assertEqual(backend.take('a', 1.0, 2), 0)
+        self.assertEqual(backend.take('a', 1.0, 2), 0)
+        self.assertAlmostEqual(backend.take('a', 1.0, 2), 1.0)
+
+        clock.now += 1.0
+        self.assertEqual(backend.take('a', 1.0, 2), 0)
+
+    def test_memory_buckets_are_independent(self):
+        """Test that each key has its own bucket"""
+        backend = MemoryBackend(clock=FakeClock())
+        backend.take('a', 1.0, 1)
+        self.assertGreater(backend.take('a', 1.0, 1), 0)
+        self.assertEqual(backend.take('b', 1.0, 1), 0)
+
+    def test_sqlite_bucket_shared_between_instances(self):
+        """Test that two SQLite backends on the same file share buckets"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'buckets.db')
+            clock = FakeClock()
+            first = SQLiteBackend(path, clock=clock)
+            second = SQLiteBackend(path, clock=clock)
+            self.assertEqual(first.take('a', 1.0, 1), 0)
+            self.assertGreater(second.take('a', 1.0, 1), 0)
+
+    def test_memory_buckets_are_evicted_least_recently_used(self):
+        """Test that the number of buckets is capped by evicting the least recently used one"""
+        clock = FakeClock()
+        backend = MemoryBackend(max_keys=2, clock=clock)
+        self.assertEqual(backend.take('slow', 0.01, 1), 0)
+        backend.take('idle', 1.0, 1)
+        # Using 'slow' again keeps it over 'idle' when 'new' needs room
+        self.assertGreater(backend.take('slow', 0.01, 1), 0)
+        backend.take('new', 1.0, 1)
+
+        self.assertEqual(list(backend._buckets), ['slow', 'new'])
+        self.assertGreater(backend.take('slow', 0.01, 1), 0)
+
+    def test_sqlite_prunes_refilled_buckets(self):
+        """Test that the SQLite backend deletes refilled buckets every prune_interval"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'buckets.db')
+            clock = FakeClock()
+            backend = SQLiteBackend(path, clock=clock, prune_interval=60)
+            backend.take('refilled', 1.0, 1)
+            backend.take('slow', 0.001, 1)
+            clock.now += 60.0
+            backend.take('new', 1.0, 1)
+
+            keys = [row[0] for row in backend._connection().execute('SELECT key FROM rate_limit_bucket ORDER BY key')]
+            self.assertEqual(keys, ['new', 'slow'])
+            self.assertGreater(backend.take('slow', 0.001, 1), 0)
+
+
+class RateLimitedAppTestCase(unittest.TestCase):
+    """
+    Test case for rate limiting and load shedding in the API.
+    """
+
+    def setUp(self):
+        self.app = create_app(RateLimitConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(sample_user)
+        db.session.commit()
+        db.session.add(Tool(name="Test Tool", description="A test tool.", user_id=sample_user.id))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_429_after_burst(self, mock_verify_jwt):
+        """Test that a subject is throttled with 429 and Retry-After"""
+        headers = {'Authorization': 'Bearer subject-a'}
+        self.assertEqual(self.client.get('/api/tools', headers=headers).status_code, 200)
+        self.assertEqual(self.client.get('/api/tools', headers=headers).status_code, 200)
+
+        response = self.client.get('/api/tools', headers=headers)
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(data['success'])
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+    @patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+    def test_subjects_limited_separately(self, mock_verify_jwt):
+        """Test that one subject's traffic does not throttle another"""
+        for _ in range(3):
+            self.client.get('/api/tools', headers={'Authorization': 'Bearer subject-a'})
+
+        response = self.client.get('/api/tools', headers={'Authorization': 'Bearer subject-b'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_503_when_at_capacity(self):
+        """Test that requests over the in-flight cap are shed with 503"""
+        app = create_app(AdmissionConfig)
+        admission = app.extensions['admission_controller']
+        self.assertTrue(admission.try_acquire())
+
+        response = app.test_client().get('/')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+        admission.release()
+        self.assertEqual(app.test_client().get('/').status_code, 200)
+        self.assertEqual(admission.in_flight, 0)
+
+if __name__ == '__main__':
+    unittest.main()
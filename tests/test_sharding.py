@@ -0,0 +1,152 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool
+from config import SQLiteTestConfig
+from sharding import SHARD_ID_STRIDE
+
+
+def mock_verify_decode_jwt(token):
+    return {'sub': 'admin-user', 'permissions': ['read:tools', 'create:tools', 'update:tools', 'delete:tools']}
+
+
+@patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+class ShardingTestCase(unittest.TestCase):
+    """
+    Test case for tools sharded by owner across several SQLite files.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        shard_urls = [f"sqlite:///{os.path.join(self.directory, f'shard{i}.db')}" for i in range(3)]
+        config = type('Config', (SQLiteTestConfig,), {
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.directory, 'directory.db')}",
+            'SHARD_DATABASE_URLS': shard_urls,
+        })
+        self.app = create_app(config)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.router = self.app.extensions['shard_router']
+        self.router.create_all()
+
+        # Enough owners that every shard holds some of their tools
+        self.users = [User(username=f"User {i}", email=f"user{i}@example.com") for i in range(8)]
+        db.session.add_all(self.users)
+        db.session.commit()
+        self.user_ids = [user.id for user in self.users]
+        self.auth_header = {'Authorization': 'Bearer admin'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.router.dispose()
+        self.app_context.pop()
+        shutil.rmtree(self.directory)
+
+    def create(self, name, user_id):
+        response = self.client.post('/api/tools', json={
+            'name': name, 'description': 'A sharded tool.', 'user_id': user_id
+        }, headers=self.auth_header)
+        self.assertEqual(response.status_code, 201)
+        return json.loads(response.data)['tool']
+
+    def create_tools(self, per_user=3):
+        return [self.create(f'Tool {user_id}-{i}', user_id) for i in range(per_user) for user_id in self.user_ids]
+
+    def test_tools_are_stored_on_their_owners_shard(self, mock_verify_jwt):
+        """Test that each tool lands on the shard chosen by its owner, and only there"""
+        tools = self.create_tools()
+        self.assertEqual(Tool.query.count(), 0)
+        for tool in tools:
+            index = self.router.for_user(tool['user_id'])
+            self.assertEqual(tool['id'] % SHARD_ID_STRIDE, index)
+            with self.router.session(index) as session:
+                self.assertIsNotNone(session.get(Tool, tool['id']))
+        self.assertEqual(len({tool['id'] % SHARD_ID_STRIDE for tool in tools}), len(self.router))
+
+    def test_list_merges_shards_in_id_order(self, mock_verify_jwt):
+        """Test that GET /api/tools returns the tools of every shard, ordered by ID"""
+        tools = self.create_tools()
+        response = self.client.get('/api/tools', headers=self.auth_header)
+        listed = [tool['id'] for tool in json.loads(response.data)['tools']]
+        self.assertEqual(listed, sorted(tool['id'] for tool in tools))
+
+    def test_keyset_paging_across_shards(self, mock_verify_jwt):
+        """Test that pages follow each other without gaps or repeats"""
+        tools = self.create_tools()
+        seen = []
+        after = None
+        while True:
+            query = {'limit': 4} if after is None else {'limit': 4, 'after': after}
+            data = json.loads(self.client.get('/api/tools', query_string=query, headers=self.auth_header).data)
+            seen.extend(tool['id'] for tool in data['tools'])
+            if not data['has_more']:
+                self.assertIsNone(data['next_after'])
+                break
+            after = data['next_after']
+        self.assertEqual(seen, sorted(tool['id'] for tool in tools))
+
+    def test_tag_filter_and_facets_span_shards(self, mock_verify_jwt):
+        """Test that tag filters and facet counts combine the tools of every shard"""
+        for user_id in self.user_ids:
+            self.client.post('/api/tools', json={
+                'name': f'Scanner {user_id}', 'description': 'A sharded tool.', 'user_id': user_id,
+                'tags': ['scanner', 'network'] if user_id % 2 else ['scanner']
+            }, headers=self.auth_header)
+        data = json.loads(self.client.get('/api/tools', query_string={'tag': 'network'},
+                                          headers=self.auth_header).data)
+        self.assertEqual(len(data['tools']), len(self.user_ids) // 2)
+        self.assertEqual(data['facets'], {'network': len(self.user_ids) // 2, 'scanner': len(self.user_ids) // 2})
+
+    def test_get_update_and_delete_by_id(self, mock_verify_jwt):
+        """Test that single-tool routes find the tool's shard from its ID"""
+        tool = self.create('Nmap', self.user_ids[0])
+        url = f"/api/tools/{tool['id']}"
+
+        response = self.client.patch(url, json={'name': 'Nmap 7'}, headers=self.auth_header)
+        self.assertEqual(json.loads(response.data)['tool']['name'], 'Nmap 7')
+        response = self.client.get(url, headers=self.auth_header)
+        self.assertEqual(json.loads(response.data)['tool']['name'], 'Nmap 7')
+
+        response = self.client.post('/api/tools/batch-get', json={'ids': [tool['id'], tool['id'] + 1]},
+                                    headers=self.auth_header)
+        data = json.loads(response.data)
+        self.assertEqual([t['id'] for t in data['tools']], [tool['id']])
+        self.assertEqual(data['missing'], [tool['id'] + 1])
+
+        response = self.client.delete(url, headers=self.auth_header)
+        self.assertEqual(json.loads(response.data)['deleted'], tool['id'])
+        self.assertEqual(self.client.get(url, headers=self.auth_header).status_code, 404)
+
+    def test_tool_count_is_kept_on_the_directory(self, mock_verify_jwt):
+        """Test that owners' tool counts follow creates and deletes on the shards"""
+        tool = self.create('Nmap', self.user_ids[0])
+        self.create('Wireshark', self.user_ids[0])
+        self.client.delete(f"/api/tools/{tool['id']}", headers=self.auth_header)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(User, self.user_ids[0]).tool_count, 1)
+
+    def test_unknown_owner_is_rejected(self, mock_verify_jwt):
+        """Test that a tool cannot be created for an owner missing from the directory"""
+        response = self.client.post('/api/tools', json={
+            'name': 'Nmap', 'description': 'A sharded tool.', 'user_id': 999
+        }, headers=self.auth_header)
+        self.assertEqual(response.status_code, 422)
+        data = json.loads(self.client.get('/api/tools', headers=self.auth_header).data)
+        self.assertEqual(data['tools'], [])
+
+    def test_unsharded_routes_are_not_implemented(self, mock_verify_jwt):
+        """Test that routes reading the default tool table answer 501 in sharded mode"""
+        response = self.client.get('/api/tools/changes', headers=self.auth_header)
+        self.assertEqual(response.status_code, 501)
+        self.assertEqual(json.loads(response.data)['error'], 501)
+
+
+if __name__ == '__main__':
+    unittest.main()
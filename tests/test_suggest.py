@@ -0,0 +1,107 @@
+import unittest
+import json
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool
+from config import SQLiteTestConfig
+from suggest import NameIndex, SuggestIndex
+
+
+def mock_verify_decode_jwt(token):
+    return {'sub': 'admin-user', 'permissions': ['read:tools', 'create:tools', 'update:tools', 'delete:tools']}
+
+
+class NameIndexTestCase(unittest.TestCase):
+    """
+    Test case for the in-memory name index.
+    """
+
+    def setUp(self):
+        self.index = NameIndex()
+        self.index.add_many([(1, 'Nmap'), (2, 'Nikto'), (3, 'Wireshark'), (4, 'nmap Scripting  Engine')])
+
+    def test_prefix_matches_in_name_order(self):
+        self.assertEqual(self.index.suggest('NM'), [(1, 'Nmap', 'prefix'), (4, 'nmap Scripting  Engine', 'prefix')])
+
+    def test_fuzzy_matches_tolerate_typos(self):
+        self.assertEqual(self.index.suggest('wirshark'), [(3, 'Wireshark', 'fuzzy')])
+        self.assertEqual(self.index.suggest('nmpa')[0], (1, 'Nmap', 'fuzzy'))
+
+    def test_short_queries_are_not_fuzzy(self):
+        self.assertEqual(self.index.suggest('nx'), [])
+
+    def test_long_queries_are_not_fuzzy(self):
+        self.index.add(5, 'Metasploit Framework Pro')
+        self.assertEqual(self.index.suggest('metasploit frame')[0][2], 'prefix')
+        self.assertEqual(self.index.suggest('metasplot framework'), [])
+        self.assertEqual(self.index.suggest('metasplot frame'), [(5, 'Metasploit Framework Pro', 'fuzzy')])
+
+    def test_updates_and_removals(self):
+        self.index.add(2, 'Burp Suite')
+        self.index.remove(3)
+        self.assertEqual(self.index.suggest('nik'), [])
+        self.assertEqual(self.index.suggest('wireshark'), [])
+        self.assertEqual(self.index.suggest('burp'), [(2, 'Burp Suite', 'prefix')])
+        self.assertEqual(len(self.index), 3)
+
+
+class SuggestConfig(SQLiteTestConfig):
+    SUGGEST_REFRESH_SECONDS = 0
+
+
+@patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+class SuggestEndpointTestCase(unittest.TestCase):
+    """
+    Test case for GET /api/tools/suggest.
+    """
+
+    def setUp(self):
+        self.app = create_app(SuggestConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(self.sample_user)
+        db.session.commit()
+        self.nmap = Tool.create_tool('Nmap', 'Network scanner.', self.sample_user.id)
+        self.auth_header = {'Authorization': 'Bearer admin'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def suggest(self, prefix):
+        response = self.client.get('/api/tools/suggest', query_string={'prefix': prefix}, headers=self.auth_header)
+        self.assertEqual(response.status_code, 200)
+        return [suggestion['name'] for suggestion in json.loads(response.data)['suggestions']]
+
+    def test_changes_are_applied_incrementally(self, mock_verify_jwt):
+        """Test that creates, renames and deletes show up in the suggestions"""
+        self.assertEqual(self.suggest('nm'), ['Nmap'])
+        tool = Tool.create_tool('Nessus', 'Vulnerability scanner.', self.sample_user.id)
+        self.assertEqual(self.suggest('ne'), ['Nessus'])
+        tool.update({'name': 'Nexpose'})
+        self.assertEqual(self.suggest('nex'), ['Nexpose'])
+        tool.delete()
+        self.assertEqual(self.suggest('nex'), [])
+
+    def test_changes_from_other_workers_come_from_the_change_feed(self, mock_verify_jwt):
+        """Test that a change not signalled in this process is read on refresh"""
+        self.suggest('nm')
+        with patch.object(SuggestIndex, 'apply'):
+            self.nmap.update({'name': 'Zenmap'})
+        self.assertEqual(self.suggest('zen'), ['Zenmap'])
+        self.assertEqual(self.suggest('nm'), [])
+
+    def test_invalid_requests(self, mock_verify_jwt):
+        """Test that an empty or overlong prefix is rejected"""
+        for query in [{}, {'prefix': '  '}, {'prefix': 'x' * 81}, {'prefix': 'nm', 'limit': 0}]:
+            response = self.client.get('/api/tools/suggest', query_string=query, headers=self.auth_header)
+            self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import json
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool, Tag
+from config import SQLiteTestConfig
+
+
+def mock_verify_decode_jwt(token):
+    return {'sub': 'admin-user', 'permissions': ['read:tools', 'create:tools', 'update:tools', 'delete:tools']}
+
+
+@patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+class TagsTestCase(unittest.TestCase):
+    """
+    Test case for tool tags, tag filters and facet counts.
+    """
+
+    def setUp(self):
+        self.app = create_app(SQLiteTestConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(self.sample_user)
+        db.session.commit()
+        self.auth_header = {'Authorization': 'Bearer admin'}
+
+        self.nmap = Tool.create_tool('Nmap', 'A tool.', self.sample_user.id, ['network', 'scanner']).id
+        Tool.create_tool('Burp Suite', 'A tool.', self.sample_user.id, ['proxy', 'scanner'])
+        self.volatility = Tool.create_tool('Volatility', 'A tool.', self.sample_user.id, ['forensics']).id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def get_tools(self, query):
+        response = self.client.get('/api/tools', query_string=query, headers=self.auth_header)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)
+
+    def test_tags_are_normalized_and_shared(self, mock_verify_jwt):
+        """Test that tag names are lowercased and stored once however many tools carry them"""
+        response = self.client.post('/api/tools', json={
+            'name': 'ZAP', 'description': 'A tool.', 'user_id': self.sample_user.id, 'tags': [' Scanner', 'proxy', 'PROXY']
+        }, headers=self.auth_header)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.data)['tool']['tags'], ['proxy', 'scanner'])
+        self.assertEqual(Tag.query.filter_by(name='scanner').count(), 1)
+
+    def test_filter_requires_every_tag(self, mock_verify_jwt):
+        """Test that repeated tag parameters keep the tools carrying all of them"""
+        data = self.get_tools([('tag', 'scanner')])
+        self.assertEqual({tool['name'] for tool in data['tools']}, {'Nmap', 'Burp Suite'})
+
+        data = self.get_tools([('tag', 'scanner'), ('tag', 'Proxy')])
+        self.assertEqual([tool['name'] for tool in data['tools']], ['Burp Suite'])
+
+    def test_facets_count_the_filtered_tools(self, mock_verify_jwt):
+        """Test that facets count every tag of the tools matching the filter"""
+        data = self.get_tools([('tag', 'scanner'), ('limit', 1)])
+        self.assertEqual(len(data['tools']), 1)
+        self.assertEqual(data['facets'], {'network': 1, 'proxy': 1, 'scanner': 2})
+
+    def test_facets_skip_deleted_tools(self, mock_verify_jwt):
+        """Test that deleted tools are not counted"""
+        self.client.delete(f"/api/tools/{self.volatility}", headers=self.auth_header)
+        data = self.get_tools({'facets': 'true'})
+        self.assertEqual(data['facets'], {'network': 1, 'proxy': 1, 'scanner': 2})
+
+    def test_facets_use_one_grouped_query(self, mock_verify_jwt):
+        """Test that facet counts do not depend on loading the tools"""
+        with patch.object(Tool, 'get_all_tools', return_value=[]):
+            data = self.get_tools({'facets': 'true'})
+        self.assertEqual(data['facets']['scanner'], 2)
+
+    def test_update_replaces_tags(self, mock_verify_jwt):
+        """Test that PATCH with tags replaces the tool's tags"""
+        response = self.client.patch(f"/api/tools/{self.nmap}", json={'tags': ['recon']},
+                                     headers=self.auth_header)
+        self.assertEqual(json.loads(response.data)['tool']['tags'], ['recon'])
+        data = self.get_tools({'tag': 'network'})
+        self.assertEqual(data['tools'], [])
+
+    def test_invalid_tags_are_rejected(self, mock_verify_jwt):
+        """Test that tags must be a list of short, non-empty strings"""
+        for tags in ['scanner', [''], ['x' * 51], [1]]:
+            response = self.client.post('/api/tools', json={
+                'name': 'Bad', 'description': 'A tool.', 'user_id': self.sample_user.id, 'tags': tags
+            }, headers=self.auth_header)
+            self.assertEqual(response.status_code, 422)
+        response = self.client.get('/api/tools', query_string={'tag': ' '}, headers=self.auth_header)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
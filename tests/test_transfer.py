@@ -0,0 +1,177 @@
+import unittest
+import csv
+import io
+import json
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool
+from archive import move_to_archive
+from config import SQLiteTestConfig
+
+
+def mock_verify_decode_jwt(token):
+    if token == 'admin':
+        return {'sub': 'admin-user', 'permissions': ['read:tools', 'create:tools', 'update:tools', 'delete:tools']}
+    return {'sub': 'viewer-user', 'permissions': ['read:tools']}
+
+
+class TransferConfig(SQLiteTestConfig):
+    EXPORT_BATCH_SIZE = 2
+    IMPORT_CHUNK_SIZE = 2
+
+
+@patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+class TransferTestCase(unittest.TestCase):
+    """
+    Test case for streaming catalog export and import.
+    """
+
+    def setUp(self):
+        self.app = create_app(TransferConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(self.sample_user)
+        db.session.commit()
+        self.admin_auth_header = {'Authorization': 'Bearer admin'}
+        self.viewer_auth_header = {'Authorization': 'Bearer viewer'}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def create_tools(self, count):
+        return [Tool.create_tool(f'Tool {i}', f'Description, "{i}"', self.sample_user.id) for i in range(count)]
+
+    def test_export_ndjson(self, mock_verify_jwt):
+        """Test that the NDJSON export streams every remaining tool in ID order"""
+        tools = self.create_tools(5)
+        Tool.get_tool(tools[1].id).delete()
+
+        response = self.client.get('/api/tools/export', headers=self.viewer_auth_header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertTrue(response.is_streamed)
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['Tool 0', 'Tool 2', 'Tool 3', 'Tool 4'])
+        self.assertEqual(rows[0]['description'], 'Description, "0"')
+
+    def test_export_csv(self, mock_verify_jwt):
+        """Test that the CSV export has a header and quotes values correctly"""
+        self.create_tools(3)
+
+        response = self.client.get('/api/tools/export?format=csv', headers=self.viewer_auth_header)
+        self.assertEqual(response.mimetype, 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual([row['name'] for row in rows], ['Tool 0', 'Tool 1', 'Tool 2'])
+        self.assertEqual(rows[2]['description'], 'Description, "2"')
+
+    def test_export_unknown_format(self, mock_verify_jwt):
+        """Test that an unknown export format is rejected"""
+        response = self.client.get('/api/tools/export?format=xml', headers=self.viewer_auth_header)
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_ndjson(self, mock_verify_jwt):
+        """Test that an NDJSON import inserts valid lines and skips invalid ones"""
+        lines = [json.dumps({'name': f'Imported {i}', 'description': 'Imported.', 'user_id': self.sample_user.id})
+                 for i in range(3)]
+        lines[1:1] = ['not json', '', json.dumps({'name': 'Orphan', 'user_id': 999})]
+        response = self.client.post('/api/tools/import', data='\n'.join(lines) + '\n',
+                                    content_type='application/x-ndjson', headers=self.admin_auth_header)
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['imported'], 3)
+        self.assertEqual(data['skipped'], 2)
+        self.assertEqual(len(data['errors']), 2)
+        self.assertEqual(Tool.query.count(), 3)
+
+    def test_csv_export_round_trip(self, mock_verify_jwt):
+        """Test that a CSV export can be imported as it is"""
+        self.create_tools(3)
+        exported = self.client.get('/api/tools/export?format=csv', headers=self.viewer_auth_header).data
+
+        response = self.client.post('/api/tools/import', data=exported,
+                                    content_type='text/csv', headers=self.admin_auth_header)
+        self.assertEqual(json.loads(response.data)['imported'], 3)
+        names = sorted(tool.name for tool in Tool.get_all_tools())
+        self.assertEqual(names, ['Tool 0', 'Tool 0', 'Tool 1', 'Tool 1', 'Tool 2', 'Tool 2'])
+
+    def test_tags_round_trip(self, mock_verify_jwt):
+        """Test that tags survive an export followed by an import, in both formats"""
+        Tool.create_tool('Nmap', 'Network scanner.', self.sample_user.id, ['network', 'scanner'])
+        Tool.create_tool('Wireshark', 'Protocol analyzer.', self.sample_user.id, ['network'])
+        Tool.create_tool('John', 'Password cracker.', self.sample_user.id)
+
+        for export_format, content_type in (('ndjson', 'application/x-ndjson'), ('csv', 'text/csv')):
+            with self.subTest(format=export_format):
+                exported = self.client.get(f'/api/tools/export?format={export_format}',
+                                           headers=self.viewer_auth_header).data
+                if export_format == 'ndjson':
+                    self.assertEqual(json.loads(exported.splitlines()[0])['tags'], ['network', 'scanner'])
+                else:
+                    self.assertIn(b'network;scanner', exported)
+
+                before = {tool.id for tool in Tool.get_all_tools()}
+                response = self.client.post('/api/tools/import', data=exported,
+                                            content_type=content_type, headers=self.admin_auth_header)
+                self.assertEqual(json.loads(response.data)['imported'], len(before))
+                imported = {tool.name: [tag.name for tag in tool.tags]
+                            for tool in Tool.get_all_tools() if tool.id not in before}
+                self.assertEqual(imported, {'Nmap': ['network', 'scanner'], 'Wireshark': ['network'], 'John': []})
+
+    def test_import_invalid_tags(self, mock_verify_jwt):
+        """Test that rows with malformed tags are skipped"""
+        lines = [json.dumps({'name': 'Nmap', 'user_id': self.sample_user.id, 'tags': tags})
+                 for tags in (['Network', 'network'], 'scanner', [''], [1], ['x' * 51])]
+        response = self.client.post('/api/tools/import', data='\n'.join(lines),
+                                    content_type='application/x-ndjson', headers=self.admin_auth_header)
+        data = json.loads(response.data)
+        self.assertEqual((data['imported'], data['skipped']), (2, 3))
+        self.assertEqual(sorted(tag.name for tool in Tool.get_all_tools() for tag in tool.tags),
+                         ['network', 'scanner'])
+
+    def test_import_oversized_values(self, mock_verify_jwt):
+        """Test that rows whose name or description does not fit its column are skipped"""
+        rows = [{'name': 'x' * 80, 'description': 'y' * 255}, {'name': 'x' * 81},
+                {'name': 'Nmap', 'description': 'y' * 256}]
+        lines = [json.dumps(dict(row, user_id=self.sample_user.id)) for row in rows]
+        response = self.client.post('/api/tools/import', data='\n'.join(lines),
+                                    content_type='application/x-ndjson', headers=self.admin_auth_header)
+        data = json.loads(response.data)
+        self.assertEqual((data['imported'], data['skipped']), (1, 2))
+        self.assertEqual(data['errors'][0][:6], 'Row 1:')
+
+    def test_export_include_archived(self, mock_verify_jwt):
+        """Test that archived tools are exported, with their tags, only when asked for"""
+        tools = self.create_tools(3)
+        tools[1].set_tags(['scanner'])
+        db.session.commit()
+        move_to_archive([tools[1].id])
+        db.session.commit()
+
+        for query in ('', '&include_archived=true'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/tools/export?format=ndjson{query}', headers=self.viewer_auth_header)
+                rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+                expected = ['Tool 0', 'Tool 1', 'Tool 2'] if query else ['Tool 0', 'Tool 2']
+                self.assertEqual([row['name'] for row in rows], expected)
+                if query:
+                    self.assertEqual(rows[1]['tags'], ['scanner'])
+
+    def test_import_invalid_utf8(self, mock_verify_jwt):
+        """Test that a body that is not UTF-8 is rejected"""
+        response = self.client.post('/api/tools/import', data=b'\xff\xfe\x00',
+                                    content_type='application/x-ndjson', headers=self.admin_auth_header)
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_requires_create_permission(self, mock_verify_jwt):
+        """Test that importing needs create:tools"""
+        response = self.client.post('/api/tools/import', data='', headers=self.viewer_auth_header)
+        self.assertEqual(response.status_code, 403)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import json
+from unittest.mock import patch
+from app import create_app
+from models import db, User, Tool, ToolUsage
+from archive import move_to_archive
+from config import SQLiteTestConfig
+
+
+def mock_verify_decode_jwt(token):
+    return {'sub': 'admin-user', 'permissions': ['read:tools', 'create:tools', 'update:tools', 'delete:tools']}
+
+
+class UsageConfig(SQLiteTestConfig):
+    USAGE_ENABLED = True
+    # Keep the background writer idle; the tests flush explicitly
+    USAGE_FLUSH_INTERVAL = 3600
+    USAGE_RETENTION_DAYS = 7
+
+
+@patch('auth.verify_decode_jwt', side_effect=mock_verify_decode_jwt)
+class UsageTestCase(unittest.TestCase):
+    """
+    Test case for tool read counting and the popular-tools endpoint.
+    """
+
+    def setUp(self):
+        self.app = create_app(UsageConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.sample_user = User(username="Test User", email="testuser@example.com")
+        db.session.add(self.sample_user)
+        db.session.commit()
+        self.tool_ids = [Tool.create_tool(f'Tool {i}', 'A tool.', self.sample_user.id).id for i in range(3)]
+        self.counter = self.app.extensions['usage_counter']
+        # 2026-10-19 12:30 UTC
+        self.now = 1792413000.0
+        self.counter.clock = lambda: self.now
+        self.auth_header = {'Authorization': 'Bearer admin'}
+
+    def tearDown(self):
+        self.counter.flush()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def read(self, tool_id, times=1):
+        for _ in range(times):
+            self.assertEqual(self.client.get(f'/api/tools/{tool_id}', headers=self.auth_header).status_code, 200)
+
+    def popular(self, query=''):
+        response = self.client.get(f'/api/tools/popular{query}', headers=self.auth_header)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        return [tool['id'] for tool in data['tools']], data['hits']
+
+    def test_reads_are_flushed_as_one_row_per_bucket(self, mock_verify_jwt):
+        """Test that reads are counted in memory, then added to their bucket by each flush"""
+        self.read(self.tool_ids[0], 3)
+        self.read(self.tool_ids[1])
+        self.client.get('/api/tools/9999', headers=self.auth_header)
+        self.assertEqual(ToolUsage.query.count(), 0)
+
+        self.assertEqual(self.counter.flush(), 4)
+        self.read(self.tool_ids[0], 2)
+        self.assertEqual(self.counter.flush(), 2)
+        self.assertEqual(self.counter.flush(), 0)
+
+        rows = {(row.tool_id, row.hits) for row in ToolUsage.query.all()}
+        self.assertEqual(rows, {(self.tool_ids[0], 5), (self.tool_ids[1], 1)})
+
+        # The next hour starts a new bucket
+        self.now += 3600
+        self.read(self.tool_ids[0])
+        self.counter.flush()
+        self.assertEqual(ToolUsage.query.filter_by(tool_id=self.tool_ids[0]).count(), 2)
+
+    def test_popular_tools_over_a_window(self, mock_verify_jwt):
+        """Test that popular tools are ranked by the reads in the buckets of the window"""
+        self.read(self.tool_ids[0], 5)
+        self.now += 2 * 86400
+        self.read(self.tool_ids[1], 3)
+        self.read(self.tool_ids[2], 3)
+        self.counter.flush()
+
+        self.assertEqual(self.popular(), ([self.tool_ids[1], self.tool_ids[2]], [3, 3]))
+        self.assertEqual(self.popular('?window=7d'), (self.tool_ids, [5, 3, 3]))
+        self.assertEqual(self.popular('?window=7d&limit=1'), ([self.tool_ids[0]], [5]))
+
+        # Deleted tools are left out; archived ones are still found
+        self.client.delete(f'/api/tools/{self.tool_ids[1]}', headers=self.auth_header)
+        move_to_archive([self.tool_ids[0]])
+        db.session.commit()
+        self.assertEqual(self.popular('?window=7d'), ([self.tool_ids[0], self.tool_ids[2]], [5, 3]))
+
+    def test_invalid_windows(self, mock_verify_jwt):
+        """Test that malformed windows, and windows beyond the retention period, are rejected"""
+        for query in ('?window=0h', '?window=1w', '?window=8d', '?window=abc', '?limit=0'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/tools/popular{query}', headers=self.auth_header)
+                self.assertEqual(response.status_code, 400)
+
+    def test_failed_flush_keeps_counts(self, mock_verify_jwt):
+        """Test that counts from a failed flush are added by the next one"""
+        self.read(self.tool_ids[0], 2)
+        with patch('usage.ToolUsage.add_hits', side_effect=RuntimeError('database unavailable')):
+            with self.assertRaises(RuntimeError):
+                self.counter.flush()
+        self.read(self.tool_ids[0])
+        self.assertEqual(self.counter.flush(), 3)
+        self.assertEqual(self.popular(), ([self.tool_ids[0]], [3]))
+
+    def test_old_buckets_are_pruned(self, mock_verify_jwt):
+        """Test that buckets older than the retention period are deleted by a flush"""
+        self.read(self.tool_ids[0])
+        self.counter.flush()
+        self.now += 8 * 86400
+        self.read(self.tool_ids[1])
+        self.counter.flush()
+
+        self.assertEqual([row.tool_id for row in ToolUsage.query.all()], [self.tool_ids[1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,263 @@
+import csv
+import io
+import json
+from itertools import islice
+from flask import current_app
+from models import db, ArchivedTool, Tag, Tool, User, archived_tool_tags, send_tool_changed, tool_tags
+
+# Columns written by an export, in order; an import reads the same columns
+EXPORT_FIELDS = ('id', 'name', 'description', 'created_at', 'user_id', 'tags')
+
+# Separates tag names in the tags column of a CSV file; NDJSON files carry a list
+CSV_TAG_SEPARATOR = ';'
+
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Skipped import rows are counted, but only the first few are described
+MAX_REPORTED_ERRORS = 20
+
+# Longest values the tool columns hold; longer ones are rejected by PostgreSQL at insert time
+MAX_NAME_LENGTH = Tool.__table__.c.name.type.length
+MAX_DESCRIPTION_LENGTH = Tool.__table__.c.description.type.length
+
+
+def iter_tool_rows(batch_size, include_archived=False):
+    """
+    Iterate over the tools that have not been deleted, in ID order.
+
+    Rows are read through a server-side cursor (on PostgreSQL) batch_size at a
+    time, as plain tuples rather than ORM objects, so memory use does not grow
+    with the size of the catalog. The tags of each batch are read with one
+    more query.
+
+    Args:
+        batch_size (int): Number of rows fetched from the cursor at a time
+        include_archived (bool): Export archived tools as well, merged in ID order
+
+    Yields:
+        tuple: The EXPORT_FIELDS values of a tool; tags is a list of names
+    """
+    table = Tool.__table__
+    columns = [field for field in EXPORT_FIELDS if field != 'tags']
+    query = db.select(*(table.c[field] for field in columns)).where(table.c.deleted_at.is_(None))
+    link = tool_tags
+    if include_archived:
+        archive = ArchivedTool.__table__
+        query = db.union_all(query, db.select(*(archive.c[field] for field in columns)))
+        link = db.union_all(
+            db.select(tool_tags.c.tool_id, tool_tags.c.tag_id),
+            db.select(archived_tool_tags.c.tool_id, archived_tool_tags.c.tag_id)
+        ).subquery()
+    query = query.order_by(query.selected_columns.id)
+
+    # A dedicated connection keeps the cursor out of the request's session
+    with db.engine.connect() as connection:
+        result = connection.execution_options(yield_per=batch_size).execute(query)
+        for partition in result.partitions():
+            tags = {}
+            for tool_id, name in connection.execute(
+                db.select(link.c.tool_id, Tag.name)
+                .join(Tag, Tag.id == link.c.tag_id)
+                .where(link.c.tool_id.in_([row.id for row in partition]))
+                .order_by(Tag.name)
+            ):
+                tags.setdefault(tool_id, []).append(name)
+            for row in partition:
+                yield (*row, tags.get(row.id, []))
+
+
+def _export_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def export_ndjson(rows):
+    """Render rows as newline-delimited JSON, one object per line."""
+    for row in rows:
+        yield json.dumps({field: _export_value(value) for field, value in zip(EXPORT_FIELDS, row)}) + '\n'
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return CSV_TAG_SEPARATOR.join(value)
+    return _export_value(value)
+
+
+def export_csv(rows, batch_size=500):
+    """Render rows as CSV with a header line, a batch of rows per chunk; tags are joined with CSV_TAG_SEPARATOR."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        if not batch:
+            return
+
+
+EXPORT_RENDERERS = {
+    'ndjson': export_ndjson,
+    'csv': export_csv,
+}
+
+
+def read_ndjson(stream):
+    """
+    Parse a newline-delimited JSON byte stream one line at a time.
+
+    Yields:
+        The decoded object for each non-blank line, or None for a line that is not valid JSON
+    """
+    for line in io.TextIOWrapper(stream, encoding='utf-8'):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def read_csv(stream):
+    """
+    Parse a CSV byte stream with a header line one record at a time.
+
+    Yields:
+        dict: The record, keyed by the header's column names
+    """
+    yield from csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+
+
+IMPORT_READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+def import_tags(value):
+    """
+    Read the tags of an imported row: a list of names, or a string of names
+    joined with CSV_TAG_SEPARATOR as written by a CSV export.
+
+    Returns:
+        list: The normalized tag names, as accepted by the tool endpoints, or
+        None if the value is not valid
+    """
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        value = value.split(CSV_TAG_SEPARATOR)
+    if not isinstance(value, list) or not all(isinstance(tag, str) and 0 < len(tag.strip()) <= 50 for tag in value):
+        return None
+    names = list(dict.fromkeys(tag.strip().lower() for tag in value))
+    if len(names) > current_app.config.get('MAX_TAGS_PER_TOOL', 20):
+        return None
+    return names
+
+
+def add_tool_rows(rows, first_row, summary):
+    """
+    Validate a chunk of imported rows and add the valid ones to the session.
+
+    Rows need a name and the ID of an existing user, and may carry tags, which
+    are created as needed; other fields are ignored, so an export can be
+    imported into another environment as it is. Names and descriptions must
+    fit their columns. Invalid rows are counted as skipped. The caller commits
+    the session.
+
+    Args:
+        rows (list): The rows of the chunk, as dicts
+        first_row (int): Position of the chunk's first row in the whole import
+        summary (dict): Running totals: 'imported', 'skipped' and 'errors'
+
+    Returns:
+        list: The tools added to the session
+    """
+    def user_id_of(row):
+        try:
+            return int(row.get('user_id'))
+        except (TypeError, ValueError):
+            return None
+
+    def skip(offset, reason):
+        summary['skipped'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append(f'Row {first_row + offset}: {reason}')
+
+    user_ids = {user_id_of(row) for row in rows if isinstance(row, dict)} - {None}
+    known_users = {
+        user_id for (user_id,) in db.session.execute(db.select(User.id).where(User.id.in_(user_ids)))
+    }
+
+    valid = []
+    for offset, row in enumerate(rows):
+        if not isinstance(row, dict) or not str(row.get('name') or '').strip() \
+                or user_id_of(row) not in known_users:
+            skip(offset, 'missing name or unknown user_id')
+            continue
+        if len(str(row['name']).strip()) > MAX_NAME_LENGTH \
+                or len(str(row.get('description') or '').strip()) > MAX_DESCRIPTION_LENGTH:
+            skip(offset, f'name over {MAX_NAME_LENGTH} or description over {MAX_DESCRIPTION_LENGTH} characters')
+            continue
+        tags = import_tags(row.get('tags'))
+        if tags is None:
+            skip(offset, 'invalid tags')
+            continue
+        valid.append((row, tags))
+
+    # Look up or create every tag of the chunk at once
+    names = list(dict.fromkeys(name for _, tags in valid for name in tags))
+    tags_by_name = {tag.name: tag for tag in Tag.get_or_create(db.session, names)} if names else {}
+
+    new_tools = [
+        Tool(
+            name=str(row['name']).strip(),
+            description=str(row.get('description') or '').strip(),
+            user_id=user_id_of(row),
+            tags=[tags_by_name[name] for name in tags]
+        )
+        for row, tags in valid
+    ]
+
+    db.session.add_all(new_tools)
+    summary['imported'] += len(new_tools)
+    return new_tools
+
+
+def import_tools(rows, chunk_size):
+    """
+    Import tools from an iterator of rows, committing one chunk at a time.
+
+    Only one chunk is held in memory, so the iterator can read an arbitrarily
+    large request body. The import is not atomic: chunks committed before an
+    error are kept.
+
+    Args:
+        rows: An iterator of row dicts
+        chunk_size (int): Number of rows inserted per transaction
+
+    Returns:
+        dict: The number of rows imported and skipped, and the first errors
+    """
+    summary = {'imported': 0, 'skipped': 0, 'errors': []}
+    first_row = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return summary
+        new_tools = add_tool_rows(chunk, first_row, summary)
+        db.session.flush()
+        new_ids = [tool.id for tool in new_tools]
+        db.session.commit()
+        # Reload the expired tools in one query rather than one per change notification
+        new_tools = Tool.query.filter(Tool.id.in_(new_ids)).all() if new_ids else []
+        for tool in new_tools:
+            send_tool_changed(tool, 'created')
+        # The committed tools are no longer needed in the session
+        db.session.expunge_all()
+        first_row += len(chunk)
@@ -0,0 +1,199 @@
+import atexit
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from cache import TTLCache
+from models import db, ToolUsage
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+# Popular-tools windows: a number of hours or days, e.g. '6h' or '7d'
+WINDOW_PATTERN = re.compile(r'(\d{1,4})([hd])')
+WINDOW_UNITS = {'h': 3600, 'd': 86400}
+
+
+def parse_window(value):
+    """
+    Parse a popular-tools window such as '24h' or '7d'.
+
+    Returns:
+        int: The window in seconds, or None if the value is malformed or zero
+    """
+    match = WINDOW_PATTERN.fullmatch(value or '')
+    if match is None or int(match.group(1)) == 0:
+        return None
+    return int(match.group(1)) * WINDOW_UNITS[match.group(2)]
+
+
+class UsageCounter:
+    """
+    Per-process counters of tool reads, flushed to the tool_usage table.
+
+    record() only increments a counter in memory, keyed by tool and time
+    bucket. A background thread adds the counts to their buckets every
+    flush_interval seconds with one upsert, so a read never waits for a
+    database write and the table takes one write per tool and bucket per
+    flush, however many reads there were. Counts still in memory when the
+    process exits are flushed by stop(), which runs at interpreter exit.
+
+    A flush that fails puts its counts back, to be added by the next one.
+    """
+
+    def __init__(self, app, bucket_seconds=3600, flush_interval=60.0, retention_days=90, clock=time.time):
+        self.app = app
+        self.bucket_seconds = bucket_seconds
+        self.flush_interval = flush_interval
+        self.retention = timedelta(days=retention_days)
+        self.clock = clock
+        # Popular-tools results, reused until this process's next flush
+        self.popular = TTLCache(maxsize=256, ttl=flush_interval)
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._pid = None
+        self._last_prune = 0
+        self.metrics = {'recorded': 0, 'flushed': 0, 'flushes': 0, 'flush_errors': 0, 'pruned': 0}
+
+    def start(self):
+        """Start the flush thread, once per process."""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Counts taken before a fork belong to the parent process
+            with self._lock:
+                self._counts = {}
+            self._pid = os.getpid()
+            self._stop.clear()
+            threading.Thread(target=self._run, daemon=True, name='tool-usage-writer').start()
+
+    def stop(self):
+        """Stop the flush thread and write every count still in memory."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._pid == os.getpid():
+            self.flush()
+
+    def bucket_start(self, timestamp):
+        """Get the start of the bucket holding a Unix timestamp, as a naive UTC datetime."""
+        return EPOCH + timedelta(seconds=int(timestamp // self.bucket_seconds) * self.bucket_seconds)
+
+    def record(self, tool_id):
+        """Count one read of a tool."""
+        self.start()
+        key = (int(self.clock() // self.bucket_seconds), tool_id)
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+        self.metrics['recorded'] += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Tool usage flush failed")
+
+    def flush(self):
+        """
+        Add the counts taken since the last flush to their buckets, in one transaction.
+
+        Buckets older than the retention period are deleted at most once an hour.
+
+        Returns:
+            int: The number of reads written
+        """
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, {}
+            if not counts:
+                return 0
+
+            hits = {
+                (EPOCH + timedelta(seconds=bucket * self.bucket_seconds), tool_id): count
+                for (bucket, tool_id), count in counts.items()
+            }
+            now = self.clock()
+            prune = now - self._last_prune >= 3600
+            with self.app.app_context():
+                try:
+                    connection = db.session.connection()
+                    ToolUsage.add_hits(connection, hits)
+                    if prune:
+                        self.metrics['pruned'] += ToolUsage.prune(connection, self.bucket_start(now) - self.retention)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    with self._lock:
+                        for key, count in counts.items():
+                            self._counts[key] = self._counts.get(key, 0) + count
+                    self.metrics['flush_errors'] += 1
+                    raise
+                finally:
+                    db.session.remove()
+
+            if prune:
+                self._last_prune = now
+            written = sum(counts.values())
+            self.metrics['flushed'] += written
+            self.metrics['flushes'] += 1
+            self.popular.clear()
+            return written
+
+    def get_popular(self, window_seconds, limit):
+        """
+        Get the most read tools over the last window_seconds, from the flushed buckets.
+
+        The window is widened to whole buckets: it starts at the beginning of
+        the bucket holding its oldest moment.
+
+        Returns:
+            list: (tool_id, hits) tuples, most hits first
+        """
+        since = self.bucket_start(self.clock() - window_seconds)
+        key = (since, limit)
+        popular = self.popular.get(key)
+        if popular is None:
+            popular = ToolUsage.get_popular(since, limit)
+            self.popular.set(key, popular)
+        return popular
+
+
+def record_tool_read(tool_id):
+    """Count a read of a tool, when usage counting is enabled."""
+    counter = current_app.extensions.get('usage_counter')
+    if counter is not None:
+        counter.record(tool_id)
+
+
+def init_usage(app):
+    """
+    Enable tool read counting and the popular-tools endpoint when USAGE_ENABLED is set.
+
+    Settings:
+        USAGE_BUCKET_SECONDS: Width of the time buckets counts are aggregated into
+        USAGE_FLUSH_INTERVAL: Seconds between flushes of the in-memory counts
+        USAGE_RETENTION_DAYS: Days buckets are kept, and the longest popular-tools window
+    """
+    if not app.config.get('USAGE_ENABLED', False):
+        return
+
+    counter = UsageCounter(
+        app,
+        bucket_seconds=app.config.get('USAGE_BUCKET_SECONDS', 3600),
+        flush_interval=app.config.get('USAGE_FLUSH_INTERVAL', 60.0),
+        retention_days=app.config.get('USAGE_RETENTION_DAYS', 90)
+    )
+    app.extensions['usage_counter'] = counter
+    atexit.register(counter.stop)